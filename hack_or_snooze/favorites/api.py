@@ -1,5 +1,6 @@
-from django.core.exceptions import ObjectDoesNotExist
+from typing import Union
 
+from asgiref.sync import sync_to_async
 from ninja import Router
 
 from hack_or_snooze.error_schemas import (
@@ -7,12 +8,28 @@ from hack_or_snooze.error_schemas import (
     Unauthorized,
     ObjectNotFound,
 )
-from stories.models import Story
 from users.models import User
 from users.auth_utils import token_header
 
 from users.schemas import (
     UserOutput,
+    UserSummaryOutput,
+    USER_VIEW_FULL,
+    auser_for_view,
+)
+
+from .queries import (
+    insert_favorite,
+    afavorite_insert_error,
+    delete_favorite,
+    bulk_update_favorites,
+)
+from .schemas import (
+    FavoriteDeltaOutput,
+    FavoriteView,
+    FAVORITE_VIEW_DELTA,
+    FavoriteBulkInput,
+    FavoriteBulkOutput,
 )
 
 router = Router()
@@ -21,14 +38,19 @@ router = Router()
 @router.post(
     '/{str:username}/{str:story_id}/favorite',
     response={
-        200: UserOutput,
+        200: Union[UserOutput, UserSummaryOutput, FavoriteDeltaOutput],
         400: BadRequest,
         401: Unauthorized,
         404: ObjectNotFound
     },
     auth=token_header
 )
-def add_favorite(request, username: str, story_id: str):
+async def add_favorite(
+    request,
+    username: str,
+    story_id: str,
+    view: FavoriteView = USER_VIEW_FULL
+):
     """
     Add a story to a user's favorites.
 
@@ -45,6 +67,18 @@ def add_favorite(request, username: str, story_id: str):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists (see GET /users/{username}).
+
+    Send "?view=delta" to get only an acknowledgement of the change:
+
+        {
+            "username": "test",
+            "story_id": "725ff2f9-2cc4-4e29-abab-95b9921f5a6b",
+            "favorited": true,
+            "user_favorite_count": 1
+        }
+
     **Authentication: token**
 
     **Authorization: same user or admin**
@@ -54,43 +88,40 @@ def add_favorite(request, username: str, story_id: str):
     if username != curr_user.username and curr_user.is_staff is not True:
         return 401, {"detail": "Unauthorized"}
 
-    # this covers the case where the curr_user is staff, but the target user
-    # does not exist:
-    try:
-        user = User.objects.get(username=username)
-    except ObjectDoesNotExist:
-        return 404, {"detail": "User not found."}
-
-    try:
-        story = Story.objects.get(id=story_id)
-    except ObjectDoesNotExist:
-        return 404, {"detail": "Story not found."}
+    # The existence, ownership and duplicate checks all happen inside the
+    # INSERT; we only look for the reason when nothing was inserted. The
+    # writes run in a transaction, which needs a thread:
+    if not await sync_to_async(insert_favorite)(username, story_id):
+        status, detail = await afavorite_insert_error(username, story_id)
+        return status, {"detail": detail}
 
-    if story in user.stories.all():
-        return 400, {"detail": "Cannot add own user stories to favorites"}
+    if view == FAVORITE_VIEW_DELTA:
+        return await afavorite_delta(username, story_id, favorited=True)
 
-    isFavorited = User.favorites.through.objects.filter(
-        user_id=username, story_id=story_id).exists()
+    if username == curr_user.username:
+        user = curr_user
+    else:
+        user = await User.objects.aget(username=username)
 
-    if isFavorited:
-        return 400, {"detail": "Story already favorited."}
-
-    user.favorites.add(story)
-
-    return {"user": user}
+    return {"user": await auser_for_view(user, view)}
 
 
 @router.post(
     '/{str:username}/{str:story_id}/unfavorite',
     response={
-        200: UserOutput,
+        200: Union[UserOutput, UserSummaryOutput, FavoriteDeltaOutput],
         400: BadRequest,
         401: Unauthorized,
         404: ObjectNotFound
     },
     auth=token_header
 )
-def remove_favorite(request, username: str, story_id: str):
+async def remove_favorite(
+    request,
+    username: str,
+    story_id: str,
+    view: FavoriteView = USER_VIEW_FULL
+):
     """
     Remove a story from a user's favorites.
 
@@ -108,6 +139,18 @@ def remove_favorite(request, username: str, story_id: str):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists (see GET /users/{username}).
+
+    Send "?view=delta" to get only an acknowledgement of the change:
+
+        {
+            "username": "test",
+            "story_id": "725ff2f9-2cc4-4e29-abab-95b9921f5a6b",
+            "favorited": false,
+            "user_favorite_count": 0
+        }
+
     **Authentication: token**
 
     **Authorization: same user or admin**
@@ -117,15 +160,115 @@ def remove_favorite(request, username: str, story_id: str):
     if username != curr_user.username and curr_user.is_staff is not True:
         return 401, {"detail": "Unauthorized"}
 
-    isFavorited = User.favorites.through.objects.filter(
-        user_id=username, story_id=story_id).exists()
-
-    if not isFavorited:
+    if not await sync_to_async(delete_favorite)(username, story_id):
         return 404, {"detail": "Favorite not found."}
 
-    story = Story.objects.get(id=story_id)
-    user = User.objects.get(username=username)
+    if view == FAVORITE_VIEW_DELTA:
+        return await afavorite_delta(username, story_id, favorited=False)
+
+    if username == curr_user.username:
+        user = curr_user
+    else:
+        user = await User.objects.aget(username=username)
+
+    return {"user": await auser_for_view(user, view)}
+
+
+@router.post(
+    '/{str:username}/bulk',
+    response={
+        200: FavoriteBulkOutput,
+        400: BadRequest,
+        401: Unauthorized,
+        404: ObjectNotFound
+    },
+    auth=token_header
+)
+async def bulk_favorites(request, username: str, data: FavoriteBulkInput):
+    """
+    Add and remove many stories from a user's favorites at once. User sends
+    up to 1000 story IDs in each list:
+
+        {
+            "add": ["725ff2f9-2cc4-4e29-abab-95b9921f5a6b", ...],
+            "remove": ["0b3f5c2a-6a2e-4f0e-9d8b-2f1d3c4b5a69", ...]
+        }
+
+    All changes are applied in one transaction. On success, returns the
+    outcome for each story ID, in the order sent, and the user's new favorite
+    count:
+
+        {
+            "username": "test",
+            "added": [
+                {
+                    "story_id": "725ff2f9-2cc4-4e29-abab-95b9921f5a6b",
+                    "outcome": "added"
+                },
+                ...
+            ],
+            "removed": [
+                {
+                    "story_id": "0b3f5c2a-6a2e-4f0e-9d8b-2f1d3c4b5a69",
+                    "outcome": "removed"
+                },
+                ...
+            ],
+            "user_favorite_count": 1
+        }
+
+    Outcomes for "added" are "added", "already_favorited", "own_story" or
+    "story_not_found"; for "removed" they are "removed" or "not_favorited".
+
+    On failure if a story ID is in both lists, returns error JSON:
+
+        {
+            "detail": "Story IDs cannot be both added and removed."
+        }
+
+    **Authentication: token**
+
+    **Authorization: same user or admin**
+    """
+    curr_user = request.auth
+
+    if username != curr_user.username and curr_user.is_staff is not True:
+        return 401, {"detail": "Unauthorized"}
+
+    if set(data.add) & set(data.remove):
+        return 400, {"detail": "Story IDs cannot be both added and removed."}
+
+    # this covers the case where the curr_user is staff, but the target user
+    # does not exist:
+    if (
+        username != curr_user.username
+        and not await User.objects.filter(username=username).aexists()
+    ):
+        return 404, {"detail": "User not found."}
+
+    added, removed = await sync_to_async(bulk_update_favorites)(
+        username, data.add, data.remove)
+
+    favorite_count = await User.favorites.through.objects.filter(
+        user_id=username).acount()
+
+    return {
+        "username": username,
+        "added": added,
+        "removed": removed,
+        "user_favorite_count": favorite_count,
+    }
+
+
+async def afavorite_delta(username, story_id, favorited):
+    """Return FavoriteDeltaOutput data for a favorite/unfavorite change."""
 
-    user.favorites.remove(story)
+    favorite_count = await User.favorites.through.objects.filter(
+        user_id=username).acount()
 
-    return {"user": user}
+    return {
+        "username": username,
+        "story_id": story_id,
+        "favorited": favorited,
+        "user_favorite_count": favorite_count,
+    }
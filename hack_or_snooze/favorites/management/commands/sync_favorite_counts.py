@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from favorites.queries import drifted_story_ids, refresh_favorite_counts
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Check Story.favorite_count against the favorites table and repair drift.
+
+    Run once after adding the favorite_count column to backfill it, and
+    periodically to repair counts changed outside the favorites app (for
+    example with QuerySet.update or raw SQL).
+    """
+
+    help = "Recount Story.favorite_count where it doesn't match the favorites."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted stories; don't repair them.",
+        )
+
+    def handle(self, *args, **options):
+        story_ids = drifted_story_ids()
+
+        self.stdout.write(f"{len(story_ids)} stories with drifted counts.")
+
+        if options["check"] or not story_ids:
+            return
+
+        repaired = 0
+
+        for start in range(0, len(story_ids), BATCH_SIZE):
+            repaired += refresh_favorite_counts(
+                story_ids[start:start + BATCH_SIZE]
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} stories."))
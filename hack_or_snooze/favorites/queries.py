@@ -0,0 +1,248 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from stories.cache import bump_story_list_version, invalidate_stories
+from stories.models import Story
+from users.cache import invalidate_story_dependents
+from users.models import User
+
+from .schemas import (
+    BULK_ADDED,
+    BULK_REMOVED,
+    BULK_ALREADY_FAVORITED,
+    BULK_NOT_FAVORITED,
+    BULK_OWN_STORY,
+    BULK_STORY_NOT_FOUND,
+)
+
+
+def insert_favorite(username, story_id):
+    """
+    Add story_id to username's favorites with a single guarded INSERT.
+
+    The row is only inserted if both the user and the story exist, the story
+    was not posted by the user and it isn't already a favorite, so this is
+    safe against concurrent requests for the same favorite.
+
+    Returns True if the favorite was added, otherwise False. Story's
+    favorite_count is incremented in the same transaction.
+
+    NOTE: this bypasses the related manager, so no m2m_changed signal is sent.
+    """
+
+    quote = connection.ops.quote_name
+
+    favorite_table = quote(User.favorites.through._meta.db_table)
+    user_table = quote(User._meta.db_table)
+    story_table = quote(Story._meta.db_table)
+
+    # Both Postgres and SQLite support ON CONFLICT; the WHERE clause is also
+    # required by SQLite to parse INSERT ... SELECT ... ON CONFLICT.
+    sql = f"""
+        INSERT INTO {favorite_table} ("user_id", "story_id")
+        SELECT u."username", s."id"
+        FROM {user_table} u, {story_table} s
+        WHERE u."username" = %s
+            AND s."id" = %s
+            AND s."user_id" <> u."username"
+        ON CONFLICT DO NOTHING
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [username, story_id])
+            inserted = cursor.rowcount == 1
+
+        if inserted:
+            Story.objects.filter(id=story_id).update(
+                favorite_count=F("favorite_count") + 1,
+            )
+            bump_story_list_version()
+            invalidate_stories([story_id])
+            invalidate_story_dependents([story_id])
+
+    return inserted
+
+
+def delete_favorite(username, story_id):
+    """
+    Remove story_id from username's favorites.
+
+    Returns True if the favorite existed, otherwise False. Story's
+    favorite_count is decremented in the same transaction.
+
+    NOTE: this bypasses the related manager, so no m2m_changed signal is sent.
+    """
+
+    with transaction.atomic():
+        deleted, _ = User.favorites.through.objects.filter(
+            user_id=username,
+            story_id=story_id,
+        ).delete()
+
+        if deleted:
+            Story.objects.filter(id=story_id).update(
+                favorite_count=F("favorite_count") - 1,
+            )
+            bump_story_list_version()
+            invalidate_stories([story_id])
+            # username no longer favorites the story, so name them too:
+            invalidate_story_dependents([story_id], [username])
+
+    return bool(deleted)
+
+
+async def afavorite_insert_error(username, story_id):
+    """
+    Explain why insert_favorite added nothing.
+
+    Returns a (status, detail) tuple for the error response.
+    """
+
+    if not await User.objects.filter(username=username).aexists():
+        return 404, "User not found."
+
+    story_user_id = await Story.objects.filter(id=story_id).values_list(
+        "user_id", flat=True).afirst()
+
+    if story_user_id is None:
+        return 404, "Story not found."
+
+    if story_user_id == username:
+        return 400, "Cannot add own user stories to favorites"
+
+    return 400, "Story already favorited."
+
+
+def bulk_update_favorites(username, add_ids, remove_ids):
+    """
+    Add and remove many favorites for username in one transaction.
+
+    Uses a fixed number of queries however many IDs are sent. Adds use
+    bulk_create(ignore_conflicts=True), so a favorite added concurrently by
+    another request is not an error.
+
+    Returns an (added, removed) tuple of [{"story_id", "outcome"}, ...] lists,
+    in the order the IDs were sent. Outcomes come from a read made before the
+    writes, but the changed stories' favorite_count is recounted from the
+    favorites table afterwards (in the same transaction), so a favorite added
+    or removed concurrently by another request is never counted twice.
+
+    NOTE: this bypasses the related manager, so no m2m_changed signal is sent.
+    """
+
+    Favorite = User.favorites.through
+
+    # dict.fromkeys drops repeated IDs but keeps their order:
+    add_ids = list(dict.fromkeys(add_ids))
+    remove_ids = list(dict.fromkeys(remove_ids))
+
+    with transaction.atomic():
+        story_user_ids = dict(
+            Story.objects.filter(id__in=add_ids).values_list("id", "user_id")
+        )
+        favorited_ids = set(
+            Favorite.objects.filter(
+                user_id=username,
+                story_id__in=add_ids + remove_ids,
+            ).values_list("story_id", flat=True)
+        )
+
+        added = []
+        new_favorites = []
+
+        for story_id in add_ids:
+            if story_id not in story_user_ids:
+                outcome = BULK_STORY_NOT_FOUND
+            elif story_user_ids[story_id] == username:
+                outcome = BULK_OWN_STORY
+            elif story_id in favorited_ids:
+                outcome = BULK_ALREADY_FAVORITED
+            else:
+                outcome = BULK_ADDED
+                new_favorites.append(
+                    Favorite(user_id=username, story_id=story_id)
+                )
+
+            added.append({"story_id": story_id, "outcome": outcome})
+
+        removed = []
+        removed_ids = []
+
+        for story_id in remove_ids:
+            if story_id in favorited_ids:
+                outcome = BULK_REMOVED
+                removed_ids.append(story_id)
+            else:
+                outcome = BULK_NOT_FAVORITED
+
+            removed.append({"story_id": story_id, "outcome": outcome})
+
+        Favorite.objects.bulk_create(new_favorites, ignore_conflicts=True)
+        Favorite.objects.filter(
+            user_id=username,
+            story_id__in=removed_ids,
+        ).delete()
+
+        if new_favorites or removed_ids:
+            changed_ids = (
+                [favorite.story_id for favorite in new_favorites]
+                + removed_ids
+            )
+            # Recount rather than applying +1/-1: our read above may be stale
+            # by now, so the rows we wrote aren't necessarily the rows that
+            # changed:
+            Story.objects.filter(id__in=changed_ids).update(
+                favorite_count=actual_favorite_count(),
+            )
+            bump_story_list_version()
+            invalidate_stories(changed_ids)
+            invalidate_story_dependents(changed_ids, [username])
+
+    return added, removed
+
+
+###############################################################################
+# Helper functions to check and repair Story.favorite_count
+
+def actual_favorite_count():
+    """Return an expression counting a story's rows in the favorites table,
+    for use in Story querysets."""
+
+    favorites = User.favorites.through.objects.filter(
+        story_id=OuterRef("pk")
+    ).order_by().values("story_id").annotate(count=Count("*"))
+
+    return Coalesce(Subquery(favorites.values("count")), 0)
+
+
+def drifted_story_ids():
+    """Return IDs of stories whose favorite_count doesn't match the
+    favorites table."""
+
+    return list(
+        Story.objects.annotate(actual=actual_favorite_count())
+        .exclude(favorite_count=F("actual"))
+        .values_list("id", flat=True)
+    )
+
+
+def refresh_favorite_counts(story_ids, usernames=()):
+    """Recount favorite_count from the favorites table for story_ids.
+
+    usernames are users whose favorites changed, whose cached output is
+    dropped along with that of the stories' dependents.
+
+    Returns the number of stories updated."""
+
+    updated = Story.objects.filter(id__in=story_ids).update(
+        favorite_count=actual_favorite_count(),
+    )
+
+    if updated:
+        bump_story_list_version()
+        invalidate_stories(story_ids)
+        invalidate_story_dependents(story_ids, usernames)
+
+    return updated
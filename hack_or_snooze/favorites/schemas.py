@@ -0,0 +1,71 @@
+from typing import List, Literal
+
+from ninja import Schema, Field
+
+from hack_or_snooze.settings import FORBID_EXTRA_FIELDS_KEYWORD
+
+
+# Favorite routes accept the user views ("full", "summary") plus "delta",
+# which acknowledges the change without serializing the user at all:
+FAVORITE_VIEW_DELTA = "delta"
+
+FavoriteView = Literal["full", "summary", "delta"]
+
+
+class FavoriteDeltaOutput(Schema):
+    """Schema for favorite/unfavorite response body with ?view=delta"""
+
+    username: str
+    story_id: str
+    favorited: bool
+    # The user's favorite total, not the story's Story.favorite_count:
+    user_favorite_count: int
+
+
+# Largest number of story IDs accepted in each list of a bulk request:
+MAX_BULK_FAVORITES = 1000
+
+
+class FavoriteBulkInput(Schema):
+    """Schema for POST /favorites/{username}/bulk request body"""
+
+    add: List[str] = Field([], max_length=MAX_BULK_FAVORITES)
+    remove: List[str] = Field([], max_length=MAX_BULK_FAVORITES)
+
+    class Config:
+        extra = FORBID_EXTRA_FIELDS_KEYWORD
+
+
+# Possible outcomes for each story ID in a bulk request:
+BULK_ADDED = "added"
+BULK_REMOVED = "removed"
+BULK_ALREADY_FAVORITED = "already_favorited"
+BULK_NOT_FAVORITED = "not_favorited"
+BULK_OWN_STORY = "own_story"
+BULK_STORY_NOT_FOUND = "story_not_found"
+
+BulkOutcome = Literal[
+    "added",
+    "removed",
+    "already_favorited",
+    "not_favorited",
+    "own_story",
+    "story_not_found",
+]
+
+
+class FavoriteBulkResult(Schema):
+    """Outcome for one story ID in a bulk request"""
+
+    story_id: str
+    outcome: BulkOutcome
+
+
+class FavoriteBulkOutput(Schema):
+    """Schema for POST /favorites/{username}/bulk response body"""
+
+    username: str
+    added: List[FavoriteBulkResult]
+    removed: List[FavoriteBulkResult]
+    # The user's favorite total, not a story's Story.favorite_count:
+    user_favorite_count: int
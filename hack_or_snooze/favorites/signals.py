@@ -0,0 +1,76 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from stories.cache import bump_story_list_version, invalidate_stories
+from stories.models import Story
+from users.cache import invalidate_story_dependents
+from users.models import User
+
+from .queries import refresh_favorite_counts
+
+
+@receiver(m2m_changed, sender=User.favorites.through)
+def update_favorite_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Story.favorite_count in sync when favorites are changed through the
+    related managers (user.favorites / story.favorited_by).
+
+    The favorites API writes to the favorites table directly and updates the
+    counts itself, so this mostly covers the admin, shell and tests.
+    """
+
+    if action == "pre_clear":
+        # Remember which stories (or users) lose a favorite before the rows
+        # are gone:
+        if reverse:
+            instance._cleared_favorited_by = list(
+                instance.favorited_by.values_list("username", flat=True)
+            )
+        else:
+            instance._cleared_favorite_ids = list(
+                instance.favorites.values_list("id", flat=True)
+            )
+        return
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        story_ids = [instance.pk]
+    elif action == "post_clear":
+        story_ids = instance.__dict__.pop("_cleared_favorite_ids", [])
+    else:
+        story_ids = pk_set
+
+    # Users whose favorites changed, who may no longer be found through the
+    # favorites table:
+    if not reverse:
+        usernames = [instance.pk]
+    elif action == "post_clear":
+        usernames = instance.__dict__.pop("_cleared_favorited_by", [])
+    else:
+        usernames = pk_set
+
+    refresh_favorite_counts(story_ids, usernames)
+
+
+@receiver(pre_delete, sender=User)
+def release_favorite_counts(sender, instance, **kwargs):
+    """Decrement favorite_count on stories favorited by a deleted user,
+    before the user's favorites rows are cascade-deleted."""
+
+    story_ids = list(
+        Story.objects.filter(favorited_by=instance).values_list(
+            "id", flat=True)
+    )
+
+    if not story_ids:
+        return
+
+    Story.objects.filter(id__in=story_ids).update(
+        favorite_count=F("favorite_count") - 1,
+    )
+    bump_story_list_version()
+    invalidate_stories(story_ids)
+    invalidate_story_dependents(story_ids)
@@ -1,5 +1,20 @@
+import json
+from unittest import mock
+
 from django.test import TestCase
 
+from hack_or_snooze.testing import (
+    QueryBudgetMixin,
+    make_favorites,
+    make_stories,
+    make_users,
+)
+from favorites.queries import (
+    bulk_update_favorites,
+    delete_favorite,
+    insert_favorite,
+)
+from users.models import User
 from users.factories import UserFactory
 from users.auth_utils import generate_token
 from stories.factories import StoryFactory
@@ -48,6 +63,7 @@ class APIFavoritePostTestCase(TestCase):
                         'modified': '2020-01-01T00:00:00Z',
                         'title': 'test_title',
                         'url': 'http://test.com',
+                        'favorite_count': 1,
                         'username': 'user'
                     }],
                     "username": "user2",
@@ -58,6 +74,20 @@ class APIFavoritePostTestCase(TestCase):
             }
         )
 
+    def test_add_favorite_increments_story_favorite_count(self):
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/favorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+        self.client.post(
+            f'/api/favorites/staffUser/{self.story.id}/favorite',
+            headers={AUTH_KEY: self.staff_user_token},
+        )
+
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.favorite_count, 2)
+
     def test_add_favorite_ok_as_staff(self):
         """ Tests a staff user capable of adding a story to another users
         favorites"""
@@ -82,6 +112,7 @@ class APIFavoritePostTestCase(TestCase):
                         'modified': '2020-01-01T00:00:00Z',
                         'title': 'test_title',
                         'url': 'http://test.com',
+                        'favorite_count': 1,
                         'username': 'user'
                     }],
                     "username": "user2",
@@ -92,6 +123,73 @@ class APIFavoritePostTestCase(TestCase):
             }
         )
 
+    def test_add_favorite_ok_summary_view(self):
+
+        story_id = self.story.id
+
+        response = self.client.post(
+            f'/api/favorites/user2/{story_id}/favorite?view=summary',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "user": {
+                    "story_count": 0,
+                    "story_ids": [],
+                    "favorite_count": 1,
+                    "favorite_ids": [self.story.id],
+                    "username": "user2",
+                    "first_name": "userFirst",
+                    "last_name": "userLast",
+                    "date_joined": "2020-01-01T00:00:00Z"
+                }
+            }
+        )
+
+    def test_add_favorite_ok_delta_view(self):
+
+        story_id = self.story.id
+
+        response = self.client.post(
+            f'/api/favorites/user2/{story_id}/favorite?view=delta',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "username": "user2",
+                "story_id": self.story.id,
+                "favorited": True,
+                "user_favorite_count": 1
+            }
+        )
+
+    def test_add_favorite_query_count_is_constant(self):
+        """Test that adding a favorite doesn't load the user's stories to
+        check ownership."""
+
+        for _ in range(10):
+            StoryFactory(user=self.user_2)
+
+        # Warm the auth cache, so only the endpoint's own queries count:
+        self.client.get('/api/users/user2', headers={AUTH_KEY: self.user2_token})
+
+        # guarded insert, story favorite_count update, users embedding the
+        # story, user favorite count, plus the transaction savepoint and its
+        # release:
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                f'/api/favorites/user2/{self.story.id}/favorite?view=delta',
+                headers={AUTH_KEY: self.user2_token},
+            )
+
+        self.assertEqual(response.status_code, 200)
+
     def test_add_favorite_does_not_add_same_favorite_twice(self):
 
         story_id = self.story.id
@@ -114,6 +212,7 @@ class APIFavoritePostTestCase(TestCase):
                         'modified': '2020-01-01T00:00:00Z',
                         'title': 'test_title',
                         'url': 'http://test.com',
+                        'favorite_count': 1,
                         'username': 'user'
                     }],
                     "username": "user2",
@@ -329,6 +428,16 @@ class APIFavoriteDeleteTestCase(TestCase):
             }
         )
 
+    def test_delete_favorite_decrements_story_favorite_count(self):
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/unfavorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.favorite_count, 0)
+
     def test_delete_favorite_ok_as_staff(self):
 
         # Sanity check: user_2 has at least 1 favorite currently
@@ -356,6 +465,26 @@ class APIFavoriteDeleteTestCase(TestCase):
             }
         )
 
+    def test_delete_favorite_ok_delta_view(self):
+
+        story_id = self.story.id
+
+        response = self.client.post(
+            f'/api/favorites/user2/{story_id}/unfavorite?view=delta',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "username": "user2",
+                "story_id": self.story.id,
+                "favorited": False,
+                "user_favorite_count": 0
+            }
+        )
+
     def test_delete_favorite_does_not_delete_same_favorite_twice(self):
 
         story_id = self.story.id
@@ -519,3 +648,313 @@ class APIFavoriteDeleteTestCase(TestCase):
                 'detail': 'Favorite not found.'
             }
         )
+
+
+class APIFavoriteBulkTestCase(TestCase):
+    """Test POST /favorites/{username}/bulk endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_2 = UserFactory(username="user2")
+        cls.staff_user = UserFactory(username="staffUser", is_staff=True)
+
+        # by default, a story created by StoryFactory was posted by "user":
+        cls.story = StoryFactory()
+        cls.story_2 = StoryFactory()
+        cls.favorited_story = StoryFactory()
+        cls.own_story = StoryFactory(user=cls.user_2)
+
+        cls.user_2.favorites.add(cls.favorited_story)
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.user2_token = generate_token(cls.user_2.username)
+        cls.staff_user_token = generate_token(cls.staff_user.username)
+
+    def test_bulk_favorites_ok_as_self(self):
+
+        response = self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({
+                "add": [
+                    self.story.id,
+                    self.favorited_story.id,
+                    self.own_story.id,
+                    "nonexistent-story-id",
+                ],
+                "remove": [self.story_2.id],
+            }),
+            headers={AUTH_KEY: self.user2_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "username": "user2",
+                "added": [
+                    {"story_id": self.story.id, "outcome": "added"},
+                    {
+                        "story_id": self.favorited_story.id,
+                        "outcome": "already_favorited"
+                    },
+                    {"story_id": self.own_story.id, "outcome": "own_story"},
+                    {
+                        "story_id": "nonexistent-story-id",
+                        "outcome": "story_not_found"
+                    },
+                ],
+                "removed": [
+                    {"story_id": self.story_2.id, "outcome": "not_favorited"},
+                ],
+                "user_favorite_count": 2
+            }
+        )
+
+    def test_bulk_favorites_ok_remove_as_staff(self):
+
+        response = self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({"remove": [self.favorited_story.id]}),
+            headers={AUTH_KEY: self.staff_user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "username": "user2",
+                "added": [],
+                "removed": [
+                    {
+                        "story_id": self.favorited_story.id,
+                        "outcome": "removed"
+                    },
+                ],
+                "user_favorite_count": 0
+            }
+        )
+        self.assertFalse(self.user_2.favorites.exists())
+
+    def test_bulk_favorites_updates_story_favorite_counts(self):
+
+        self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({
+                "add": [self.story.id, self.favorited_story.id],
+                "remove": [self.story_2.id],
+            }),
+            headers={AUTH_KEY: self.user2_token},
+            content_type="application/json"
+        )
+        self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({"remove": [self.favorited_story.id]}),
+            headers={AUTH_KEY: self.user2_token},
+            content_type="application/json"
+        )
+
+        self.story.refresh_from_db()
+        self.story_2.refresh_from_db()
+        self.favorited_story.refresh_from_db()
+
+        self.assertEqual(self.story.favorite_count, 1)
+        self.assertEqual(self.story_2.favorite_count, 0)
+        self.assertEqual(self.favorited_story.favorite_count, 0)
+
+    def test_bulk_favorites_query_count_is_constant(self):
+        stories = [StoryFactory() for _ in range(20)]
+
+        # Warm the auth cache, so only the endpoint's own queries count:
+        self.client.get('/api/users/user2', headers={AUTH_KEY: self.user2_token})
+
+        # stories, existing favorites, insert, delete, story favorite_count
+        # recount, users embedding the stories, user favorite count, plus the
+        # transaction savepoint and its release:
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                '/api/favorites/user2/bulk',
+                data=json.dumps({
+                    "add": [story.id for story in stories],
+                    "remove": [self.favorited_story.id],
+                }),
+                headers={AUTH_KEY: self.user2_token},
+                content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_2.favorites.count(), 20)
+
+    def test_bulk_favorites_concurrent_remove_counted_once(self):
+        """Test a favorite removed by another request between the bulk
+        request's read and its delete doesn't decrement the count twice
+        (which would go below 0)."""
+
+        Favorite = User.favorites.through
+        bulk_create = Favorite.objects.bulk_create
+
+        def remove_concurrently(*args, **kwargs):
+            delete_favorite("user2", self.favorited_story.id)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(
+            Favorite.objects, "bulk_create", side_effect=remove_concurrently
+        ):
+            added, removed = bulk_update_favorites(
+                "user2", [], [self.favorited_story.id]
+            )
+
+        self.favorited_story.refresh_from_db()
+
+        self.assertEqual(removed[0]["outcome"], "removed")
+        self.assertEqual(self.favorited_story.favorite_count, 0)
+
+    def test_bulk_favorites_concurrent_add_counted_once(self):
+        """Test a favorite added by another request between the bulk
+        request's read and its insert isn't counted twice."""
+
+        Favorite = User.favorites.through
+        bulk_create = Favorite.objects.bulk_create
+
+        def add_concurrently(*args, **kwargs):
+            insert_favorite("user2", self.story.id)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(
+            Favorite.objects, "bulk_create", side_effect=add_concurrently
+        ):
+            bulk_update_favorites("user2", [self.story.id], [])
+
+        self.story.refresh_from_db()
+
+        self.assertEqual(self.story.favorite_count, 1)
+
+    def test_bulk_favorites_fail_same_id_added_and_removed(self):
+
+        response = self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({
+                "add": [self.story.id],
+                "remove": [self.story.id],
+            }),
+            headers={AUTH_KEY: self.user2_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            {"detail": "Story IDs cannot be both added and removed."}
+        )
+
+    def test_bulk_favorites_fail_unauthorized_as_different_user(self):
+
+        response = self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({"add": [self.story.id]}),
+            headers={AUTH_KEY: self.user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "detail": "Unauthorized"
+            }
+        )
+
+    def test_bulk_favorites_fail_nonexistent_user_as_staff(self):
+
+        response = self.client.post(
+            '/api/favorites/user3/bulk',
+            data=json.dumps({"add": [self.story.id]}),
+            headers={AUTH_KEY: self.staff_user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertJSONEqual(
+            response.content,
+            {
+                'detail': 'User not found.'
+            }
+        )
+
+
+class APIFavoriteQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test /favorites endpoints make a constant number of queries as the
+    user's stories and favorites grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_token = generate_token(cls.user.username)
+
+    def populate(self, size):
+        """Give the user size stories and size favorites, and return a new
+        story by another user."""
+
+        make_stories(size, [self.user])
+        make_favorites([self.user], make_stories(size, make_users(size)))
+
+        [story] = make_stories(1, make_users(1))
+
+        return story
+
+    def test_add_favorite_query_budget(self):
+        for view in ["full", "summary", "delta"]:
+            with self.subTest(view=view):
+                self.assertQueryBudget(
+                    "favorites_api_add_favorite",
+                    self.populate,
+                    lambda story: self.client.post(
+                        f'/api/favorites/user/{story.id}/favorite'
+                        f'?view={view}',
+                        headers={AUTH_KEY: self.user_token},
+                    ),
+                )
+
+    def test_remove_favorite_query_budget(self):
+        def populate(size):
+            story = self.populate(size)
+            make_favorites([self.user], [story])
+            return story
+
+        for view in ["full", "summary", "delta"]:
+            with self.subTest(view=view):
+                self.assertQueryBudget(
+                    "favorites_api_remove_favorite",
+                    populate,
+                    lambda story: self.client.post(
+                        f'/api/favorites/user/{story.id}/unfavorite'
+                        f'?view={view}',
+                        headers={AUTH_KEY: self.user_token},
+                    ),
+                )
+
+    def test_bulk_favorites_query_budget(self):
+        def populate(size):
+            """Return size stories to add and size favorites to remove."""
+
+            to_add = make_stories(size, make_users(size))
+            to_remove = make_stories(size, make_users(size))
+            make_favorites([self.user], to_remove)
+
+            return to_add, to_remove
+
+        self.assertQueryBudget(
+            "favorites_api_bulk_favorites",
+            populate,
+            lambda stories: self.client.post(
+                '/api/favorites/user/bulk',
+                data={
+                    "add": [story.id for story in stories[0]],
+                    "remove": [story.id for story in stories[1]],
+                },
+                headers={AUTH_KEY: self.user_token},
+                content_type="application/json",
+            ),
+        )
@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from stories.models import Story
+from users.factories import UserFactory
+from stories.factories import StoryFactory
+
+
+class SyncFavoriteCountsTestCase(TestCase):
+    """Test the sync_favorite_counts management command."""
+
+    def setUp(self):
+        self.user_2 = UserFactory(username="user2")
+
+        # by default, a story created by StoryFactory was posted by "user":
+        self.story = StoryFactory()
+        self.story_2 = StoryFactory()
+
+        self.user_2.favorites.add(self.story)
+
+        # QuerySet.update bypasses the favorites app, so the counts drift:
+        Story.objects.filter(id=self.story.id).update(favorite_count=0)
+        Story.objects.filter(id=self.story_2.id).update(favorite_count=5)
+
+    def test_repairs_drifted_counts(self):
+        out = StringIO()
+
+        call_command("sync_favorite_counts", stdout=out)
+
+        self.story.refresh_from_db()
+        self.story_2.refresh_from_db()
+
+        self.assertEqual(self.story.favorite_count, 1)
+        self.assertEqual(self.story_2.favorite_count, 0)
+        self.assertIn("2 stories with drifted counts.", out.getvalue())
+        self.assertIn("Repaired 2 stories.", out.getvalue())
+
+    def test_check_only_reports(self):
+        out = StringIO()
+
+        call_command("sync_favorite_counts", "--check", stdout=out)
+
+        self.story.refresh_from_db()
+
+        self.assertEqual(self.story.favorite_count, 0)
+        self.assertIn("2 stories with drifted counts.", out.getvalue())
@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from users.factories import UserFactory
+from stories.factories import StoryFactory
+
+
+class FavoriteCountSignalsTestCase(TestCase):
+    """Test Story.favorite_count is kept in sync by signal receivers."""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.user_2 = UserFactory(username="user2")
+
+        # by default, a story created by StoryFactory was posted by "user":
+        self.story = StoryFactory()
+        self.story_2 = StoryFactory()
+
+    def assertFavoriteCounts(self, *counts):
+        self.story.refresh_from_db()
+        self.story_2.refresh_from_db()
+
+        self.assertEqual(
+            (self.story.favorite_count, self.story_2.favorite_count),
+            counts
+        )
+
+    def test_add_and_remove_through_user_favorites(self):
+        self.user_2.favorites.add(self.story, self.story_2)
+        self.assertFavoriteCounts(1, 1)
+
+        # Adding an existing favorite again doesn't count twice:
+        self.user_2.favorites.add(self.story)
+        self.assertFavoriteCounts(1, 1)
+
+        self.user_2.favorites.remove(self.story)
+        self.assertFavoriteCounts(0, 1)
+
+    def test_clear_user_favorites(self):
+        self.user_2.favorites.add(self.story, self.story_2)
+
+        self.user_2.favorites.clear()
+
+        self.assertFavoriteCounts(0, 0)
+
+    def test_add_and_clear_through_story_favorited_by(self):
+        staff_user = UserFactory(username="staffUser", is_staff=True)
+
+        self.story.favorited_by.add(self.user_2, staff_user)
+        self.assertFavoriteCounts(2, 0)
+
+        self.story.favorited_by.clear()
+        self.assertFavoriteCounts(0, 0)
+
+    def test_delete_user(self):
+        self.user_2.favorites.add(self.story, self.story_2)
+
+        self.user_2.delete()
+
+        self.assertFavoriteCounts(0, 0)
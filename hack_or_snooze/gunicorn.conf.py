@@ -0,0 +1,26 @@
+# Gunicorn reads this file when started from this directory.
+
+import glob
+import os
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    """Start with an empty metrics directory, so that counts from previous
+    runs aren't included in /api/metrics."""
+
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    if path:
+        os.makedirs(path, exist_ok=True)
+
+        for db_file in glob.glob(os.path.join(path, "*.db")):
+            os.remove(db_file)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from /api/metrics."""
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,19 @@
+from django.conf import settings
+from django.http import HttpResponse
 from ninja import NinjaAPI
 
 from stories.api import router as stories_router
 from users.api import router as users_router
+from users.auth_utils import token_header
 from favorites.api import router as favorites_router
 
-from hack_or_snooze.exceptions import InvalidUsernameException
+from hack_or_snooze.error_schemas import Unauthorized
+from hack_or_snooze.exceptions import (
+    InvalidUsernameException,
+    PasswordHashingOverloadedException,
+)
+from hack_or_snooze.metrics import metrics_bearer, render_metrics
+from hack_or_snooze.renderers import FastJSONRenderer
 
 description = """
 How to Use This API
@@ -42,8 +51,8 @@ of this documentation for usage in these interactive endpoints.
 
 api = NinjaAPI(
     title="Hack Or Snooze API",
-    description=description
-
+    description=description,
+    renderer=FastJSONRenderer(),
 )
 
 
@@ -52,6 +61,30 @@ api.add_router("/stories/", stories_router)
 api.add_router("/favorites/", favorites_router)
 
 
+@api.get(
+    "/metrics",
+    include_in_schema=False,
+    response={401: Unauthorized},
+    auth=[metrics_bearer, token_header],
+)
+def metrics(request):
+    """
+    Prometheus metrics for all worker processes (see metrics.py).
+
+    **Authentication: METRICS_TOKEN bearer, or token**
+
+    **Authorization: admin**
+    """
+
+    # metrics_bearer authenticates as True; token_header as a user:
+    if request.auth is not True and request.auth.is_staff is not True:
+        return 401, {"detail": "Unauthorized"}
+
+    content, content_type = render_metrics()
+
+    return HttpResponse(content, content_type=content_type)
+
+
 # Handle exceptions raised in the validators themselves:
 @api.exception_handler(InvalidUsernameException)
 def on_invalid_username(request, exc):
@@ -61,3 +94,16 @@ def on_invalid_username(request, exc):
         {"detail": exc.message},
         status=400
     )
+
+
+@api.exception_handler(PasswordHashingOverloadedException)
+def on_password_hashing_overloaded(request, exc):
+    """Custom exception handler for a full password hashing pool."""
+    response = api.create_response(
+        request,
+        {"detail": exc.message},
+        status=503
+    )
+    response["Retry-After"] = str(settings.PASSWORD_HASHING_RETRY_AFTER)
+
+    return response
@@ -19,3 +19,9 @@ class ObjectNotFound(Schema):
     """Schema for 404 Not Found response."""
 
     detail: str
+
+
+class ServiceUnavailable(Schema):
+    """Schema for 503 Service Unavailable response."""
+
+    detail: str
@@ -6,3 +6,33 @@ class InvalidUsernameException(Exception):
 
     def __str__(self):
         return self.message
+
+
+class InvalidCursorException(Exception):
+    """Exception for malformed pagination cursor."""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class PasswordHashingOverloadedException(Exception):
+    """Exception for password hashing requests beyond the pool's capacity."""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidFieldsException(Exception):
+    """Exception for unknown fields requested in a sparse fieldset."""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
@@ -0,0 +1,126 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from ninja.security import HttpBearer
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .timing import HISTOGRAM_BUCKETS_MS
+
+# Prometheus metrics for GET /api/metrics.
+#
+# With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty,
+# writable directory shared by all of them (and wiped on restart; see
+# gunicorn.conf.py). Each process then writes its metrics there and a scrape
+# of any worker aggregates all of them.
+
+http_requests = Counter(
+    "hack_or_snooze_http_requests_total",
+    "HTTP requests, by ninja operation, method and response status.",
+    ["operation", "method", "status"],
+)
+
+http_request_duration = Histogram(
+    "hack_or_snooze_http_request_duration_seconds",
+    "HTTP request latency, by ninja operation.",
+    ["operation"],
+    buckets=[ms / 1000 for ms in HISTOGRAM_BUCKETS_MS],
+)
+
+auth_cache_lookups = Counter(
+    "hack_or_snooze_auth_cache_lookups_total",
+    "Authenticated user cache lookups, by result (hit or miss).",
+    ["result"],
+)
+
+story_cache_lookups = Counter(
+    "hack_or_snooze_story_cache_lookups_total",
+    "Single story cache lookups, by result (hit, not_found_hit for a cached "
+    "404, or miss).",
+    ["result"],
+)
+
+db_connections_opened = Counter(
+    "hack_or_snooze_db_connections_opened_total",
+    "Database connections opened. Compare with requests to see how often "
+    "persistent connections (CONN_MAX_AGE) are reused.",
+    ["alias"],
+)
+
+password_hashing_active = Gauge(
+    "hack_or_snooze_password_hashing_active",
+    "Password hashing jobs running.",
+    multiprocess_mode="livesum",
+)
+
+password_hashing_queued = Gauge(
+    "hack_or_snooze_password_hashing_queued",
+    "Password hashing jobs waiting for a worker.",
+    multiprocess_mode="livesum",
+)
+
+password_hashing_rejected = Counter(
+    "hack_or_snooze_password_hashing_rejected_total",
+    "Password hashing jobs rejected because the pool was full.",
+)
+
+
+def observe_request(operation, method, status, seconds):
+    """Record one finished request."""
+
+    http_requests.labels(operation, method, status).inc()
+    http_request_duration.labels(operation).observe(seconds)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    db_connections_opened.labels(connection.alias).inc()
+
+
+connection_created.connect(
+    on_connection_created,
+    dispatch_uid="hack_or_snooze.metrics.db_connections_opened",
+)
+
+
+def render_metrics():
+    """
+    Return (content, content_type) for the metrics of every worker process
+    in Prometheus' text exposition format.
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsBearer(HttpBearer):
+    """Authenticate scrapers of GET /api/metrics by the METRICS_TOKEN
+    secret."""
+
+    def authenticate(self, request, token):
+        """Return True if token is METRICS_TOKEN, otherwise None. Always
+        None if METRICS_TOKEN isn't set."""
+
+        expected = settings.METRICS_TOKEN
+
+        if expected and hmac.compare_digest(token.encode(), expected.encode()):
+            return True
+
+        return None
+
+
+metrics_bearer = MetricsBearer()
@@ -0,0 +1,141 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import observe_request
+from .timing import (
+    RequestTimings,
+    current_timings,
+    install_query_recorders,
+    request_timings,
+    TIMING_TOTAL,
+    TIMING_DB,
+    TIMING_SERIALIZE,
+)
+
+UNMATCHED_OPERATION = "unmatched"
+
+
+class RequestTimingMiddleware:
+    """
+    Record every request's latency and status in the Prometheus metrics, and
+    query count, DB time and serialization time for a sample of requests
+    (REQUEST_TIMING_SAMPLE_RATE).
+
+    Sampled requests are added to the in-process request_timings histogram,
+    keyed by ninja operation ID, and get a Server-Timing header unless
+    REQUEST_TIMING_HEADER is off.
+
+    Put this first in MIDDLEWARE so that total latency covers the rest of the
+    stack. For streaming responses it stops at the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.header = settings.REQUEST_TIMING_HEADER
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+        install_query_recorders()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings() if self.sampled() else None
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        return self.record(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings() if self.sampled() else None
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        return self.record(request, response, timings, start)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, request, response, timings, start):
+        """Add the request's timings to the metrics, histogram and response.
+        timings is None for unsampled requests."""
+
+        seconds = time.perf_counter() - start
+        operation = operation_id(request)
+
+        observe_request(
+            operation,
+            request.method,
+            response.status_code,
+            seconds,
+        )
+
+        if timings is None:
+            return response
+
+        timings_ms = {
+            TIMING_TOTAL: seconds * 1000,
+            TIMING_DB: timings.db_seconds * 1000,
+            TIMING_SERIALIZE: timings.serialize_seconds * 1000,
+        }
+
+        request_timings.observe(operation, timings_ms, timings.queries)
+
+        if self.header:
+            response["Server-Timing"] = server_timing(timings_ms, timings)
+
+        return response
+
+
+def operation_id(request):
+    """
+    Return the ninja operation ID (as in the OpenAPI schema, e.g.
+    "stories_api_get_story") of the view that handled request.
+
+    Non-ninja views are keyed by their URL name, and requests that didn't
+    resolve by UNMATCHED_OPERATION.
+    """
+
+    match = getattr(request, "resolver_match", None)
+
+    if match is None:
+        return UNMATCHED_OPERATION
+
+    # Ninja routes resolve to a bound method of their PathView:
+    path_view = getattr(match.func, "__self__", None)
+
+    for operation in getattr(path_view, "operations", ()):
+        if request.method in operation.methods:
+            return operation.api.get_openapi_operation_id(operation)
+
+    return match.view_name
+
+
+def server_timing(timings_ms, timings):
+    """Format a Server-Timing header value."""
+
+    return (
+        f'{TIMING_DB};desc="{timings.queries} queries"'
+        f';dur={timings_ms[TIMING_DB]:.1f}, '
+        f'{TIMING_SERIALIZE};dur={timings_ms[TIMING_SERIALIZE]:.1f}, '
+        f'{TIMING_TOTAL};dur={timings_ms[TIMING_TOTAL]:.1f}'
+    )
@@ -18,7 +18,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 print("Base dir?", BASE_DIR)
 
 # Support env variables from .env file if defined
+import hashlib
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 env_path = load_dotenv(os.path.join(BASE_DIR, '.env'))
 load_dotenv(env_path)
@@ -55,6 +58,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    # First, so that its total latency covers the rest of the stack:
+    'hack_or_snooze.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,6 +103,38 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Defaults to a file-based cache, which works offline and is shared by all
+# worker processes on one machine (cache invalidation only reaches processes
+# sharing the cache). Point these at memcached/redis to share across machines.
+# The default directory is named after this checkout, so that checkouts don't
+# share a cache.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION',
+            os.path.join(
+                tempfile.gettempdir(),
+                'hack_or_snooze_cache_'
+                + hashlib.md5(str(BASE_DIR).encode()).hexdigest()[:12])),
+    }
+}
+
+# "manage.py test" gets an in-memory cache per process, so that tests neither
+# read nor clear the cache of a server running from the same checkout:
+if sys.argv[1:2] == ['test']:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -149,4 +186,86 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 #######################################
 # Django Ninja configuration keywords
 
-FORBID_EXTRA_FIELDS_KEYWORD = "forbid"
\ No newline at end of file
+FORBID_EXTRA_FIELDS_KEYWORD = "forbid"
+
+#######################################
+# Auth configuration
+
+# Authenticated users are cached in-process by token, so that steady-state
+# authenticated requests don't hit the database. Each hit checks the user's
+# generation in the shared cache (CACHES above), so that changes made in any
+# worker take effect on the next request. Set either value to 0 to disable
+# the cache.
+AUTH_USER_CACHE_MAX_SIZE = int(
+    os.environ.get('AUTH_USER_CACHE_MAX_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+
+# Password hashing (signup, login, password changes) runs on a dedicated
+# thread pool of this many workers per process, with at most
+# PASSWORD_HASHING_MAX_PENDING more requests waiting for a worker. Requests
+# beyond that get a 503 with a Retry-After of PASSWORD_HASHING_RETRY_AFTER
+# seconds.
+PASSWORD_HASHING_WORKERS = int(
+    os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.environ.get('PASSWORD_HASHING_MAX_PENDING', 32))
+PASSWORD_HASHING_RETRY_AFTER = int(
+    os.environ.get('PASSWORD_HASHING_RETRY_AFTER', 1))
+
+
+#######################################
+# Request timing configuration
+
+# Fraction of requests (0 to 1) whose query count, DB time, serialization time
+# and latency are recorded by RequestTimingMiddleware. Set to 0 to disable.
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 1.0))
+
+# Whether sampled responses include a Server-Timing header with those timings.
+REQUEST_TIMING_HEADER = os.environ.get('REQUEST_TIMING_HEADER', '') != 'False'
+
+# GET /api/metrics serves Prometheus metrics. When running several worker
+# processes, set the PROMETHEUS_MULTIPROC_DIR environment variable (read by
+# prometheus_client itself) to a directory shared by all workers, so that each
+# scrape aggregates every worker rather than returning one worker's counts.
+
+# GET /api/metrics requires a staff user's token, or this secret sent as an
+# "Authorization: Bearer <METRICS_TOKEN>" header (as set by Prometheus's
+# "authorization" scrape config). Leave empty to allow staff tokens only.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+#######################################
+# Story cache configuration
+
+# Seconds to keep the rendered GET /api/stories/ response. Writes to stories
+# invalidate it immediately; the TTL is only a backstop. Set to 0 to disable.
+STORY_LIST_CACHE_TTL = int(os.environ.get('STORY_LIST_CACHE_TTL', 300))
+
+# Seconds to keep each story read by GET /api/stories/{story_id}. Writes to
+# the story invalidate it immediately. Set to 0 to disable.
+STORY_CACHE_TTL = int(os.environ.get('STORY_CACHE_TTL', 300))
+
+# Seconds to remember that a story ID doesn't exist, so repeated lookups of
+# missing stories don't reach the database. Set to 0 to disable.
+STORY_NOT_FOUND_CACHE_TTL = int(
+    os.environ.get('STORY_NOT_FOUND_CACHE_TTL', 5))
+
+
+#######################################
+# Story search configuration
+
+# How many of the best matches GET /api/stories/search pages through. Search
+# pages by offset, so this bounds how deep a cursor can make the database
+# scan; cursors past it are rejected.
+STORY_SEARCH_MAX_RESULTS = int(
+    os.environ.get('STORY_SEARCH_MAX_RESULTS', 1000))
+
+
+#######################################
+# User cache configuration
+
+# Seconds to keep the rendered GET /api/users/{username} response. Changes to
+# the user, their stories, their favorites or stories they favorited
+# invalidate it immediately; the TTL is only a backstop. Set to 0 to disable.
+USER_OUTPUT_CACHE_TTL = int(os.environ.get('USER_OUTPUT_CACHE_TTL', 300))
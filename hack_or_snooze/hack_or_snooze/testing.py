@@ -0,0 +1,148 @@
+"""Test helpers shared by the apps' test suites."""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stories.models import Story
+from users.auth_utils import user_cache
+from users.models import User
+
+# Dataset sizes each endpoint's query count is measured at. The count must
+# be the same at every size: a query per story or favorite is an N+1.
+QUERY_BUDGET_SIZES = (1, 10, 100)
+
+# Most queries each route may make, keyed by ninja operation ID (see
+# hack_or_snooze.middleware.operation_id), with the auth and story list
+# caches cold. Inside a test's transaction, transaction.atomic() shows up as
+# a savepoint and its release. Every route in hack_or_snooze.api must have a
+# budget.
+QUERY_BUDGETS = {
+    "hack_or_snooze_api_metrics": 0,
+    # auth user, insert:
+    "stories_api_create_story": 2,
+    # ETag watermark, stories:
+    "stories_api_get_stories": 2,
+    # ranked matches:
+    "stories_api_search_stories": 1,
+    # story:
+    "stories_api_get_story": 1,
+    # auth user, story, users embedding it, delete favorites, delete story:
+    "stories_api_delete_story": 5,
+    # savepoint, insert, release, stories, favorites:
+    "users_api_signup": 5,
+    # user, stories, favorites:
+    "users_api_login": 3,
+    # auth user, user, stories, favorites:
+    "users_api_get_user": 4,
+    # auth user, patched columns, update, then re-rendering the dropped
+    # output: user, stories, favorites:
+    "users_api_update_user": 6,
+    # auth user, savepoint, insert, count update, users embedding the story,
+    # release, stories, favorites:
+    "favorites_api_add_favorite": 8,
+    # auth user, savepoint, delete, count update, users embedding the story,
+    # release, stories, favorites:
+    "favorites_api_remove_favorite": 8,
+    # auth user, savepoint, stories, favorites, insert, delete, count
+    # recount, users embedding the stories, release, favorite count:
+    "favorites_api_bulk_favorites": 10,
+}
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin to check that an endpoint stays within its QUERY_BUDGETS
+    entry, and makes the same number of queries at every size in
+    QUERY_BUDGET_SIZES.
+    """
+
+    def assertQueryBudget(self, operation, populate, request):
+        """
+        For each size, call populate(size) to set up data of that size, then
+        pass its result to request, which makes one request to operation and
+        returns the response.
+
+        Caches are cleared before each request, so budgets are worst cases.
+        """
+
+        budget = QUERY_BUDGETS[operation]
+        counts = {}
+
+        for size in QUERY_BUDGET_SIZES:
+            data = populate(size)
+
+            cache.clear()
+            user_cache.clear()
+
+            with CaptureQueriesContext(connection) as queries:
+                response = request(data)
+
+                # Streamed responses query as they're consumed:
+                if response.streaming:
+                    content = b"".join(response.streaming_content)
+                else:
+                    content = response.content
+
+            self.assertLess(
+                response.status_code,
+                400,
+                f"{operation} failed at size {size}: {content!r}",
+            )
+            self.assertLessEqual(
+                len(queries),
+                budget,
+                f"{operation} made {len(queries)} queries at size {size}, "
+                f"over its budget of {budget}:\n"
+                + "\n".join(query["sql"] for query in queries.captured_queries),
+            )
+
+            counts[size] = len(queries)
+
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"{operation} query count grows with data size: {counts}",
+        )
+
+
+def make_users(count):
+    """Create count users with unusable passwords, skipping hashing."""
+
+    return User.objects.bulk_create([
+        User(username=f"budget_{uuid.uuid4().hex[:12]}")
+        for _ in range(count)
+    ])
+
+
+def make_stories(count, users):
+    """Create count stories, posted by users in turn."""
+
+    return Story.objects.bulk_create([
+        Story(
+            user=users[n % len(users)],
+            author="test_author",
+            title=f"test_title {n}",
+            url="http://test.com",
+        )
+        for n in range(count)
+    ])
+
+
+def make_favorites(users, stories):
+    """Have each user favorite each story, keeping favorite counts right."""
+
+    Favorite = User.favorites.through
+
+    Favorite.objects.bulk_create([
+        Favorite(user=user, story=story)
+        for user in users
+        for story in stories
+    ])
+
+    for story in stories:
+        story.favorite_count += len(users)
+
+    Story.objects.bulk_update(stories, ["favorite_count"])
@@ -0,0 +1,163 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from prometheus_client import REGISTRY
+
+from stories.factories import StoryFactory
+from users.factories import UserFactory
+from users.auth_utils import generate_token, user_cache
+from hack_or_snooze.metrics import render_metrics
+
+AUTH_KEY = 'token'
+
+# Run in a separate process, so that it writes to PROMETHEUS_MULTIPROC_DIR:
+WORKER_SCRIPT = """
+from prometheus_client import Counter
+Counter("worker_requests_total", "Test counter.").inc()
+"""
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsEndpointTestCase(TestCase):
+    """Test GET /api/metrics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.staff_user = UserFactory(username="staffUser", is_staff=True)
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.staff_user_token = generate_token(cls.staff_user.username)
+
+        cls.story = StoryFactory()
+
+    def setUp(self):
+        user_cache.clear()
+
+    def test_metrics_in_text_format(self):
+        self.client.get(f'/api/stories/{self.story.id}')
+
+        response = self.client.get(
+            '/api/metrics',
+            headers={AUTH_KEY: self.staff_user_token}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'hack_or_snooze_http_requests_total{method="GET",'
+            b'operation="stories_api_get_story",status="200"}',
+            response.content
+        )
+
+    def test_metrics_fail_unauthorized_no_token(self):
+        response = self.client.get('/api/metrics')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(response.content, {"detail": "Unauthorized"})
+
+    def test_metrics_fail_unauthorized_not_staff(self):
+        response = self.client.get(
+            '/api/metrics',
+            headers={AUTH_KEY: self.user_token}
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(response.content, {"detail": "Unauthorized"})
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_ok_with_metrics_token(self):
+        response = self.client.get(
+            '/api/metrics',
+            headers={"Authorization": "Bearer scrape-secret"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_fail_wrong_metrics_token(self):
+        response = self.client.get(
+            '/api/metrics',
+            headers={"Authorization": "Bearer wrong-secret"}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_metrics_fail_metrics_token_unset(self):
+        response = self.client.get(
+            '/api/metrics',
+            headers={"Authorization": "Bearer "}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_requests_counted_per_status(self):
+        labels = {
+            "operation": "stories_api_get_story",
+            "method": "GET",
+        }
+        ok = sample(
+            "hack_or_snooze_http_requests_total", status="200", **labels)
+        not_found = sample(
+            "hack_or_snooze_http_requests_total", status="404", **labels)
+
+        self.client.get(f'/api/stories/{self.story.id}')
+        self.client.get('/api/stories/nonexistent')
+
+        self.assertEqual(
+            sample("hack_or_snooze_http_requests_total", status="200",
+                   **labels),
+            ok + 1
+        )
+        self.assertEqual(
+            sample("hack_or_snooze_http_requests_total", status="404",
+                   **labels),
+            not_found + 1
+        )
+
+    def test_auth_cache_hits_and_misses_counted(self):
+        hits = sample("hack_or_snooze_auth_cache_lookups_total", result="hit")
+        misses = sample(
+            "hack_or_snooze_auth_cache_lookups_total", result="miss")
+
+        for _ in range(3):
+            self.client.get(
+                '/api/users/user',
+                headers={AUTH_KEY: self.user_token}
+            )
+
+        self.assertEqual(
+            sample("hack_or_snooze_auth_cache_lookups_total", result="hit"),
+            hits + 2
+        )
+        self.assertEqual(
+            sample("hack_or_snooze_auth_cache_lookups_total", result="miss"),
+            misses + 1
+        )
+
+
+class MultiProcessMetricsTestCase(SimpleTestCase):
+    """Test render_metrics aggregates across worker processes."""
+
+    def test_aggregates_worker_processes(self):
+        with tempfile.TemporaryDirectory() as path:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": path}
+
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", WORKER_SCRIPT],
+                    env=env,
+                    check=True,
+                )
+
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": path}):
+                content, _ = render_metrics()
+
+        self.assertIn(b"worker_requests_total 2.0", content)
@@ -0,0 +1,79 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from stories.factories import StoryFactory
+from hack_or_snooze.timing import request_timings
+
+SERVER_TIMING_PATTERN = re.compile(
+    r'^db;desc="(\d+) queries";dur=[\d.]+, '
+    r'serialize;dur=[\d.]+, total;dur=[\d.]+$'
+)
+
+
+class RequestTimingMiddlewareTestCase(TestCase):
+    """Test RequestTimingMiddleware records per-operation timings."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.story = StoryFactory()
+
+    def setUp(self):
+        cache.clear()
+        request_timings.clear()
+
+    def test_server_timing_header_counts_queries(self):
+        response = self.client.get(f'/api/stories/{self.story.id}')
+
+        match = SERVER_TIMING_PATTERN.match(response["Server-Timing"])
+
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), "1")
+
+    def test_histogram_keyed_by_operation(self):
+        self.client.get(f'/api/stories/{self.story.id}')
+        self.client.get(f'/api/stories/{self.story.id}')
+        self.client.get('/api/stories/')
+
+        snapshot = request_timings.snapshot()
+
+        story = snapshot["stories_api_get_story"]
+        self.assertEqual(story["requests"], 2)
+        # The second request is served from the story cache:
+        self.assertEqual(story["queries"], 1)
+        self.assertEqual(sum(story["timings"]["total"]["counts"]), 2)
+        self.assertIn("stories_api_get_stories", snapshot)
+
+    def test_serialize_time_recorded(self):
+        self.client.get('/api/stories/')
+
+        timings = request_timings.snapshot()["stories_api_get_stories"]
+
+        self.assertGreater(timings["timings"]["serialize"]["sum"], 0)
+
+    def test_unmatched_requests(self):
+        self.client.get('/not-a-route')
+
+        self.assertIn("unmatched", request_timings.snapshot())
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_not_recorded(self):
+        response = self.client.get(f'/api/stories/{self.story.id}')
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(request_timings.snapshot(), {})
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_can_be_disabled(self):
+        response = self.client.get(f'/api/stories/{self.story.id}')
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertIn("stories_api_get_story", request_timings.snapshot())
+
+    async def test_records_under_asgi(self):
+        response = await self.async_client.get(f'/api/stories/{self.story.id}')
+
+        match = SERVER_TIMING_PATTERN.match(response["Server-Timing"])
+
+        self.assertEqual(match.group(1), "1")
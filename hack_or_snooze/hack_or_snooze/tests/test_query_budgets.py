@@ -0,0 +1,33 @@
+from django.test import TestCase, override_settings
+
+from hack_or_snooze.api import api
+from hack_or_snooze.testing import QUERY_BUDGETS, QueryBudgetMixin
+
+
+class QueryBudgetCoverageTestCase(TestCase):
+    """Test every API route has a query budget."""
+
+    def test_every_route_has_a_budget(self):
+        operations = {
+            api.get_openapi_operation_id(operation)
+            for _, router in api._routers
+            for path_view in router.path_operations.values()
+            for operation in path_view.operations
+        }
+
+        self.assertEqual(set(QUERY_BUDGETS), operations)
+
+
+class APIMetricsQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test GET /metrics makes no queries."""
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_get_metrics_query_budget(self):
+        self.assertQueryBudget(
+            "hack_or_snooze_api_metrics",
+            lambda size: None,
+            lambda _: self.client.get(
+                '/api/metrics',
+                headers={"Authorization": "Bearer scrape-secret"}
+            ),
+        )
@@ -0,0 +1,53 @@
+import json
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from ninja.renderers import JSONRenderer
+
+from hack_or_snooze.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+    """Test FastJSONRenderer renders the same values as ninja's renderer."""
+
+    data = {
+        "stories": [
+            {
+                "id": "1",
+                "title": "café ☕",
+                "created": datetime.datetime(
+                    2020, 1, 1, 0, 0, 0, 123456,
+                    tzinfo=datetime.timezone.utc
+                ),
+                "modified": datetime.datetime(
+                    2020, 1, 1, 0, 0, 0,
+                    tzinfo=datetime.timezone(datetime.timedelta(hours=-5))
+                ),
+                "date": datetime.date(2020, 1, 1),
+                "score": Decimal("1.50"),
+                "favorite_count": 0,
+            }
+        ],
+        1: None,
+    }
+
+    def render(self, renderer):
+        return renderer.render(None, self.data, response_status=200)
+
+    def test_matches_stdlib_renderer(self):
+        fast = json.loads(self.render(FastJSONRenderer()))
+        stdlib = json.loads(self.render(JSONRenderer()))
+
+        self.assertEqual(fast, stdlib)
+        self.assertEqual(
+            fast["stories"][0]["created"],
+            "2020-01-01T00:00:00.123Z"
+        )
+
+    def test_falls_back_to_stdlib_without_orjson(self):
+        with mock.patch("hack_or_snooze.renderers.orjson", None):
+            rendered = self.render(FastJSONRenderer())
+
+        self.assertEqual(rendered, self.render(JSONRenderer()))
@@ -0,0 +1,144 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Upper bounds, in milliseconds, of the latency histogram buckets. Anything
+# slower lands in a final overflow bucket.
+HISTOGRAM_BUCKETS_MS = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+# Timings recorded per request:
+TIMING_TOTAL = "total"
+TIMING_DB = "db"
+TIMING_SERIALIZE = "serialize"
+
+
+class RequestTimings:
+    """Query count and DB/serialization time for the current request."""
+
+    __slots__ = ("queries", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+# Set by RequestTimingMiddleware for sampled requests only. Context variables
+# follow the request into sync_to_async threads, so queries run there are
+# counted too.
+current_timings = ContextVar("current_timings", default=None)
+
+
+class TimingHistogram:
+    """
+    Thread-safe, in-process latency histograms keyed by operation and timing
+    name (total, db, serialize), plus request and query counts.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, timings_ms, queries):
+        """Record one request's timings (name -> milliseconds) and query
+        count under operation."""
+
+        with self._lock:
+            entry = self._operations.get(operation)
+
+            if entry is None:
+                entry = self._operations[operation] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "timings": {},
+                }
+
+            entry["requests"] += 1
+            entry["queries"] += queries
+
+            for name, ms in timings_ms.items():
+                timing = entry["timings"].get(name)
+
+                if timing is None:
+                    timing = entry["timings"][name] = {
+                        "counts": [0] * (len(self.buckets) + 1),
+                        "sum": 0.0,
+                    }
+
+                timing["counts"][bisect.bisect_left(self.buckets, ms)] += 1
+                timing["sum"] += ms
+
+    def snapshot(self):
+        """Return a deep copy of the recorded data, keyed by operation."""
+
+        with self._lock:
+            return {
+                operation: {
+                    "requests": entry["requests"],
+                    "queries": entry["queries"],
+                    "timings": {
+                        name: {
+                            "counts": list(timing["counts"]),
+                            "sum": timing["sum"],
+                        }
+                        for name, timing in entry["timings"].items()
+                    },
+                }
+                for operation, entry in self._operations.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._operations.clear()
+
+
+request_timings = TimingHistogram()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and DB time for the current
+    sampled request. Costs one context variable lookup otherwise."""
+
+    timings = current_timings.get()
+
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(connection):
+    """Add record_query to connection's execute wrappers, once."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+def install_query_recorders():
+    """Record queries on every connection opened from now on, and on this
+    thread's already open connections."""
+
+    connection_created.connect(
+        on_connection_created,
+        dispatch_uid="hack_or_snooze.timing.record_query",
+    )
+
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
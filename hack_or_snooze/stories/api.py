@@ -1,17 +1,51 @@
-from django.shortcuts import get_object_or_404
+from datetime import datetime
 
-from ninja import Router
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
 
-from hack_or_snooze.error_schemas import Unauthorized
+from ninja import Router, Query
+
+from hack_or_snooze.error_schemas import BadRequest, Unauthorized
+from hack_or_snooze.exceptions import (
+    InvalidCursorException,
+    InvalidFieldsException,
+)
 
 from users.auth_utils import token_header
 
 from .models import Story
+from .cache import cached_story, cached_story_list
+from .etags import (
+    cached_story_list_etag,
+    is_conditional,
+    not_modified_response,
+    story_etag,
+    story_list_etag,
+)
+from .fields import (
+    parse_fields,
+    source_fields,
+    sparse_row,
+    sparse_story,
+    sparse_values,
+)
+from .filters import STORY_ORDERINGS, StoryOrdering, filter_stories
+from .pagination import (
+    DEFAULT_PAGE_LIMIT,
+    KEYSET_ORDERING,
+    MAX_PAGE_LIMIT,
+    paginate_stories,
+)
+from .search import MAX_SEARCH_LENGTH, find_stories
+from .streaming import stream_stories, astream_stories
 from .schemas import (
     StoryPostInput,
     StoryPostOutput,
     StoryGetAllOutput,
     StoryGetOutput,
+    StorySearchOutput,
     StoryDeleteOutput,
 )
 
@@ -23,7 +57,7 @@ router = Router()
     response=StoryPostOutput,
     auth=token_header
 )
-def create_story(request, data: StoryPostInput):
+async def create_story(request, data: StoryPostInput):
     """
     Create a story.
 
@@ -37,7 +71,8 @@ def create_story(request, data: StoryPostInput):
                 "author": "testauthor",
                 "url": "test.com",
                 "created": "2000-01-01T00:00:00Z",
-                "modified": "2000-01-01T00:00:00Z"
+                "modified": "2000-01-01T00:00:00Z",
+                "favorite_count": 0
             }
         }
 
@@ -49,16 +84,27 @@ def create_story(request, data: StoryPostInput):
     curr_user = request.auth
     story_data = data.dict()
 
-    story = Story.objects.create(user=curr_user, **story_data)
+    story = await Story.objects.acreate(user=curr_user, **story_data)
 
     return {"story": story}
 
 
 @router.get(
     '/',
-    response=StoryGetAllOutput,
+    response={200: StoryGetAllOutput, 400: BadRequest},
 )
-def get_stories(request):
+async def get_stories(
+    request,
+    limit: int = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = None,
+    stream: bool = False,
+    username: str = None,
+    author: str = None,
+    created_after: datetime = None,
+    created_before: datetime = None,
+    ordering: StoryOrdering = None,
+    fields: str = None,
+):
     """
     Get all stories.
 
@@ -68,6 +114,40 @@ def get_stories(request):
             "stories": [Story, Story...]
         }
 
+    Optionally, send "limit" and/or "cursor" query parameters to get the
+    stories one page at a time, newest first. Paginated responses include a
+    cursor for the next page, which is null on the last page:
+
+        {
+            "stories": [Story, Story...],
+            "next": "MjAyMC0wMS0wMVQwMDowMDowMCswMDowMHxhYmM="
+        }
+
+    Pass "next" back as "cursor" to get the following page.
+
+    Optionally, narrow the list with any of these filters:
+
+    - "username": stories posted by this user
+    - "author": stories by exactly this author
+    - "created_after", "created_before": stories created strictly after or
+      before this ISO 8601 time, e.g. "2020-01-01T00:00:00Z"
+
+    and sort it with "ordering": one of "created", "-created" (newest first,
+    the default for paginated and streamed lists), "favorite_count" or
+    "-favorite_count". Ties are broken by story ID. Pass the same filters
+    and ordering along with "cursor" to get the following page.
+
+    To get only some of each story's fields, send "fields" as a
+    comma-separated list, e.g. "fields=id,title". Only those fields are read
+    from the database and sent.
+
+    To export every story, send "stream=true" instead. The same JSON is sent
+    in chunks as it's read from the database, newest first. Streamed responses
+    can't be paginated.
+
+    Responses include an ETag header. Send it back in an If-None-Match header
+    to get an empty 304 Not Modified response if no stories have changed.
+
     Where "Story" is:
 
         {
@@ -77,22 +157,140 @@ def get_stories(request):
                 "author": "testauthor",
                 "url": "test.com",
                 "created": "2000-01-01T00:00:00Z",
-                "modified": "2000-01-01T00:00:00Z"
+                "modified": "2000-01-01T00:00:00Z",
+                "favorite_count": 0
+        }
+
+    On failure for a malformed cursor or unknown fields, returns error JSON:
+
+        {
+            "detail": "Invalid cursor."
+        }
+
+    **Authentication: none**
+    """
+
+    try:
+        fields = parse_fields(fields)
+    except InvalidFieldsException as exc:
+        return 400, {"detail": exc.message}
+
+    queryset = filter_stories(
+        Story.objects.all(),
+        username=username,
+        author=author,
+        created_after=created_after,
+        created_before=created_before,
+    )
+    ordering = STORY_ORDERINGS[ordering] if ordering is not None else None
+
+    if stream:
+        if limit is not None or cursor is not None:
+            return 400, {"detail": "Streamed responses can't be paginated."}
+
+        if ordering is not None:
+            queryset = queryset.order_by(*ordering)
+
+        return await stream_response(request, queryset, fields)
+
+    # Answer conditional requests before rendering (or loading) the list:
+    if is_conditional(request):
+        etag = await sync_to_async(cached_story_list_etag)(request)
+        not_modified = not_modified_response(request, etag)
+
+        if not_modified is not None:
+            return not_modified
+
+    # The rendered response is cached until the next write to any story.
+    # Cache backends and the renderer are sync, so run them in a thread:
+    try:
+        etag, content = await sync_to_async(cached_story_list)(
+            request,
+            lambda: render_stories(
+                request, queryset, limit, cursor, ordering, fields
+            )
+        )
+    except InvalidCursorException as exc:
+        return 400, {"detail": exc.message}
+
+    not_modified = not_modified_response(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    response = HttpResponse(
+        content,
+        content_type=router.api.get_content_type()
+    )
+    response["ETag"] = etag
+
+    return response
+
+
+# Registered before /{story_id}, which would otherwise match "search":
+@router.get(
+    '/search',
+    response={200: StorySearchOutput, 400: BadRequest},
+)
+async def search_stories(
+    request,
+    q: str = Query(..., min_length=1, max_length=MAX_SEARCH_LENGTH),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str = None,
+    fields: str = None,
+):
+    """
+    Search stories by title and author.
+
+    Returns stories matching every word in "q", best match first, one page
+    at a time. Title matches rank above author matches; ties go to the
+    newest story. "next" is a cursor for the following page, or null on the
+    last page:
+
+        {
+            "stories": [Story, Story...],
+            "next": "MjU="
         }
 
+    Pass "next" back as "cursor" (with the same "q") to get the following
+    page.
+
+    To get only some of each story's fields, send "fields" as a
+    comma-separated list, e.g. "fields=id,title". Only those fields are read
+    from the database and sent.
+
     **Authentication: none**
     """
 
-    stories = Story.objects.all()
+    try:
+        fields = parse_fields(fields)
+        only = source_fields(fields, "id") if fields is not None else None
+
+        stories, next_cursor = await sync_to_async(find_stories)(
+            q, limit, cursor, only
+        )
+    except (InvalidCursorException, InvalidFieldsException) as exc:
+        return 400, {"detail": exc.message}
 
-    return {"stories": stories}
+    if fields is None:
+        return {"stories": stories, "next": next_cursor}
+
+    return sparse_response(request, {
+        "stories": [sparse_story(story, fields) for story in stories],
+        "next": next_cursor,
+    })
 
 
 @router.get(
     '/{str:story_id}',
-    response=StoryGetOutput,
+    response={200: StoryGetOutput, 400: BadRequest},
 )
-def get_story(request, story_id: str):
+async def get_story(
+    request,
+    response: HttpResponse,
+    story_id: str,
+    fields: str = None,
+):
     """
     Get story by ID.
 
@@ -106,15 +304,45 @@ def get_story(request, story_id: str):
                 "author": "testauthor",
                 "url": "test.com",
                 "created": "2000-01-01T00:00:00Z",
-                "modified": "2000-01-01T00:00:00Z"
+                "modified": "2000-01-01T00:00:00Z",
+                "favorite_count": 0
             }
         }
 
 
+    Responses include an ETag header. Send it back in an If-None-Match header
+    to get an empty 304 Not Modified response if the story hasn't changed.
+
+    To get only some of the story's fields, send "fields" as a
+    comma-separated list, e.g. "fields=id,title". Only those fields are sent.
+
     **Authentication: none**
     """
 
-    story = get_object_or_404(Story, id=story_id)
+    try:
+        fields = parse_fields(fields)
+    except InvalidFieldsException as exc:
+        return 400, {"detail": exc.message}
+
+    # Stories (and missing story IDs) are cached until the story changes.
+    # Cache backends are sync, so run the lookup in a thread:
+    story = await sync_to_async(cached_story)(story_id)
+
+    if story is None:
+        raise Http404
+
+    etag = story_etag(story, fields)
+    not_modified = not_modified_response(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    if fields is not None:
+        sparse = sparse_response(request, {"story": sparse_row(story, fields)})
+        sparse["ETag"] = etag
+        return sparse
+
+    response["ETag"] = etag
 
     return {"story": story}
 
@@ -124,7 +352,7 @@ def get_story(request, story_id: str):
     response={200: StoryDeleteOutput, 401: Unauthorized},
     auth=token_header
 )
-def delete_story(request, story_id: str):
+async def delete_story(request, story_id: str):
     """
     Delete story by ID.
 
@@ -142,14 +370,116 @@ def delete_story(request, story_id: str):
 
     curr_user = request.auth
 
-    story = get_object_or_404(Story, id=story_id)
+    story = await aget_object_or_404(Story, id=story_id)
 
-    if story.user.username != curr_user.username and curr_user.is_staff is not True:
+    if story.user_id != curr_user.username and curr_user.is_staff is not True:
         return 401, {"detail": "Unauthorized."}
 
-    story.delete()
+    await story.adelete()
 
     return {
         "deleted": True,
         "id": story_id
     }
+
+
+def render_stories(request, queryset, limit, cursor, ordering, fields=None):
+    """
+    Render the GET /stories response body for the given (filtered) queryset,
+    pagination params and ordering, which may be None for unordered
+    unpaginated lists. If fields is given, only those fields of each story
+    are read and rendered.
+
+    Returns an (etag, content) tuple. Raises InvalidCursorException if
+    cursor is malformed.
+    """
+
+    etag = story_list_etag(request)
+
+    if limit is None and cursor is None:
+        if ordering is not None:
+            queryset = queryset.order_by(*ordering)
+
+        if fields is not None:
+            stories = list(sparse_values(queryset, fields))
+        else:
+            stories = queryset
+
+        data = {"stories": stories}
+    else:
+        ordering = ordering or KEYSET_ORDERING
+
+        if fields is not None:
+            # The cursor is built from the last story's ordering keys:
+            queryset = queryset.only(
+                *source_fields(fields, "id", ordering[0].lstrip("-"))
+            )
+
+        stories, next_cursor = paginate_stories(
+            queryset,
+            limit=limit or DEFAULT_PAGE_LIMIT,
+            cursor=cursor,
+            ordering=ordering,
+        )
+
+        if fields is not None:
+            stories = [sparse_story(story, fields) for story in stories]
+
+        data = {"stories": stories, "next": next_cursor}
+
+    if fields is not None:
+        # Sparse stories don't fit StorySchema, and are render-ready:
+        body = data
+    else:
+        # "next" is only included in paginated responses:
+        body = StoryGetAllOutput.model_validate(data).model_dump(
+            exclude_unset=True
+        )
+
+    content = router.api.renderer.render(request, body, response_status=200)
+
+    return etag, content
+
+
+async def stream_response(request, queryset, fields=None):
+    """
+    Build a streaming GET /stories response for queryset (with only the
+    given fields, if any), bypassing the response cache.
+
+    The body is rendered from a server-side cursor as it's sent, so it's never
+    held in memory (or the cache) in full. Under ASGI the body is an async
+    iterator, so it's served without a thread per chunk.
+    """
+
+    etag = await sync_to_async(story_list_etag)(request)
+    not_modified = not_modified_response(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    if isinstance(request, ASGIRequest):
+        stream = astream_stories
+    else:
+        stream = stream_stories
+
+    response = StreamingHttpResponse(
+        stream(router.api.renderer, request, queryset, fields=fields),
+        content_type=router.api.get_content_type()
+    )
+    response["ETag"] = etag
+
+    return response
+
+
+def sparse_response(request, data):
+    """
+    Render a response holding sparse stories (see fields.py).
+
+    Sparse stories are plain dicts of the requested fields, so they bypass
+    the route's response schema, which requires every field.
+    """
+
+    return HttpResponse(
+        router.api.renderer.render(request, data, response_status=200),
+        content_type=router.api.get_content_type()
+    )
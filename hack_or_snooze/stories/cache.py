@@ -0,0 +1,206 @@
+import time
+import uuid
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from hack_or_snooze.metrics import story_cache_lookups
+
+from .fields import STORY_FIELDS
+from .models import Story
+
+STORY_LIST_VERSION_KEY = "stories:list:version"
+
+# Cached in place of a story that doesn't exist:
+STORY_NOT_FOUND = "not-found"
+
+# How long one request may hold the rebuild lock, and how long other requests
+# wait for it to finish before rendering the list themselves:
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT_SECONDS = 2
+REBUILD_POLL_INTERVAL = 0.05
+
+
+def story_list_version():
+    """Return the current story list cache version, creating one if needed."""
+
+    version = cache.get(STORY_LIST_VERSION_KEY)
+
+    if version is None:
+        cache.add(STORY_LIST_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(STORY_LIST_VERSION_KEY)
+
+    return version
+
+
+def bump_story_list_version():
+    """
+    Invalidate every cached story list response.
+
+    The version is random rather than a counter, so a version key evicted
+    from the cache can never be recreated with a value matching old entries.
+    """
+
+    cache.set(STORY_LIST_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    # Another request may re-cache the list from data read before our
+    # transaction commits, so bump again once it does:
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump_story_list_version)
+
+
+def cached_story_list(request, render):
+    """
+    Return an (etag, content) tuple for a GET /stories request, from the
+    cache if possible.
+
+    On a miss, one request takes a lock and calls render() to build and
+    cache the response; concurrent requests wait for that instead of all
+    hitting the database at once, falling back to render() themselves if the
+    rebuild takes too long. Exceptions raised by render() are not cached.
+    """
+
+    ttl = settings.STORY_LIST_CACHE_TTL
+
+    if ttl <= 0:
+        return render()
+
+    key = story_list_key(request)
+    cached = cache.get(key)
+
+    if cached is not None:
+        return cached
+
+    lock_key = f"{key}:lock"
+
+    if not cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        deadline = time.monotonic() + REBUILD_WAIT_SECONDS
+
+        while time.monotonic() < deadline:
+            time.sleep(REBUILD_POLL_INTERVAL)
+
+            cached = cache.get(key)
+
+            if cached is not None:
+                return cached
+
+        return render()
+
+    try:
+        rendered = render()
+        # The ETag is also stored on its own, so that conditional requests
+        # can be answered without loading the content (see
+        # etags.cached_story_list_etag):
+        cache.set_many(
+            {key: rendered, f"{key}:etag": rendered[0]},
+            timeout=ttl,
+        )
+    finally:
+        cache.delete(lock_key)
+
+    return rendered
+
+
+def story_list_key(request):
+    """Cache key of the GET /stories response for request's query string,
+    under the current story list version."""
+
+    query_hash = md5(request.GET.urlencode().encode()).hexdigest()
+
+    return f"stories:list:{story_list_version()}:{query_hash}"
+
+
+def story_cache_key(story_id):
+    # Story IDs come from the URL, so hash them into a safe cache key. v2
+    # entries are (generation, story) tuples, so they don't share keys with
+    # processes still caching bare stories:
+    return f"stories:story:v2:{md5(str(story_id).encode()).hexdigest()}"
+
+
+def story_generation_key(story_id):
+    return f"{story_cache_key(story_id)}:generation"
+
+
+def cached_story(story_id):
+    """
+    Return story_id's StorySchema-ready dict, or None if there's no such
+    story, from the cache if possible.
+
+    Misses are read from the database and cached for STORY_CACHE_TTL
+    seconds; missing stories are remembered for STORY_NOT_FOUND_CACHE_TTL.
+    Lookups are counted by result in the story_cache_lookups metric.
+
+    Entries are stored with the story's generation as read before the
+    database, and only served while it is current. invalidate_stories drops
+    the generation, so a request that read the story just before a write
+    can't cache what it read for later requests.
+    """
+
+    if settings.STORY_CACHE_TTL <= 0:
+        return story_row(story_id)
+
+    key = story_cache_key(story_id)
+    generation_key = story_generation_key(story_id)
+    cached = cache.get_many([key, generation_key])
+    generation = cached.get(generation_key)
+
+    if generation is None:
+        # Random, like the story list version, so that a dropped generation
+        # is never recreated with a value matching old entries:
+        cache.add(generation_key, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(generation_key)
+
+    entry_generation, entry = cached.get(key, (None, None))
+
+    if entry_generation == generation and entry == STORY_NOT_FOUND:
+        story_cache_lookups.labels(result="not_found_hit").inc()
+        return None
+
+    if entry_generation == generation and entry is not None:
+        story_cache_lookups.labels(result="hit").inc()
+        return entry
+
+    story_cache_lookups.labels(result="miss").inc()
+
+    story = story_row(story_id)
+
+    if story is not None:
+        cache.set(key, (generation, story), timeout=settings.STORY_CACHE_TTL)
+    elif settings.STORY_NOT_FOUND_CACHE_TTL > 0:
+        cache.set(
+            key,
+            (generation, STORY_NOT_FOUND),
+            timeout=settings.STORY_NOT_FOUND_CACHE_TTL,
+        )
+
+    return story
+
+
+def story_row(story_id):
+    """Read story_id's StorySchema-ready dict, or None, from the database."""
+
+    return Story.objects.filter(id=story_id).values(*STORY_FIELDS).first()
+
+
+def invalidate_stories(story_ids):
+    """
+    Drop cached entries (including not-found entries) for story_ids, along
+    with their generations (see cached_story).
+
+    As with bump_story_list_version, this runs again once the current
+    transaction commits, in case a concurrent request re-cached a story from
+    data read before the commit.
+    """
+
+    keys = [
+        key
+        for story_id in story_ids
+        for key in (story_cache_key(story_id), story_generation_key(story_id))
+    ]
+
+    cache.delete_many(keys)
+
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,108 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .cache import story_list_key, story_list_version
+from .models import Story
+
+
+def story_list_etag(request):
+    """
+    Build a strong ETag for the story list from the table's watermark: the
+    latest "modified" time plus the number of stories. Creating, changing or
+    deleting any story changes one or the other.
+
+    Favoriting doesn't change "modified", so the story list cache version
+    (bumped by every write to favorite counts, see cache.py) is included
+    too.
+
+    The query string is part of the ETag, since each page of a paginated list
+    is a different representation.
+
+    Costs one query, answered from the stories_modified_idx index.
+    """
+
+    watermark = Story.objects.aggregate(
+        last_modified=Max("modified"),
+        count=Count("id"),
+    )
+
+    last_modified = watermark["last_modified"]
+    last_modified = last_modified.isoformat() if last_modified else ""
+
+    h = md5()
+    h.update(
+        f"{last_modified}|{watermark['count']}|{story_list_version()}|"
+        f"{request.GET.urlencode()}".encode()
+    )
+
+    return quote_etag(h.hexdigest())
+
+
+def cached_story_list_etag(request):
+    """
+    Return the ETag of the GET /stories response for request, from the
+    response cache if it's there, otherwise from story_list_etag.
+
+    Lets conditional requests be answered before (and without) rendering
+    the list: no queries on a warm cache, one on a cold one.
+    """
+
+    if settings.STORY_LIST_CACHE_TTL > 0:
+        etag = cache.get(f"{story_list_key(request)}:etag")
+
+        if etag is not None:
+            return etag
+
+    return story_list_etag(request)
+
+
+def story_etag(story, fields=None):
+    """
+    Build a strong ETag for a single story (a StorySchema-ready dict, see
+    cache.cached_story) from its "modified" time and favorite count, which
+    changes without touching "modified".
+
+    Sparse responses (see fields.py) are different representations, so the
+    requested fields are part of their ETag.
+    """
+
+    h = md5()
+    h.update(
+        f"{story['id']}|{story['modified'].isoformat()}|"
+        f"{story['favorite_count']}".encode()
+    )
+
+    if fields is not None:
+        h.update(f"|{','.join(fields)}".encode())
+
+    return quote_etag(h.hexdigest())
+
+
+def is_conditional(request):
+    """Whether request has an If-None-Match or If-Match header to check."""
+
+    return (
+        "HTTP_IF_NONE_MATCH" in request.META
+        or "HTTP_IF_MATCH" in request.META
+    )
+
+
+def not_modified_response(request, etag):
+    """
+    Check the request's If-None-Match (and If-Match) headers against etag.
+
+    Returns a 304 Not Modified (or 412 Precondition Failed) response to send
+    instead of the body, or None if the client needs the full response.
+    """
+
+    response = get_conditional_response(request, etag=etag)
+
+    if response is not None:
+        response["ETag"] = etag
+
+    return response
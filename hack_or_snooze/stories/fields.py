@@ -0,0 +1,85 @@
+from django.db.models import F
+
+from hack_or_snooze.exceptions import InvalidFieldsException
+
+# Story fields clients can ask for with "fields=", in output order, mapped to
+# the model fields they're read from (see StorySchema):
+STORY_FIELD_SOURCES = {
+    "id": "id",
+    "username": "user_id",
+    "title": "title",
+    "author": "author",
+    "url": "url",
+    "created": "created",
+    "modified": "modified",
+    "favorite_count": "favorite_count",
+}
+
+# Model fields to read for StorySchema-ready dicts (e.g. with .values()):
+STORY_FIELDS = list(STORY_FIELD_SOURCES.values())
+
+
+def parse_fields(fields):
+    """
+    Parse a comma-separated "fields" param into a tuple of story field
+    names, in output order.
+
+    Returns None if fields is None, meaning every field. Raises
+    InvalidFieldsException for unknown or missing names.
+
+    EX: "title,id" -> ("id", "title")
+    """
+
+    if fields is None:
+        return None
+
+    requested = {name.strip() for name in fields.split(",")} - {""}
+
+    if not requested:
+        raise InvalidFieldsException("No story fields requested.")
+
+    unknown = requested - STORY_FIELD_SOURCES.keys()
+
+    if unknown:
+        raise InvalidFieldsException(
+            f"Unknown story fields: {', '.join(sorted(unknown))}."
+        )
+
+    return tuple(name for name in STORY_FIELD_SOURCES if name in requested)
+
+
+def source_fields(fields, *required):
+    """Model fields to load for fields, plus any required by the caller
+    (such as pagination keys), for use with QuerySet.only()."""
+
+    sources = {STORY_FIELD_SOURCES[name] for name in fields}
+
+    return sorted(sources.union(required))
+
+
+def sparse_values(queryset, fields):
+    """Return queryset as dicts holding just fields, read with a SELECT of
+    just their columns."""
+
+    # Fields named after their model field are selected as-is; the rest
+    # (just "username") are renamed with an F() expression:
+    return queryset.values(
+        *(name for name in fields if STORY_FIELD_SOURCES[name] == name),
+        **{
+            name: F(STORY_FIELD_SOURCES[name])
+            for name in fields
+            if STORY_FIELD_SOURCES[name] != name
+        },
+    )
+
+
+def sparse_story(story, fields):
+    """Return the given fields of a Story instance as a dict."""
+
+    return {name: getattr(story, STORY_FIELD_SOURCES[name]) for name in fields}
+
+
+def sparse_row(row, fields):
+    """Return the given fields of a StorySchema-ready dict."""
+
+    return {name: row[STORY_FIELD_SOURCES[name]] for name in fields}
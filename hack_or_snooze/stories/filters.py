@@ -0,0 +1,52 @@
+from typing import Literal
+
+from .pagination import KEYSET_ORDERING
+
+# Orderings the story list can be sorted by, each ending in "id" so that
+# every story has exactly one position (see pagination.py). Only indexed
+# columns are offered, so sorting never needs to read the whole table:
+STORY_ORDERINGS = {
+    # stories_created_id_idx:
+    "-created": KEYSET_ORDERING,
+    "created": ("created", "id"),
+    # stories_favorite_count_idx:
+    "-favorite_count": ("-favorite_count", "-id"),
+    "favorite_count": ("favorite_count", "id"),
+}
+
+StoryOrdering = Literal[
+    "-created",
+    "created",
+    "-favorite_count",
+    "favorite_count",
+]
+
+
+def filter_stories(
+    queryset,
+    username=None,
+    author=None,
+    created_after=None,
+    created_before=None,
+):
+    """
+    Filter queryset by the story list's filter params; None means no filter.
+
+    username and author must match exactly; created_after and created_before
+    are exclusive. Each is served by an index: stories_user_created_idx,
+    stories_author_created_idx and stories_created_id_idx respectively.
+    """
+
+    if username is not None:
+        queryset = queryset.filter(user_id=username)
+
+    if author is not None:
+        queryset = queryset.filter(author=author)
+
+    if created_after is not None:
+        queryset = queryset.filter(created__gt=created_after)
+
+    if created_before is not None:
+        queryset = queryset.filter(created__lt=created_before)
+
+    return queryset
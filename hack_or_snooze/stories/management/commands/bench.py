@@ -0,0 +1,549 @@
+import datetime
+import http.client
+import json
+import re
+import statistics
+import time
+import urllib.parse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from favorites.schemas import MAX_BULK_FAVORITES
+from stories.management.commands.seed_bench import (
+    BENCH_PASSWORD,
+    BENCH_USERNAME_PREFIX,
+    bench_username,
+)
+from stories.models import Story
+from users.auth_utils import AUTH_KEY, generate_token
+from users.models import User
+
+# Prefix for users created by the signup scenario; they're deleted afterwards:
+SIGNUP_USERNAME_PREFIX = "bench_signup_"
+
+# Prefix for the staff user the metrics scenario creates (and deletes) when
+# there's no METRICS_TOKEN:
+STAFF_USERNAME_PREFIX = "bench_staff_"
+
+PAGE_LIMIT = 25
+BULK_SIZE = 10
+
+SERVER_TIMING_QUERIES = re.compile(r'db;desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    """
+    Drive every API endpoint and report latency percentiles and queries per
+    request as JSON.
+
+    Requests go through Django's test client in this process, or with --url
+    to a running local server, which must use the same database (scenarios
+    look up users and stories directly). Seed a dataset with seed_bench
+    first; requests are made as bench_user_0.
+
+    Queries per request are read from the Server-Timing header, which is
+    forced on in-process; against a server, it needs REQUEST_TIMING_HEADER
+    and a sample rate of 1 for them to be reported.
+
+    Everything the scenarios create is removed again, so runs are
+    repeatable against the same dataset.
+    """
+
+    help = "Benchmark every endpoint against a seeded dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--url",
+            help="Base URL of a local server, e.g. http://127.0.0.1:8000. "
+                 "Defaults to an in-process client.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            help="Scenario to run; repeat for several. Defaults to all.",
+        )
+        parser.add_argument(
+            "--skip",
+            action="append",
+            default=[],
+            choices=SCENARIOS,
+            help="Scenario to leave out; repeat for several.",
+        )
+        parser.add_argument("--output", help="Write the report to this file.")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+
+        username = bench_username(0)
+
+        if not User.objects.filter(username=username).exists():
+            raise CommandError("No benchmark dataset; run seed_bench first.")
+
+        names = [
+            name for name in options["scenario"] or SCENARIOS
+            if name not in options["skip"]
+        ]
+
+        if options["url"]:
+            client = HttpClient(options["url"])
+            results = self.run(client, names, username, options)
+        else:
+            # The test client's host, and a Server-Timing header on every
+            # response; the middleware reads these when the client is built:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                REQUEST_TIMING_SAMPLE_RATE=1.0,
+                REQUEST_TIMING_HEADER=True,
+            ):
+                client = InProcessClient()
+                results = self.run(client, names, username, options)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.now(
+                    datetime.timezone.utc
+                ).isoformat(),
+                "target": options["url"] or "in-process",
+                "database": connection.vendor,
+                "debug": settings.DEBUG,
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "users": User.objects.filter(
+                    username__startswith=BENCH_USERNAME_PREFIX
+                ).count(),
+                "stories": Story.objects.count(),
+                "favorites": User.favorites.through.objects.count(),
+            },
+            "scenarios": results,
+        }
+
+        output = json.dumps(report, indent=2)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+
+        self.stdout.write(output)
+
+    def run(self, client, names, username, options):
+        results = {}
+
+        for name in names:
+            scenario = SCENARIOS[name](client, username)
+
+            scenario.setup(options["warmup"] + options["requests"])
+
+            try:
+                for n in range(options["warmup"]):
+                    scenario.request(n)
+
+                samples = [
+                    scenario.request(n)
+                    for n in range(options["warmup"],
+                                   options["warmup"] + options["requests"])
+                ]
+            finally:
+                scenario.teardown()
+
+            results[name] = summarize(samples)
+            self.stderr.write(
+                f"{name}: p50 {results[name]['p50_ms']}ms, "
+                f"{results[name]['errors']} errors"
+            )
+
+        return results
+
+
+def summarize(samples):
+    """Summarize (ok, milliseconds, queries) samples for the report."""
+
+    durations = [ms for _, ms, _ in samples]
+    queries = [count for _, _, count in samples if count is not None]
+    percentiles = statistics.quantiles(durations, n=100, method="inclusive")
+
+    return {
+        "requests": len(samples),
+        "errors": sum(not ok for ok, _, _ in samples),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "queries": {
+            "median": statistics.median(queries),
+            "max": max(queries),
+        } if queries else None,
+    }
+
+
+###############################################################################
+# Clients: each returns (status, Server-Timing header or None, body)
+
+class InProcessClient:
+    """Make requests through Django's test client."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None, token=None, headers=None):
+        headers = dict(headers or {})
+
+        if token:
+            headers[AUTH_KEY] = token
+
+        response = self.client.generic(
+            method,
+            path,
+            data=json.dumps(data) if data is not None else "",
+            content_type="application/json",
+            headers=headers,
+        )
+
+        if response.streaming:
+            body = b"".join(response.streaming_content)
+        else:
+            body = response.content
+
+        return response.status_code, response.get("Server-Timing"), body
+
+
+class HttpClient:
+    """Make requests to a local server over a kept-alive connection."""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+
+        if not parsed.hostname:
+            raise CommandError(f"Invalid --url: {url}")
+
+        self.connection = http.client.HTTPConnection(
+            parsed.hostname, parsed.port or 80
+        )
+        self.prefix = parsed.path.rstrip("/")
+
+    def request(self, method, path, data=None, token=None, headers=None):
+        headers = {"Content-Type": "application/json", **(headers or {})}
+
+        if token:
+            headers[AUTH_KEY] = token
+
+        self.connection.request(
+            method,
+            self.prefix + path,
+            body=json.dumps(data) if data is not None else None,
+            headers=headers,
+        )
+        response = self.connection.getresponse()
+        body = response.read()
+
+        return response.status, response.getheader("Server-Timing"), body
+
+
+###############################################################################
+# Scenarios
+
+class Scenario:
+    """
+    One endpoint under test. request(n) makes the n-th timed request;
+    setup(requests) and teardown() prepare and clean up around them.
+    """
+
+    expected_status = 200
+    # Extra request headers, e.g. for authentication other than a token:
+    headers = {}
+
+    def __init__(self, client, username):
+        self.client = client
+        self.username = username
+        self.token = generate_token(username)
+
+    def setup(self, requests):
+        pass
+
+    def teardown(self):
+        pass
+
+    def request(self, n):
+        method, path, data, token = self.make_request(n)
+
+        start = time.perf_counter()
+        status, server_timing, body = self.client.request(
+            method, path, data, token, self.headers
+        )
+        ms = (time.perf_counter() - start) * 1000
+
+        self.handle_response(n, status, body)
+
+        match = server_timing and SERVER_TIMING_QUERIES.search(server_timing)
+        queries = int(match.group(1)) if match else None
+
+        return status == self.expected_status, ms, queries
+
+    def make_request(self, n):
+        """Return (method, path, data, token) for the n-th request."""
+
+        raise NotImplementedError
+
+    def handle_response(self, n, status, body):
+        pass
+
+    def other_story_ids(self, count):
+        """IDs of up to count stories not posted or favorited by the bench
+        user, for favoriting."""
+
+        return list(
+            Story.objects
+            .exclude(user_id=self.username)
+            .exclude(favorited_by__username=self.username)
+            .order_by("id")
+            .values_list("id", flat=True)[:count]
+        )
+
+    def remove_favorites(self, story_ids):
+        """Unfavorite story_ids for the bench user, in as many bulk requests
+        as the bulk route's limit takes."""
+
+        for start in range(0, len(story_ids), MAX_BULK_FAVORITES):
+            self.client.request(
+                "POST",
+                f"/api/favorites/{self.username}/bulk",
+                {"remove": story_ids[start:start + MAX_BULK_FAVORITES]},
+                self.token,
+            )
+
+
+class Metrics(Scenario):
+    """
+    Scrape GET /api/metrics with METRICS_TOKEN as a bearer token, or else
+    with a staff user's token (the staff user is created for the run).
+    """
+
+    def setup(self, requests):
+        self.staff_username = None
+
+        if settings.METRICS_TOKEN:
+            self.headers = {
+                "Authorization": f"Bearer {settings.METRICS_TOKEN}"
+            }
+            self.metrics_token = None
+            return
+
+        self.staff_username = f"{STAFF_USERNAME_PREFIX}{time.time_ns()}"
+        User.objects.create(username=self.staff_username, is_staff=True)
+        self.metrics_token = generate_token(self.staff_username)
+
+    def make_request(self, n):
+        return "GET", "/api/metrics", None, self.metrics_token
+
+    def teardown(self):
+        if self.staff_username:
+            User.objects.filter(username=self.staff_username).delete()
+
+
+class StoryListPage(Scenario):
+    def make_request(self, n):
+        return "GET", f"/api/stories/?limit={PAGE_LIMIT}", None, None
+
+
+class StoryListCursor(Scenario):
+    def setup(self, requests):
+        # Page on from the newest story, so small datasets have a cursor too:
+        status, _, body = self.client.request("GET", "/api/stories/?limit=1")
+        self.cursor = json.loads(body)["next"]
+
+        if self.cursor is None:
+            raise CommandError("stories.list.cursor needs two stories.")
+
+    def make_request(self, n):
+        query = urllib.parse.urlencode({
+            "limit": PAGE_LIMIT,
+            "cursor": self.cursor,
+        })
+        return "GET", f"/api/stories/?{query}", None, None
+
+
+class StoryListFull(Scenario):
+    def make_request(self, n):
+        return "GET", "/api/stories/", None, None
+
+
+class StoryListStream(Scenario):
+    def make_request(self, n):
+        return "GET", "/api/stories/?stream=true", None, None
+
+
+class StoryGet(Scenario):
+    def setup(self, requests):
+        self.story_ids = list(
+            Story.objects.order_by("id").values_list("id", flat=True)[:1000]
+        )
+
+    def make_request(self, n):
+        story_id = self.story_ids[n % len(self.story_ids)]
+        return "GET", f"/api/stories/{story_id}", None, None
+
+
+class StorySearch(Scenario):
+    """Search for a different seeded story's title on each request."""
+
+    def make_request(self, n):
+        query = urllib.parse.urlencode({
+            "q": f"story {n}",
+            "limit": PAGE_LIMIT,
+        })
+        return "GET", f"/api/stories/search?{query}", None, None
+
+
+class StoryCreate(Scenario):
+    def setup(self, requests):
+        self.created = []
+
+    def make_request(self, n):
+        data = {
+            "author": "Bench",
+            "title": f"Bench story {n}",
+            "url": f"https://example.com/bench/{n}",
+        }
+        return "POST", "/api/stories/", data, self.token
+
+    def handle_response(self, n, status, body):
+        if status == self.expected_status:
+            self.created.append(json.loads(body)["story"]["id"])
+
+    def teardown(self):
+        Story.objects.filter(id__in=self.created).delete()
+
+
+class StoryDelete(Scenario):
+    def setup(self, requests):
+        stories = Story.objects.bulk_create([
+            Story(
+                user_id=self.username,
+                author="Bench",
+                title=f"Bench story {n}",
+                url=f"https://example.com/bench/{n}",
+            )
+            for n in range(requests)
+        ])
+        self.story_ids = [story.id for story in stories]
+
+    def make_request(self, n):
+        return "DELETE", f"/api/stories/{self.story_ids[n]}", None, self.token
+
+    def teardown(self):
+        Story.objects.filter(id__in=self.story_ids).delete()
+
+
+class UserSignup(Scenario):
+    expected_status = 201
+
+    def setup(self, requests):
+        self.prefix = f"{SIGNUP_USERNAME_PREFIX}{time.time_ns()}_"
+
+    def make_request(self, n):
+        data = {
+            "username": f"{self.prefix}{n}",
+            "password": BENCH_PASSWORD,
+            "first_name": "Bench",
+            "last_name": "User",
+        }
+        return "POST", "/api/users/signup", data, None
+
+    def teardown(self):
+        User.objects.filter(username__startswith=self.prefix).delete()
+
+
+class UserLogin(Scenario):
+    def make_request(self, n):
+        data = {"username": self.username, "password": BENCH_PASSWORD}
+        return "POST", "/api/users/login", data, None
+
+
+class UserGetFull(Scenario):
+    def make_request(self, n):
+        return "GET", f"/api/users/{self.username}", None, self.token
+
+
+class UserGetSummary(Scenario):
+    def make_request(self, n):
+        path = f"/api/users/{self.username}?view=summary"
+        return "GET", path, None, self.token
+
+
+class UserPatch(Scenario):
+    def setup(self, requests):
+        self.first_name = User.objects.get(username=self.username).first_name
+
+    def make_request(self, n):
+        # Alternate names so that every request is a real write:
+        data = {"first_name": f"Bench{n % 2}"}
+        return "PATCH", f"/api/users/{self.username}", data, self.token
+
+    def teardown(self):
+        # Through User.update, so that cached copies of the user are dropped:
+        User.objects.get(username=self.username).update(
+            {"first_name": self.first_name}
+        )
+
+
+class FavoriteToggle(Scenario):
+    """
+    Favorite a story on even requests and unfavorite it on odd ones, so that
+    both routes are timed and the dataset ends up unchanged.
+    """
+
+    def setup(self, requests):
+        self.story_ids = self.other_story_ids(requests // 2 + 1)
+
+        if not self.story_ids:
+            raise CommandError("No stories available to favorite.")
+
+    def make_request(self, n):
+        story_id = self.story_ids[n // 2 % len(self.story_ids)]
+        action = "unfavorite" if n % 2 else "favorite"
+        path = f"/api/favorites/{self.username}/{story_id}/{action}"
+        return "POST", path, None, self.token
+
+    def teardown(self):
+        self.remove_favorites(self.story_ids)
+
+
+class FavoriteBulk(Scenario):
+    """Add BULK_SIZE favorites, then remove them again, alternately."""
+
+    def setup(self, requests):
+        self.story_ids = self.other_story_ids(BULK_SIZE)
+
+    def make_request(self, n):
+        key = "remove" if n % 2 else "add"
+        path = f"/api/favorites/{self.username}/bulk"
+        return "POST", path, {key: self.story_ids}, self.token
+
+    def teardown(self):
+        self.remove_favorites(self.story_ids)
+
+
+SCENARIOS = {
+    "metrics": Metrics,
+    "stories.list.page": StoryListPage,
+    "stories.list.cursor": StoryListCursor,
+    "stories.list.full": StoryListFull,
+    "stories.list.stream": StoryListStream,
+    "stories.get": StoryGet,
+    "stories.search": StorySearch,
+    "stories.create": StoryCreate,
+    "stories.delete": StoryDelete,
+    "users.signup": UserSignup,
+    "users.login": UserLogin,
+    "users.get.full": UserGetFull,
+    "users.get.summary": UserGetSummary,
+    "users.patch": UserPatch,
+    "favorites.toggle": FavoriteToggle,
+    "favorites.bulk": FavoriteBulk,
+}
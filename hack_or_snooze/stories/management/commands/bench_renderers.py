@@ -0,0 +1,103 @@
+import json
+import random
+import time
+import uuid
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from ninja.renderers import JSONRenderer
+
+from hack_or_snooze.renderers import FastJSONRenderer
+from stories.models import Story
+from stories.schemas import StoryGetAllOutput
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+class Command(BaseCommand):
+    """
+    Compare JSON renderers on GET /api/stories/ sized payloads.
+
+    Stories are built in memory (nothing is written to the database) from
+    --seed, and dumped through StoryGetAllOutput once, so only encoding is
+    timed. Each renderer's output must decode to the same JSON as the
+    stdlib renderer's.
+    """
+
+    help = "Time JSON renderers on story list payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=DEFAULT_SIZES,
+            help="Story counts to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Renders per payload; the best time is reported.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed for story IDs, so that runs are reproducible.",
+        )
+
+    def handle(self, *args, **options):
+        renderers = {
+            "stdlib": JSONRenderer(),
+            "fast": FastJSONRenderer(),
+        }
+
+        for size in options["sizes"]:
+            data = story_list_payload(size, options["seed"])
+            expected = json.loads(renderers["stdlib"].render(
+                None, data, response_status=200
+            ))
+
+            for name, renderer in renderers.items():
+                best = float("inf")
+
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    content = renderer.render(None, data, response_status=200)
+                    best = min(best, time.perf_counter() - start)
+
+                if json.loads(content) != expected:
+                    raise CommandError(
+                        f"{name} renderer output differs from stdlib's for "
+                        f"{size} stories."
+                    )
+
+                self.stdout.write(
+                    f"{size:>7} stories  {name:<7}"
+                    f"{best * 1000:9.1f}ms  {len(content) / 1e6:6.2f}MB"
+                )
+
+
+def story_list_payload(size, seed=0):
+    """Return a dumped StoryGetAllOutput with `size` unsaved stories, the
+    same for the same seed."""
+
+    rng = random.Random(seed)
+    created = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    stories = [
+        Story(
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            user_id=f"user{i % 100}",
+            title=f"Story title {i}",
+            author=f"Author {i}",
+            url=f"https://example.com/stories/{i}",
+            created=created + datetime.timedelta(seconds=i, microseconds=i),
+            modified=created + datetime.timedelta(seconds=i),
+            favorite_count=i % 7,
+        )
+        for i in range(size)
+    ]
+
+    return StoryGetAllOutput.model_validate({"stories": stories}).model_dump()
@@ -0,0 +1,210 @@
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HOST = "127.0.0.1"
+
+SERVERS = {
+    "wsgi-gunicorn": [
+        sys.executable, "-m", "gunicorn", "hack_or_snooze.wsgi:application",
+        "--workers", "{workers}",
+        "--bind", f"{HOST}:{{port}}",
+        "--log-level", "warning",
+    ],
+    "asgi-uvicorn": [
+        sys.executable, "-m", "uvicorn", "hack_or_snooze.asgi:application",
+        "--workers", "{workers}",
+        "--host", HOST,
+        "--port", "{port}",
+        "--log-level", "warning",
+    ],
+}
+
+STARTUP_TIMEOUT = 30
+
+# Response caches are disabled in the servers unless --with-caches is given,
+# so that requests measure the ORM and rendering rather than cache hits:
+NO_RESPONSE_CACHES = {
+    "STORY_LIST_CACHE_TTL": "0",
+    "STORY_CACHE_TTL": "0",
+    "STORY_NOT_FOUND_CACHE_TTL": "0",
+    "USER_OUTPUT_CACHE_TTL": "0",
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare requests/sec for the WSGI (gunicorn) and ASGI (uvicorn) entry
+    points under concurrent load.
+
+    Each server is started in turn against the configured database, then
+    driven by --concurrency client threads for --duration seconds.
+    Seed the database first; results depend heavily on its size.
+
+    The servers run with the response caches disabled (see
+    NO_RESPONSE_CACHES), so that every request reaches the database.
+    """
+
+    help = "Benchmark gunicorn (WSGI) vs uvicorn (ASGI) under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Path to request; repeat to mix paths. "
+                 "Defaults to /api/stories/?limit=25.",
+        )
+        parser.add_argument(
+            "--token",
+            default="",
+            help="Auth token header to send with every request.",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--server",
+            choices=SERVERS,
+            action="append",
+            help="Server to benchmark; repeat for several. Defaults to all.",
+        )
+        parser.add_argument(
+            "--with-caches",
+            action="store_true",
+            help="Leave the response caches enabled in the servers.",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["path"] or ["/api/stories/?limit=25"]
+        headers = {"token": options["token"]} if options["token"] else {}
+        env = dict(os.environ)
+
+        if not options["with_caches"]:
+            env.update(NO_RESPONSE_CACHES)
+
+        for name in options["server"] or SERVERS:
+            command = [
+                arg.format(workers=options["workers"], port=options["port"])
+                for arg in SERVERS[name]
+            ]
+
+            server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+
+            try:
+                wait_until_ready(options["port"], paths[0], server)
+                result = run_load(
+                    options["port"],
+                    paths,
+                    headers,
+                    options["concurrency"],
+                    options["duration"],
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+            self.stdout.write(
+                f"{name:<14} {result['rps']:8.1f} req/s  "
+                f"p50 {result['p50']:7.1f}ms  p99 {result['p99']:7.1f}ms  "
+                f"errors {result['errors']}"
+            )
+
+
+def wait_until_ready(port, path, server):
+    """Block until the server has answered a request for path, so that
+    worker startup isn't part of the measurement."""
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f"Server exited with code {server.returncode}.")
+
+        conn = http.client.HTTPConnection(HOST, port, timeout=STARTUP_TIMEOUT)
+
+        try:
+            conn.request("GET", path)
+            conn.getresponse().read()
+            return
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.1)
+        finally:
+            conn.close()
+
+    raise CommandError(f"Server didn't start within {STARTUP_TIMEOUT}s.")
+
+
+def run_load(port, paths, headers, concurrency, duration):
+    """
+    Send requests from concurrency threads over keep-alive connections for
+    duration seconds.
+
+    Returns a dict of requests/sec, p50 and p99 latency (ms) and errors.
+    """
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection(HOST, port)
+        own_latencies = []
+        own_errors = 0
+        i = 0
+
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(HOST, port)
+                continue
+
+            if response.status >= 400:
+                own_errors += 1
+
+            own_latencies.append(time.perf_counter() - start)
+
+        conn.close()
+
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.monotonic() - started
+
+    if len(latencies) < 2:
+        raise CommandError("No successful requests; is the database seeded?")
+
+    percentiles = statistics.quantiles(latencies, n=100)
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentiles[49] * 1000,
+        "p99": percentiles[98] * 1000,
+        "errors": sum(errors),
+    }
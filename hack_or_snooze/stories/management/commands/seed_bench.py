@@ -0,0 +1,332 @@
+import csv
+import datetime
+import io
+import random
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from favorites.queries import refresh_favorite_counts
+from stories.cache import bump_story_list_version, invalidate_stories
+from stories.models import Story
+from users.auth_utils import user_cache
+from users.cache import invalidate_user_outputs
+from users.models import User
+
+BENCH_USERNAME_PREFIX = "bench_user_"
+BENCH_PASSWORD = "password"
+
+# Story IDs are derived from the seed and story number, so that a dataset is
+# reproducible row for row:
+BENCH_STORY_NAMESPACE = uuid.UUID("6f1c2a3e-8d4b-4b7a-9f0e-2c5d7e9a1b3c")
+
+BENCH_START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    """
+    Bulk-load a reproducible benchmark dataset.
+
+    Users are named bench_user_<n> (password "password") and story n belongs
+    to user n % users. Favorites are spread evenly over users, never on their
+    own stories, and chosen by a seeded RNG, so the same arguments always
+    produce the same rows. Story.favorite_count is filled in as rows are
+    written.
+
+    Rows are loaded with COPY on PostgreSQL and bulk_create elsewhere, in a
+    single transaction.
+    """
+
+    help = "Bulk-load a parametrized benchmark dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--stories", type=int, default=10000)
+        parser.add_argument("--favorites", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete a previously seeded benchmark dataset first.",
+        )
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        stories = options["stories"]
+        seed = options["seed"]
+        self.batch_size = options["batch_size"]
+
+        if users < 1:
+            raise CommandError("--users must be at least 1.")
+
+        with transaction.atomic():
+            if options["clear"]:
+                clear_bench_data()
+            elif User.objects.filter(
+                username__startswith=BENCH_USERNAME_PREFIX
+            ).exists():
+                raise CommandError(
+                    "A benchmark dataset already exists; pass --clear to "
+                    "replace it."
+                )
+
+            # favorite_count is written with each story, so count first:
+            favorite_counts = [0] * stories
+
+            for _, story in favorite_pairs(
+                seed, users, stories, options["favorites"]
+            ):
+                favorite_counts[story] += 1
+
+            self.load(User, user_rows(users))
+            self.load(Story, story_rows(seed, users, stories, favorite_counts))
+            self.load(
+                User.favorites.through,
+                favorite_rows(seed, users, stories, options["favorites"]),
+            )
+
+        bump_story_list_version()
+
+    def load(self, model, rows):
+        """Insert rows (dicts of column values) into model's table in
+        batches, reporting progress."""
+
+        start = time.perf_counter()
+        count = 0
+        batch = []
+
+        for row in rows:
+            batch.append(row)
+
+            if len(batch) == self.batch_size:
+                insert_rows(model, batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            insert_rows(model, batch)
+            count += len(batch)
+
+        self.stdout.write(
+            f"{model._meta.db_table}: {count} rows in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+
+def insert_rows(model, rows):
+    """Insert rows into model's table with COPY on PostgreSQL, otherwise
+    with bulk_create."""
+
+    if connection.vendor != "postgresql":
+        model.objects.bulk_create([model(**row) for row in rows])
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime.datetime)
+            else value
+            for value in row.values()
+        ])
+
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(copy_statement(model, list(rows[0])), buffer)
+
+
+def copy_statement(model, columns):
+    """
+    Return the COPY ... FROM STDIN statement loading columns of model's table
+    from CSV.
+
+    COPY reads an unquoted empty CSV field as NULL, and csv.writer doesn't
+    quote empty strings, so non-nullable columns are read with FORCE_NOT_NULL
+    to keep empty strings (e.g. User.email) as they are.
+    """
+
+    quote = connection.ops.quote_name
+    nullable = {
+        field.column for field in model._meta.concrete_fields if field.null
+    }
+    not_null = [column for column in columns if column not in nullable]
+
+    statement = (
+        f"COPY {quote(model._meta.db_table)} "
+        f"({', '.join(quote(column) for column in columns)}) "
+        f"FROM STDIN WITH (FORMAT csv"
+    )
+
+    if not_null:
+        statement += (
+            f", FORCE_NOT_NULL "
+            f"({', '.join(quote(column) for column in not_null)})"
+        )
+
+    return statement + ")"
+
+
+def bench_username(n):
+    return f"{BENCH_USERNAME_PREFIX}{n}"
+
+
+def bench_story_id(seed, n):
+    return str(uuid.uuid5(BENCH_STORY_NAMESPACE, f"{seed}:{n}"))
+
+
+def user_rows(users):
+    # Hashing a password per user would dominate seeding time:
+    password = make_password(BENCH_PASSWORD)
+
+    for n in range(users):
+        yield {
+            "username": bench_username(n),
+            "password": password,
+            "first_name": f"First{n}",
+            "last_name": f"Last{n}",
+            "email": "",
+            "is_staff": False,
+            "is_superuser": False,
+            "is_active": True,
+            "date_joined": BENCH_START,
+        }
+
+
+def story_rows(seed, users, stories, favorite_counts):
+    for n in range(stories):
+        created = BENCH_START + datetime.timedelta(seconds=n)
+
+        yield {
+            "id": bench_story_id(seed, n),
+            "user_id": bench_username(n % users),
+            "title": f"Benchmark story {n}",
+            "author": f"Author {n % 997}",
+            "url": f"https://example.com/stories/{n}",
+            "created": created,
+            "modified": created,
+            "favorite_count": favorite_counts[n],
+        }
+
+
+def favorite_rows(seed, users, stories, favorites):
+    for user, story in favorite_pairs(seed, users, stories, favorites):
+        yield {
+            "user_id": bench_username(user),
+            "story_id": bench_story_id(seed, story),
+        }
+
+
+def favorite_pairs(seed, users, stories, favorites):
+    """
+    Yield (user number, story number) favorites, spread evenly over users and
+    never on the user's own stories. Users who would need more favorites than
+    there are other users' stories get as many as there are.
+    """
+
+    rng = random.Random(seed)
+    per_user, extra = divmod(favorites, users)
+
+    for user in range(users):
+        own_stories = len(range(user, stories, users))
+        wanted = min(per_user + (user < extra), stories - own_stories)
+
+        if wanted <= 0:
+            continue
+
+        # Sample extra to make up for any own stories we draw:
+        picks = rng.sample(range(stories), min(stories, wanted + own_stories))
+        picks = [story for story in picks if story % users != user][:wanted]
+
+        for story in picks:
+            yield user, story
+
+
+def clear_bench_data():
+    """
+    Delete a seeded benchmark dataset (favorites, stories, users).
+
+    Favorites bench users left on other stories are deleted too, so those
+    stories are recounted, and cached output of everything touched is
+    dropped.
+    """
+
+    favorites = User.favorites.through.objects
+    bench_favorites = favorites.filter(
+        user__username__startswith=BENCH_USERNAME_PREFIX
+    )
+    bench_story_favorites = favorites.filter(
+        story__user__username__startswith=BENCH_USERNAME_PREFIX
+    )
+
+    usernames = list(
+        User.objects.filter(
+            username__startswith=BENCH_USERNAME_PREFIX
+        ).values_list("username", flat=True)
+    )
+    story_ids = list(
+        Story.objects.filter(
+            user__username__startswith=BENCH_USERNAME_PREFIX
+        ).values_list("id", flat=True)
+    )
+    # Other users' stories favorited by bench users, and other users who
+    # favorited bench stories:
+    recount_ids = list(
+        bench_favorites.exclude(
+            story__user__username__startswith=BENCH_USERNAME_PREFIX
+        ).values_list("story_id", flat=True).distinct()
+    )
+    favoriters = list(
+        bench_story_favorites.exclude(
+            user__username__startswith=BENCH_USERNAME_PREFIX
+        ).values_list("user_id", flat=True).distinct()
+    )
+
+    # LIKE treats "_" in the prefix as a wildcard:
+    pattern = (
+        BENCH_USERNAME_PREFIX.replace("\\", "\\\\")
+        .replace("%", "\\%")
+        .replace("_", "\\_")
+    ) + "%"
+    quote = connection.ops.quote_name
+
+    favorite_table = quote(User.favorites.through._meta.db_table)
+    story_table = quote(Story._meta.db_table)
+    user_table = quote(User._meta.db_table)
+
+    # Raw DELETEs: the ORM would load every row to send delete signals.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""DELETE FROM {favorite_table}
+                WHERE "user_id" LIKE %s ESCAPE '\\'
+                    OR "story_id" IN (
+                        SELECT "id" FROM {story_table}
+                        WHERE "user_id" LIKE %s ESCAPE '\\'
+                    )""",
+            [pattern, pattern],
+        )
+        cursor.execute(
+            f"""DELETE FROM {story_table}
+                WHERE "user_id" LIKE %s ESCAPE '\\'""",
+            [pattern],
+        )
+        cursor.execute(
+            f"""DELETE FROM {user_table}
+                WHERE "username" LIKE %s ESCAPE '\\'""",
+            [pattern],
+        )
+
+    # Without delete signals, invalidate as they would have:
+    refresh_favorite_counts(recount_ids)
+    invalidate_stories(story_ids)
+    invalidate_user_outputs(usernames + favoriters)
+
+    for username in usernames:
+        user_cache.invalidate(username)
+
+    bump_story_list_version()
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0009_story_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
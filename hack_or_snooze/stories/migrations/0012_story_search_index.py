@@ -0,0 +1,105 @@
+from django.db import migrations
+
+# The SQL is spelled out here rather than imported from stories/search.py, so
+# that this migration keeps doing what it did when it was written.
+
+POSTGRES_CREATE_SQL = [
+    """
+    ALTER TABLE stories_story ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') ||
+        setweight(to_tsvector('english', author), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX stories_search_idx ON stories_story
+    USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_DROP_SQL = [
+    "ALTER TABLE stories_story DROP COLUMN search_vector",
+]
+
+SQLITE_CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE stories_story_fts USING fts5(
+        title, author,
+        content='stories_story', content_rowid='rowid',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_insert
+    AFTER INSERT ON stories_story BEGIN
+        INSERT INTO stories_story_fts (rowid, title, author)
+        VALUES (new.rowid, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_delete
+    AFTER DELETE ON stories_story BEGIN
+        INSERT INTO stories_story_fts
+            (stories_story_fts, rowid, title, author)
+        VALUES ('delete', old.rowid, old.title, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_update
+    AFTER UPDATE OF title, author ON stories_story BEGIN
+        INSERT INTO stories_story_fts
+            (stories_story_fts, rowid, title, author)
+        VALUES ('delete', old.rowid, old.title, old.author);
+        INSERT INTO stories_story_fts (rowid, title, author)
+        VALUES (new.rowid, new.title, new.author);
+    END
+    """,
+    # Index any stories that already exist:
+    "INSERT INTO stories_story_fts (stories_story_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS stories_story_fts_insert",
+    "DROP TRIGGER IF EXISTS stories_story_fts_delete",
+    "DROP TRIGGER IF EXISTS stories_story_fts_update",
+    "DROP TABLE IF EXISTS stories_story_fts",
+]
+
+
+def run(schema_editor, postgres_sql, sqlite_sql):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        statements = postgres_sql
+    elif vendor == "sqlite":
+        statements = sqlite_sql
+    else:
+        return
+
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    run(schema_editor, POSTGRES_CREATE_SQL, SQLITE_CREATE_SQL)
+
+
+def backwards(apps, schema_editor):
+    run(schema_editor, POSTGRES_DROP_SQL, SQLITE_DROP_SQL)
+
+
+class Migration(migrations.Migration):
+    """
+    Add the full-text search index over story titles and authors: a
+    generated tsvector column with a GIN index on Postgres, or an FTS5 table
+    kept in sync by triggers on SQLite. Neither is a model field; see
+    stories/search.py for the queries.
+    """
+
+    dependencies = [
+        ('stories', '0011_story_modified_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
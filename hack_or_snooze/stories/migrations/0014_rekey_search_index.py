@@ -0,0 +1,152 @@
+from django.db import migrations
+
+# The SQL is spelled out here rather than imported from stories/search.py, so
+# that this migration keeps doing what it did when it was written.
+
+DROP_ROWID_INDEX_SQL = [
+    "DROP TRIGGER IF EXISTS stories_story_fts_insert",
+    "DROP TRIGGER IF EXISTS stories_story_fts_delete",
+    "DROP TRIGGER IF EXISTS stories_story_fts_update",
+    "DROP TABLE IF EXISTS stories_story_fts",
+]
+
+CREATE_ROWID_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE stories_story_fts USING fts5(
+        title, author,
+        content='stories_story', content_rowid='rowid',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_insert
+    AFTER INSERT ON stories_story BEGIN
+        INSERT INTO stories_story_fts (rowid, title, author)
+        VALUES (new.rowid, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_delete
+    AFTER DELETE ON stories_story BEGIN
+        INSERT INTO stories_story_fts
+            (stories_story_fts, rowid, title, author)
+        VALUES ('delete', old.rowid, old.title, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_update
+    AFTER UPDATE OF title, author ON stories_story BEGIN
+        INSERT INTO stories_story_fts
+            (stories_story_fts, rowid, title, author)
+        VALUES ('delete', old.rowid, old.title, old.author);
+        INSERT INTO stories_story_fts (rowid, title, author)
+        VALUES (new.rowid, new.title, new.author);
+    END
+    """,
+    "INSERT INTO stories_story_fts (stories_story_fts) VALUES ('rebuild')",
+]
+
+# FTS rows carry the story's id; deletes and updates find a story's FTS row
+# through stories_story_fts_rowids, as FTS5 can't index story_id:
+CREATE_STORY_ID_INDEX_SQL = [
+    """
+    CREATE TABLE stories_story_fts_rowids (
+        rowid INTEGER PRIMARY KEY,
+        story_id TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE stories_story_fts USING fts5(
+        story_id UNINDEXED, title, author,
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_insert
+    AFTER INSERT ON stories_story BEGIN
+        INSERT INTO stories_story_fts_rowids (story_id) VALUES (new.id);
+        INSERT INTO stories_story_fts (rowid, story_id, title, author)
+        VALUES (last_insert_rowid(), new.id, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_delete
+    AFTER DELETE ON stories_story BEGIN
+        DELETE FROM stories_story_fts
+        WHERE rowid = (
+            SELECT rowid FROM stories_story_fts_rowids
+            WHERE story_id = old.id
+        );
+        DELETE FROM stories_story_fts_rowids WHERE story_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER stories_story_fts_update
+    AFTER UPDATE OF id, title, author ON stories_story BEGIN
+        UPDATE stories_story_fts
+        SET story_id = new.id, title = new.title, author = new.author
+        WHERE rowid = (
+            SELECT rowid FROM stories_story_fts_rowids
+            WHERE story_id = old.id
+        );
+        UPDATE stories_story_fts_rowids SET story_id = new.id
+        WHERE story_id = old.id;
+    END
+    """,
+    # Index any stories that already exist:
+    """
+    INSERT INTO stories_story_fts_rowids (story_id)
+    SELECT id FROM stories_story
+    """,
+    """
+    INSERT INTO stories_story_fts (rowid, story_id, title, author)
+    SELECT rowids.rowid, story.id, story.title, story.author
+    FROM stories_story_fts_rowids rowids
+    JOIN stories_story story ON story.id = rowids.story_id
+    """,
+]
+
+DROP_STORY_ID_INDEX_SQL = [
+    *DROP_ROWID_INDEX_SQL,
+    "DROP TABLE IF EXISTS stories_story_fts_rowids",
+]
+
+
+def run_on_sqlite(schema_editor, *statement_lists):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    for statements in statement_lists:
+        for sql in statements:
+            schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    run_on_sqlite(
+        schema_editor, DROP_ROWID_INDEX_SQL, CREATE_STORY_ID_INDEX_SQL
+    )
+
+
+def backwards(apps, schema_editor):
+    run_on_sqlite(
+        schema_editor, DROP_STORY_ID_INDEX_SQL, CREATE_ROWID_INDEX_SQL
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    Recreate SQLite's FTS5 search index keyed on story id rather than
+    stories_story's implicit rowid, which VACUUM and table rebuilds may
+    change. The Postgres index is left as it is.
+
+    Migrations that rebuild stories_story on SQLite drop these triggers, and
+    must drop and recreate the index around the rebuild.
+    """
+
+    dependencies = [
+        ('stories', '0013_story_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -15,6 +15,31 @@ class Story(TimeStampedModel, models.Model):
 
     class Meta:
         verbose_name_plural = 'Stories'
+        indexes = [
+            # Supports keyset pagination of the story list (see pagination.py)
+            models.Index(
+                fields=['created', 'id'],
+                name='stories_created_id_idx',
+            ),
+            # Supports the story list ETag watermark (see etags.py)
+            models.Index(
+                fields=['modified'],
+                name='stories_modified_idx',
+            ),
+            # Support the story list's filters and orderings (see filters.py)
+            models.Index(
+                fields=['user', 'created', 'id'],
+                name='stories_user_created_idx',
+            ),
+            models.Index(
+                fields=['author', 'created', 'id'],
+                name='stories_author_created_idx',
+            ),
+            models.Index(
+                fields=['favorite_count', 'id'],
+                name='stories_favorite_count_idx',
+            ),
+        ]
 
     # The goal of using CharField instead of UUIDField here is to ensure that
     # the students *can* encounter a 404 without a lot of jumping through hoops
@@ -40,5 +65,13 @@ class Story(TimeStampedModel, models.Model):
 
     url = models.URLField()
 
+    # Denormalized count of users who favorited this story. Kept up to date by
+    # the favorites app; repair drift with "manage.py sync_favorite_counts".
+    # Changing it doesn't touch "modified", so ETags include it separately
+    # (see etags.py).
+    favorite_count = models.PositiveIntegerField(
+        default=0,
+    )
+
     def __str__(self):
         return self.title
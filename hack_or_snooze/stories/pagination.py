@@ -0,0 +1,99 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from hack_or_snooze.exceptions import InvalidCursorException
+
+from .models import Story
+
+DEFAULT_PAGE_LIMIT = 25
+MAX_PAGE_LIMIT = 100
+
+# Newest stories first; "id" breaks ties between stories created at the same
+# instant so that every story has exactly one position in the ordering:
+KEYSET_ORDERING = ('-created', '-id')
+
+
+def encode_cursor(story, ordering=KEYSET_ORDERING):
+    """
+    Build an opaque cursor pointing just past the given story, in the given
+    (field, "id") ordering.
+
+    EX: story(created=2020-01-01T00:00:00Z, id="abc") ->
+        "MjAyMC0wMS0wMVQwMDowMDowMCswMDowMHxhYmM="
+    """
+
+    value = getattr(story, ordering[0].lstrip("-"))
+
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    raw = f"{value}|{story.id}"
+
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, ordering=KEYSET_ORDERING):
+    """
+    Decode a cursor created by encode_cursor with the same ordering.
+
+    Returns a (value, id) tuple, or None if the cursor is malformed.
+    """
+
+    field = Story._meta.get_field(ordering[0].lstrip("-"))
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, story_id = raw.split("|", 1)
+        return field.to_python(value), story_id
+    # Bad base64 raises binascii.Error, a missing "|" raises ValueError,
+    # non-utf8 bytes raise UnicodeDecodeError and values of the wrong type
+    # (such as a cursor from another ordering) raise ValidationError
+    except (binascii.Error, ValueError, UnicodeDecodeError, ValidationError):
+        return None
+
+
+def paginate_stories(queryset, limit, cursor=None, ordering=KEYSET_ORDERING):
+    """
+    Return one page of stories from queryset using keyset pagination over
+    ordering: a (field, "id") pair, both ascending or both descending.
+
+    Returns a (stories, next_cursor) tuple. next_cursor is None on the last
+    page. Raises InvalidCursorException if cursor is malformed.
+
+    Unlike OFFSET pagination, every page is a single range scan over the
+    ordering's index (e.g. stories_created_id_idx), so page N costs the same
+    as page 1.
+    """
+
+    if cursor is not None:
+        position = decode_cursor(cursor, ordering)
+
+        if position is None:
+            raise InvalidCursorException("Invalid cursor.")
+
+        value, story_id = position
+        field = ordering[0].lstrip("-")
+
+        if ordering[0].startswith("-"):
+            bound, past, id_past = "lte", "lt", "lt"
+        else:
+            bound, past, id_past = "gte", "gt", "gt"
+
+        # The leading bound gives the planner an index range to scan; the Q
+        # filter then skips stories at or before the cursor position.
+        queryset = queryset.filter(**{f"{field}__{bound}": value}).filter(
+            Q(**{f"{field}__{past}": value}) | Q(**{f"id__{id_past}": story_id})
+        )
+
+    # Fetch one extra row to find out whether there is a next page:
+    stories = list(queryset.order_by(*ordering)[:limit + 1])
+
+    if len(stories) > limit:
+        stories = stories[:limit]
+        return stories, encode_cursor(stories[-1], ordering)
+
+    return stories, None
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from ninja import Schema, ModelSchema, Field
 
@@ -9,7 +9,9 @@ from .models import Story
 class StorySchema(ModelSchema):
     """Story Schema"""
 
-    username: str = Field(..., alias="user.username")
+    # User's primary key is the username, so read it straight off the FK
+    # column rather than loading the related User row for every story:
+    username: str = Field(..., alias="user_id")
 
     class Meta:
         model = Story
@@ -22,6 +24,7 @@ class StorySchema(ModelSchema):
             "url",
             "created",
             "modified",
+            "favorite_count",
         ]
 
 
@@ -35,6 +38,16 @@ class StoryGetAllOutput(Schema):
     """Schema for GET /stories response body"""
 
     stories: List[StorySchema]
+    # Only sent when the list is paginated; None on the last page:
+    next: Optional[str] = None
+
+
+class StorySearchOutput(Schema):
+    """Schema for GET /stories/search response body"""
+
+    stories: List[StorySchema]
+    # None on the last page:
+    next: Optional[str]
 
 
 class StoryPostInput(ModelSchema):
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from hack_or_snooze.exceptions import InvalidCursorException
+
+from .models import Story
+from .pagination import KEYSET_ORDERING
+
+# Text search configuration of the Postgres search_vector column (as created
+# by migration 0012):
+SEARCH_CONFIG = "english"
+
+# SQLite FTS5 index over stories_story, keyed on story_id and kept in sync by
+# triggers (see migration 0014). Postgres searches the search_vector column
+# (see migration 0012):
+SQLITE_SEARCH_TABLE = "stories_story_fts"
+
+# Relative weights of title and author matches in SQLite's bm25() ranking;
+# Postgres weights them A and B in search_vector:
+SQLITE_TITLE_WEIGHT = 2.0
+SQLITE_AUTHOR_WEIGHT = 1.0
+
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+# Longest search query accepted, in characters:
+MAX_SEARCH_LENGTH = 200
+
+
+def encode_search_cursor(offset):
+    """
+    Build an opaque cursor for the search results page starting at offset.
+
+    EX: 25 -> "MjU="
+    """
+
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_search_cursor(cursor):
+    """
+    Decode a cursor created by encode_search_cursor.
+
+    Returns the offset, or None if the cursor is malformed.
+    """
+
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+
+    return offset if offset >= 0 else None
+
+
+def find_stories(q, limit, cursor=None, only=None):
+    """
+    Return one page of stories matching all words in q, best match first.
+    Title matches rank above author matches; ties go to the newest story.
+    If given, only the model fields in only (which must include "id") are
+    loaded.
+
+    Returns a (stories, next_cursor) tuple. next_cursor is None on the last
+    page. Raises InvalidCursorException if cursor is malformed or points past
+    the first STORY_SEARCH_MAX_RESULTS matches.
+
+    Ranked results are paged by offset: ranks aren't stable keys, and every
+    page has to rank all matches anyway. Matching is a single lookup in the
+    search index (a GIN index on Postgres, FTS5 on SQLite); the offset is
+    capped so that no page makes the database skip more than
+    STORY_SEARCH_MAX_RESULTS rows.
+    """
+
+    max_results = settings.STORY_SEARCH_MAX_RESULTS
+    offset = 0
+
+    if cursor is not None:
+        offset = decode_search_cursor(cursor)
+
+        if offset is None or offset >= max_results:
+            raise InvalidCursorException("Invalid cursor.")
+
+    limit = min(limit, max_results - offset)
+
+    terms = SEARCH_TERM_PATTERN.findall(q)
+
+    if not terms:
+        return [], None
+
+    # Fetch one extra row to find out whether there is a next page:
+    if connection.vendor == "postgresql":
+        stories = postgres_search(q, limit + 1, offset, only)
+    elif connection.vendor == "sqlite":
+        stories = sqlite_search(terms, limit + 1, offset, only)
+    else:
+        stories = fallback_search(terms, limit + 1, offset, only)
+
+    if len(stories) > limit and offset + limit < max_results:
+        return stories[:limit], encode_search_cursor(offset + limit)
+
+    return stories[:limit], None
+
+
+def story_columns(table, only=None):
+    """Story's columns (or those of the fields in only), qualified by
+    table, for raw SELECTs."""
+
+    quote = connection.ops.quote_name
+
+    return ", ".join(
+        f"{table}.{quote(field.column)}"
+        for field in Story._meta.concrete_fields
+        if only is None or field.attname in only
+    )
+
+
+def postgres_search(q, limit, offset, only=None):
+    return list(Story.objects.raw(
+        f"""
+        SELECT {story_columns("stories_story", only)}
+        FROM stories_story, plainto_tsquery(%s, %s) query
+        WHERE search_vector @@ query
+        ORDER BY ts_rank_cd(search_vector, query) DESC,
+                 created DESC, id DESC
+        LIMIT %s OFFSET %s
+        """,
+        [SEARCH_CONFIG, q, limit, offset],
+    ))
+
+
+def sqlite_search(terms, limit, offset, only=None):
+    # Quote each term so that FTS5 query syntax in q is matched literally:
+    match = " ".join(f'"{term}"' for term in terms)
+
+    return list(Story.objects.raw(
+        f"""
+        SELECT {story_columns("stories_story", only)}
+        FROM {SQLITE_SEARCH_TABLE}
+        JOIN stories_story
+            ON stories_story.id = {SQLITE_SEARCH_TABLE}.story_id
+        WHERE {SQLITE_SEARCH_TABLE} MATCH %s
+        ORDER BY bm25({SQLITE_SEARCH_TABLE}, %s, %s),
+                 stories_story.created DESC, stories_story.id DESC
+        LIMIT %s OFFSET %s
+        """,
+        [match, SQLITE_TITLE_WEIGHT, SQLITE_AUTHOR_WEIGHT, limit, offset],
+    ))
+
+
+def fallback_search(terms, limit, offset, only=None):
+    """Unindexed, unranked search for databases without a search index."""
+
+    queryset = Story.objects.all()
+
+    if only is not None:
+        queryset = queryset.only(*only)
+
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(author__icontains=term)
+        )
+
+    return list(queryset.order_by(*KEYSET_ORDERING)[offset:offset + limit])
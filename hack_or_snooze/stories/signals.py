@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Story
+from .cache import bump_story_list_version, invalidate_stories
+
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_story_list(sender, instance, **kwargs):
+    """
+    Invalidate cached story lists when a story is created, saved or deleted.
+
+    NOTE: QuerySet.update() does not send signals; callers updating stories
+    that way must call bump_story_list_version() themselves.
+    """
+
+    bump_story_list_version()
+
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_story(sender, instance, **kwargs):
+    """
+    Drop a story's cached entry (or cached 404) when it's created, saved or
+    deleted.
+
+    NOTE: as above, callers using QuerySet.update() must call
+    invalidate_stories() themselves.
+    """
+
+    invalidate_stories([instance.pk])
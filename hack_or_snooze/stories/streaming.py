@@ -0,0 +1,106 @@
+from .fields import STORY_FIELDS, sparse_values
+from .pagination import KEYSET_ORDERING
+from .schemas import StorySchema
+
+# Rows fetched per round trip from the server-side cursor; also the number of
+# stories rendered into each chunk of the response body:
+STREAM_CHUNK_SIZE = 1000
+
+
+def stream_stories(renderer, request, queryset, chunk_size=None,
+                   fields=None):
+    """
+    Yield the GET /stories response body for queryset, one chunk at a time.
+
+    Rows are read with a server-side cursor (on PostgreSQL) and rendered
+    chunk_size (default STREAM_CHUNK_SIZE) stories at a time, so memory use
+    doesn't grow with the table. The chunks join up into the same
+    {"stories": [...]} JSON as the non-streaming response.
+
+    If fields (see fields.py) is given, only those fields are read and sent.
+    """
+
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    rows = story_rows(queryset, fields).iterator(chunk_size=chunk_size)
+
+    yield b'{"stories": ['
+
+    chunk = []
+    first = True
+
+    for row in rows:
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            yield render_chunk(renderer, request, chunk, first, fields)
+            chunk = []
+            first = False
+
+    if chunk:
+        yield render_chunk(renderer, request, chunk, first, fields)
+
+    yield b"]}"
+
+
+async def astream_stories(renderer, request, queryset, chunk_size=None,
+                          fields=None):
+    """Async version of stream_stories, for serving under ASGI without
+    handing the iterator to a thread."""
+
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    rows = story_rows(queryset, fields).aiterator(chunk_size=chunk_size)
+
+    yield b'{"stories": ['
+
+    chunk = []
+    first = True
+
+    async for row in rows:
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            yield render_chunk(renderer, request, chunk, first, fields)
+            chunk = []
+            first = False
+
+    if chunk:
+        yield render_chunk(renderer, request, chunk, first, fields)
+
+    yield b"]}"
+
+
+def story_rows(queryset, fields=None):
+    """
+    Return queryset as dicts to render, newest first unless queryset is
+    already ordered: StorySchema-ready rows, or if fields is given, rows of
+    just those fields, ready to render as they are.
+    """
+
+    if not queryset.ordered:
+        queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    if fields is not None:
+        return sparse_values(queryset, fields)
+
+    return queryset.values(*STORY_FIELDS)
+
+
+def render_chunk(renderer, request, rows, first, fields=None):
+    """Render rows from story_rows (with the same fields) as a
+    comma-separated run of story JSON objects."""
+
+    if fields is None:
+        rows = (StorySchema.model_validate(row).model_dump() for row in rows)
+
+    stories = b", ".join(
+        to_bytes(renderer.render(request, row, response_status=200))
+        for row in rows
+    )
+
+    return stories if first else b", " + stories
+
+
+def to_bytes(content):
+    """Renderers may return str or bytes; normalize to bytes."""
+
+    return content.encode() if isinstance(content, str) else content
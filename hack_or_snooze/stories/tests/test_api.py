@@ -1,10 +1,25 @@
 import json
-
-from django.test import TestCase
-
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from hack_or_snooze.testing import (
+    QueryBudgetMixin,
+    make_favorites,
+    make_stories,
+    make_users,
+)
 from users.factories import UserFactory
 from users.auth_utils import generate_token
 from stories.factories import StoryFactory
+from stories.cache import story_list_key
+from stories.models import Story
+from stories.pagination import encode_cursor
+from stories.search import encode_search_cursor
 
 AUTH_KEY = 'token'
 EMPTY_TOKEN_VALUE = ''
@@ -56,6 +71,7 @@ class APIStoriesPostTestCase(TestCase):
                     "title": self.valid_data["title"],
                     "author": self.valid_data["author"],
                     "url": self.valid_data["url"],
+                    "favorite_count": 0,
                     "created": response_date_created,
                     "modified": response_date_modified
                 }
@@ -87,6 +103,7 @@ class APIStoriesPostTestCase(TestCase):
                     "title": self.valid_data["title"],
                     "author": self.valid_data["author"],
                     "url": self.valid_data["url"],
+                    "favorite_count": 0,
                     "created": response_date_created,
                     "modified": response_date_modified
                 }
@@ -328,6 +345,10 @@ class APIStoriesGETAllTestCase(TestCase):
         cls.story_1 = StoryFactory()
         cls.story_2 = StoryFactory()
 
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
     def test_get_all_stories_works(self):
         response = self.client.get(
             '/api/stories/',
@@ -357,6 +378,7 @@ class APIStoriesGETAllTestCase(TestCase):
                         "title": self.story_1.title,
                         "author": self.story_1.author,
                         "url": self.story_1.url,
+                        "favorite_count": self.story_1.favorite_count,
                         "created": response_dates_story1["created"],
                         "modified": response_dates_story1["modified"]
                     },
@@ -366,6 +388,7 @@ class APIStoriesGETAllTestCase(TestCase):
                         "title": self.story_2.title,
                         "author": self.story_2.author,
                         "url": self.story_2.url,
+                        "favorite_count": self.story_2.favorite_count,
                         "created": response_dates_story2["created"],
                         "modified": response_dates_story2["modified"]
                     }
@@ -375,6 +398,358 @@ class APIStoriesGETAllTestCase(TestCase):
         )
 
 
+    def test_get_all_stories_query_count_is_constant(self):
+        """Test that serializing stories by many different users does not
+        load each story's user."""
+
+        for i in range(10):
+            StoryFactory(user=UserFactory(username=f"poster{i}"))
+
+        # ETag watermark, stories:
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/stories/')
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_json["stories"]), 12)
+        self.assertIn(
+            "poster9",
+            [story["username"] for story in response_json["stories"]]
+        )
+
+
+class APIStoriesGETAllPaginatedTestCase(TestCase):
+    """Test GET /stories endpoint with limit/cursor pagination."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stories = [
+            StoryFactory(
+                created=datetime.datetime(
+                    2020, 1, day, tzinfo=datetime.timezone.utc
+                )
+            )
+            for day in range(1, 4)
+        ]
+
+        # Two stories created at the same instant, to check that the cursor
+        # breaks ties by id:
+        cls.stories += [
+            StoryFactory(
+                created=datetime.datetime(
+                    2020, 1, 4, tzinfo=datetime.timezone.utc
+                )
+            )
+            for _ in range(2)
+        ]
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
+    def test_get_stories_paginated_walks_every_story_once(self):
+        story_ids = []
+        cursor = None
+
+        for _ in range(3):
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+
+            response = self.client.get('/api/stories/', params)
+
+            self.assertEqual(response.status_code, 200)
+
+            response_json = json.loads(response.content)
+            story_ids += [story["id"] for story in response_json["stories"]]
+            cursor = response_json["next"]
+
+        self.assertIsNone(cursor)
+
+        expected_ids = [
+            story.id for story in sorted(
+                self.stories,
+                key=lambda story: (story.created, story.id),
+                reverse=True,
+            )
+        ]
+        self.assertEqual(story_ids, expected_ids)
+
+    def test_get_stories_paginated_last_page_next_is_null(self):
+        response = self.client.get('/api/stories/', {"limit": 5})
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_json["stories"]), 5)
+        self.assertIsNone(response_json["next"])
+
+    def test_get_stories_not_paginated_has_no_next(self):
+        response = self.client.get('/api/stories/')
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_json["stories"]), 5)
+        self.assertNotIn("next", response_json)
+
+    def test_get_stories_paginated_fail_invalid_cursor(self):
+        response = self.client.get(
+            '/api/stories/',
+            {"limit": 2, "cursor": "not-a-cursor"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "detail": "Invalid cursor."
+            }
+        )
+
+    def test_get_stories_paginated_fail_limit_out_of_range(self):
+        response = self.client.get('/api/stories/', {"limit": 0})
+
+        self.assertEqual(response.status_code, 422)
+
+
+class APIStoriesGETAllFilteredTestCase(TestCase):
+    """Test GET /stories endpoint with filters and ordering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_2 = UserFactory(username="user2")
+
+        cls.old_story = StoryFactory(
+            author="Ada",
+            favorite_count=5,
+            created=datetime.datetime(
+                2020, 1, 1, tzinfo=datetime.timezone.utc
+            ),
+        )
+        cls.new_story = StoryFactory(
+            author="Grace",
+            favorite_count=1,
+            created=datetime.datetime(
+                2020, 1, 3, tzinfo=datetime.timezone.utc
+            ),
+        )
+        cls.other_user_story = StoryFactory(
+            user=cls.user_2,
+            author="Ada",
+            favorite_count=3,
+            created=datetime.datetime(
+                2020, 1, 2, tzinfo=datetime.timezone.utc
+            ),
+        )
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
+    def get_story_ids(self, params):
+        response = self.client.get('/api/stories/', params)
+
+        self.assertEqual(response.status_code, 200)
+
+        return [
+            story["id"] for story in json.loads(response.content)["stories"]
+        ]
+
+    def test_get_stories_filtered_by_username(self):
+        self.assertEqual(
+            self.get_story_ids({"username": "user2"}),
+            [self.other_user_story.id],
+        )
+
+    def test_get_stories_filtered_by_author(self):
+        self.assertCountEqual(
+            self.get_story_ids({"author": "Ada"}),
+            [self.old_story.id, self.other_user_story.id],
+        )
+
+    def test_get_stories_filtered_by_created(self):
+        self.assertCountEqual(
+            self.get_story_ids({"created_after": "2020-01-01T00:00:00Z"}),
+            [self.new_story.id, self.other_user_story.id],
+        )
+        self.assertEqual(
+            self.get_story_ids({
+                "created_after": "2020-01-01T00:00:00Z",
+                "created_before": "2020-01-03T00:00:00Z",
+            }),
+            [self.other_user_story.id],
+        )
+
+    def test_get_stories_combined_filters(self):
+        self.assertEqual(
+            self.get_story_ids({"username": "user", "author": "Ada"}),
+            [self.old_story.id],
+        )
+
+    def test_get_stories_ordered(self):
+        self.assertEqual(
+            self.get_story_ids({"ordering": "created"}),
+            [self.old_story.id, self.other_user_story.id, self.new_story.id],
+        )
+        self.assertEqual(
+            self.get_story_ids({"ordering": "-favorite_count"}),
+            [self.old_story.id, self.other_user_story.id, self.new_story.id],
+        )
+
+    def test_get_stories_ordered_paginated(self):
+        story_ids = []
+        params = {"ordering": "favorite_count", "limit": 2}
+
+        while True:
+            response = self.client.get('/api/stories/', params)
+            response_json = json.loads(response.content)
+
+            story_ids += [story["id"] for story in response_json["stories"]]
+
+            if response_json["next"] is None:
+                break
+
+            params["cursor"] = response_json["next"]
+
+        self.assertEqual(
+            story_ids,
+            [self.new_story.id, self.other_user_story.id, self.old_story.id],
+        )
+
+    def test_get_stories_filtered_streamed(self):
+        response = self.client.get(
+            '/api/stories/',
+            {"stream": "true", "author": "Ada", "ordering": "created"},
+        )
+        response_json = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [self.old_story.id, self.other_user_story.id],
+        )
+
+    def test_get_stories_fail_cursor_from_other_ordering(self):
+        response = self.client.get('/api/stories/', {"limit": 1})
+        cursor = json.loads(response.content)["next"]
+
+        response = self.client.get(
+            '/api/stories/',
+            {"limit": 1, "cursor": cursor, "ordering": "favorite_count"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"detail": "Invalid cursor."})
+
+    def test_get_stories_fail_unsupported_ordering(self):
+        response = self.client.get('/api/stories/', {"ordering": "title"})
+
+        self.assertEqual(response.status_code, 422)
+
+
+class APIStoriesGETAllStreamingTestCase(TestCase):
+    """Test GET /stories endpoint with stream=true."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stories = [
+            StoryFactory(
+                created=datetime.datetime(
+                    2020, 1, day, tzinfo=datetime.timezone.utc
+                )
+            )
+            for day in range(1, 6)
+        ]
+
+    def test_get_stories_streamed_works(self):
+        response = self.client.get('/api/stories/', {"stream": "true"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("ETag", response)
+
+        streamed = json.loads(b"".join(response.streaming_content))
+        not_streamed = json.loads(self.client.get('/api/stories/').content)
+
+        # Same stories, newest first:
+        self.assertEqual(
+            streamed["stories"],
+            sorted(
+                not_streamed["stories"],
+                key=lambda story: story["created"],
+                reverse=True
+            )
+        )
+
+    def test_get_stories_streamed_across_chunks(self):
+        with mock.patch("stories.streaming.STREAM_CHUNK_SIZE", 2):
+            response = self.client.get('/api/stories/', {"stream": "true"})
+            chunks = list(response.streaming_content)
+
+        response_json = json.loads(b"".join(chunks))
+
+        # Opening, three chunks of stories (2, 2, 1), closing:
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [story.id for story in reversed(self.stories)]
+        )
+
+    async def test_get_stories_streamed_under_asgi(self):
+        response = await self.async_client.get(
+            '/api/stories/',
+            {"stream": "true"}
+        )
+
+        self.assertTrue(response.is_async)
+
+        chunks = [chunk async for chunk in response.streaming_content]
+        response_json = json.loads(b"".join(chunks))
+
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [story.id for story in reversed(self.stories)]
+        )
+
+    def test_get_stories_streamed_empty(self):
+        Story.objects.all().delete()
+
+        response = self.client.get('/api/stories/', {"stream": "true"})
+
+        self.assertJSONEqual(
+            b"".join(response.streaming_content),
+            {
+                "stories": []
+            }
+        )
+
+    def test_get_stories_streamed_not_modified(self):
+        etag = self.client.get('/api/stories/', {"stream": "true"})["ETag"]
+
+        response = self.client.get(
+            '/api/stories/',
+            {"stream": "true"},
+            headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_stories_streamed_fail_paginated(self):
+        response = self.client.get(
+            '/api/stories/',
+            {"stream": "true", "limit": 2}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "detail": "Streamed responses can't be paginated."
+            }
+        )
+
+
 class APIStoriesGETOneTestCase(TestCase):
     """Test GET /stories/{story_id} endpoint."""
 
@@ -407,12 +782,24 @@ class APIStoriesGETOneTestCase(TestCase):
                     "title": self.story_1.title,
                     "author": self.story_1.author,
                     "url": self.story_1.url,
+                    "favorite_count": self.story_1.favorite_count,
                     "created": response_dates_story1["created"],
                     "modified": response_dates_story1["modified"]
                 }
             }
         )
 
+    async def test_stories_get_one_works_under_asgi(self):
+        response = await self.async_client.get(
+            f'/api/stories/{self.story_1.id}'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)["story"]["id"],
+            self.story_1.id
+        )
+
     def test_stories_get_one_404(self):
 
         response = self.client.get(
@@ -429,6 +816,134 @@ class APIStoriesGETOneTestCase(TestCase):
         )
 
 
+class APIStoriesETagTestCase(TestCase):
+    """Test ETag/If-None-Match support on GET /stories endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.story_1 = StoryFactory()
+        cls.user_2 = UserFactory(username="user2")
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
+    def test_get_all_stories_not_modified(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+
+        # Served from the story list cache; nothing is serialized:
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/stories/',
+                headers={"If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_get_all_stories_not_modified_cold_cache(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+
+        # Expire the cached response, but not the story list version:
+        key = story_list_key(RequestFactory().get('/api/stories/'))
+        cache.delete_many([key, f"{key}:etag"])
+
+        # Only the ETag watermark query; nothing is serialized:
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/stories/',
+                headers={"If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    @override_settings(STORY_LIST_CACHE_TTL=0)
+    def test_get_all_stories_not_modified_cache_disabled(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+
+        # Only the ETag watermark query; nothing is serialized:
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/stories/',
+                headers={"If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_all_stories_etag_changes_with_new_story(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+
+        StoryFactory()
+
+        response = self.client.get(
+            '/api/stories/',
+            headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_get_all_stories_etag_differs_per_page(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+        page_etag = self.client.get('/api/stories/', {"limit": 1})["ETag"]
+
+        self.assertNotEqual(page_etag, etag)
+
+    def test_get_one_story_not_modified(self):
+        etag = self.client.get(f'/api/stories/{self.story_1.id}')["ETag"]
+
+        response = self.client.get(
+            f'/api/stories/{self.story_1.id}',
+            headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_get_one_story_etag_changes_when_favorited(self):
+        etag = self.client.get(f'/api/stories/{self.story_1.id}')["ETag"]
+
+        self.user_2.favorites.add(self.story_1)
+
+        response = self.client.get(
+            f'/api/stories/{self.story_1.id}',
+            headers={"If-None-Match": etag}
+        )
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_json["story"]["favorite_count"], 1)
+
+    def test_get_all_stories_etag_changes_when_favorited(self):
+        etag = self.client.get('/api/stories/')["ETag"]
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story_1.id}/favorite',
+            headers={AUTH_KEY: generate_token(self.user_2.username)},
+        )
+
+        response = self.client.get(
+            '/api/stories/',
+            headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_favoriting_leaves_modified_alone(self):
+        self.user_2.favorites.add(self.story_1)
+
+        response = self.client.get(f'/api/stories/{self.story_1.id}')
+        story = json.loads(response.content)["story"]
+
+        self.assertEqual(story["favorite_count"], 1)
+        self.assertEqual(story["modified"], "2020-01-01T00:00:00Z")
+
+
 class APIStoriesDELETETestCase(TestCase):
     """Test DELETE /stories endpoint."""
 
@@ -569,6 +1084,385 @@ class APIStoriesDELETETestCase(TestCase):
             }
         )
 
+
+class APIStoriesSearchTestCase(TestCase):
+    """Test GET /stories/search endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_match = StoryFactory(
+            title="Running Python in production",
+            author="Ada",
+        )
+        cls.author_match = StoryFactory(
+            title="Notes from the road",
+            author="Python Weekly",
+        )
+        cls.other_story = StoryFactory(
+            title="Gardening for beginners",
+            author="Grace",
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/stories/search?{query}')
+
+        self.assertEqual(response.status_code, 200)
+
+        return json.loads(response.content)
+
+    def test_search_ranks_title_matches_first(self):
+        response_json = self.search('q=python')
+
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [self.title_match.id, self.author_match.id],
+        )
+        self.assertIsNone(response_json["next"])
+
+    def test_search_matches_every_word(self):
+        response_json = self.search('q=python+production')
+
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [self.title_match.id],
+        )
+
+    def test_search_stems_words(self):
+        response_json = self.search('q=run')
+
+        self.assertEqual(
+            [story["id"] for story in response_json["stories"]],
+            [self.title_match.id],
+        )
+
+    def test_search_no_matches(self):
+        self.assertEqual(self.search('q=cooking')["stories"], [])
+
+    def test_search_ignores_query_syntax(self):
+        response_json = self.search('q=%22python%22*+-(')
+
+        self.assertEqual(len(response_json["stories"]), 2)
+
+    def test_search_sees_new_and_edited_stories(self):
+        story = StoryFactory(title="Python packaging", author="Guido")
+
+        self.assertEqual(len(self.search('q=python')["stories"]), 3)
+
+        story.title = "Rust packaging"
+        story.save()
+
+        self.assertEqual(len(self.search('q=python')["stories"]), 2)
+        self.assertEqual(len(self.search('q=rust')["stories"]), 1)
+
+        story.delete()
+
+        self.assertEqual(self.search('q=rust')["stories"], [])
+
+    def test_search_paginated_walks_every_match_once(self):
+        for i in range(5):
+            StoryFactory(title=f"Python tip {i}")
+
+        seen = []
+        query = 'q=python&limit=3'
+
+        while True:
+            response_json = self.search(query)
+            seen.extend(story["id"] for story in response_json["stories"])
+
+            if response_json["next"] is None:
+                break
+
+            query = f'q=python&limit=3&cursor={response_json["next"]}'
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_search_fail_invalid_cursor(self):
+        response = self.client.get('/api/stories/search?q=python&cursor=bad')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"detail": "Invalid cursor."})
+
+    def test_search_fail_huge_cursor(self):
+        cursor = encode_search_cursor(99999999999999999999999)
+        response = self.client.get(
+            f'/api/stories/search?q=python&cursor={cursor}'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"detail": "Invalid cursor."})
+
+    @override_settings(STORY_SEARCH_MAX_RESULTS=2)
+    def test_search_stops_at_max_results(self):
+        StoryFactory(title="Python tip")
+
+        response_json = self.search('q=python&limit=25')
+        past_cap = self.client.get(
+            f'/api/stories/search?q=python&cursor={encode_search_cursor(2)}'
+        )
+
+        self.assertEqual(len(response_json["stories"]), 2)
+        self.assertIsNone(response_json["next"])
+        self.assertEqual(past_cap.status_code, 400)
+        self.assertJSONEqual(past_cap.content, {"detail": "Invalid cursor."})
+
+    @override_settings(STORY_SEARCH_MAX_RESULTS=2)
+    def test_search_no_cursor_past_max_results(self):
+        StoryFactory(title="Python tip")
+
+        response_json = self.search('q=python&limit=1')
+        next_json = self.search(
+            f'q=python&limit=1&cursor={response_json["next"]}'
+        )
+
+        self.assertEqual(len(next_json["stories"]), 1)
+        self.assertIsNone(next_json["next"])
+
+    def test_search_fail_missing_query(self):
+        response = self.client.get('/api/stories/search')
+
+        self.assertEqual(response.status_code, 422)
+
+
+class APIStoriesSparseFieldsTestCase(TestCase):
+    """Test story endpoints with a "fields" sparse fieldset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.story = StoryFactory(title="Python tips")
+        cls.story_2 = StoryFactory(title="Python tricks")
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
+    def test_get_stories_sparse(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/stories/?fields=title,id')
+
+        stories = json.loads(response.content)["stories"]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            stories,
+            [
+                {"id": self.story.id, "title": "Python tips"},
+                {"id": self.story_2.id, "title": "Python tricks"},
+            ],
+        )
+        # Unrequested columns aren't read:
+        self.assertNotIn('"url"', queries.captured_queries[-1]["sql"])
+
+    def test_get_stories_sparse_matches_full_values(self):
+        response = self.client.get('/api/stories/')
+        full = json.loads(response.content)["stories"]
+
+        response = self.client.get(
+            '/api/stories/?fields=id,username,created,favorite_count'
+        )
+        sparse = json.loads(response.content)["stories"]
+
+        self.assertCountEqual(
+            sparse,
+            [
+                {
+                    key: story[key]
+                    for key in ["id", "username", "created", "favorite_count"]
+                }
+                for story in full
+            ],
+        )
+
+    def test_get_stories_sparse_paginated(self):
+        story_ids = []
+        params = {"fields": "title", "limit": 1}
+
+        while True:
+            response = self.client.get('/api/stories/', params)
+            response_json = json.loads(response.content)
+
+            self.assertEqual(
+                [set(story) for story in response_json["stories"]],
+                [{"title"}],
+            )
+            story_ids += response_json["stories"]
+
+            if response_json["next"] is None:
+                break
+
+            params["cursor"] = response_json["next"]
+
+        self.assertEqual(len(story_ids), 2)
+
+    def test_get_stories_sparse_streamed(self):
+        response = self.client.get('/api/stories/?stream=true&fields=id')
+        response_json = json.loads(b"".join(response.streaming_content))
+
+        self.assertCountEqual(
+            response_json["stories"],
+            [{"id": self.story.id}, {"id": self.story_2.id}],
+        )
+
+    def test_get_story_sparse(self):
+        response = self.client.get(
+            f'/api/stories/{self.story.id}?fields=id,title'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {"story": {"id": self.story.id, "title": "Python tips"}},
+        )
+
+        full_response = self.client.get(f'/api/stories/{self.story.id}')
+
+        self.assertNotEqual(response["ETag"], full_response["ETag"])
+
+        response = self.client.get(
+            f'/api/stories/{self.story.id}?fields=id,title',
+            headers={"If-None-Match": response["ETag"]},
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_stories_sparse(self):
+        response = self.client.get('/api/stories/search?q=tips&fields=id')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {"stories": [{"id": self.story.id}], "next": None},
+        )
+
+    def test_sparse_fail_unknown_fields(self):
+        for path in [
+            '/api/stories/',
+            f'/api/stories/{self.story.id}',
+            '/api/stories/search?q=tips&',
+        ]:
+            with self.subTest(path=path):
+                separator = "&" if "?" in path else "?"
+                response = self.client.get(
+                    f'{path}{separator}fields=id,bogus,password'
+                )
+
+                self.assertEqual(response.status_code, 400)
+                self.assertJSONEqual(
+                    response.content,
+                    {"detail": "Unknown story fields: bogus, password."},
+                )
+
+    def test_sparse_fail_no_fields(self):
+        response = self.client.get('/api/stories/?fields=,')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            {"detail": "No story fields requested."},
+        )
+
+
+class APIStoriesQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test /stories endpoints make a constant number of queries as stories
+    and favorites grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_token = generate_token(cls.user.username)
+
+    def test_post_story_query_budget(self):
+        def populate(size):
+            make_stories(size, [self.user])
+
+        self.assertQueryBudget(
+            "stories_api_create_story",
+            populate,
+            lambda _: self.client.post(
+                '/api/stories/',
+                data={
+                    "author": "test_author",
+                    "title": "test_title",
+                    "url": "http://test.com",
+                },
+                headers={AUTH_KEY: self.user_token},
+                content_type="application/json",
+            ),
+        )
+
+    def test_get_all_stories_query_budget(self):
+        def populate(size):
+            make_stories(size, make_users(size))
+
+        for query in [
+            "",
+            "?limit=25",
+            "?stream=true",
+            "?username=user&ordering=-favorite_count&limit=25",
+            "?fields=id,title&limit=25",
+            "?fields=id,title",
+        ]:
+            with self.subTest(query=query):
+                self.assertQueryBudget(
+                    "stories_api_get_stories",
+                    populate,
+                    lambda _: self.client.get(f'/api/stories/{query}'),
+                )
+
+    def test_get_all_stories_paginated_query_budget(self):
+        def populate(size):
+            stories = make_stories(size, make_users(size))
+            return encode_cursor(stories[0])
+
+        self.assertQueryBudget(
+            "stories_api_get_stories",
+            populate,
+            lambda cursor: self.client.get(
+                f'/api/stories/?limit=25&cursor={cursor}'
+            ),
+        )
+
+    def test_search_stories_query_budget(self):
+        def populate(size):
+            make_stories(size, make_users(size))
+
+        self.assertQueryBudget(
+            "stories_api_search_stories",
+            populate,
+            lambda _: self.client.get('/api/stories/search?q=test&limit=25'),
+        )
+
+    def test_get_story_query_budget(self):
+        def populate(size):
+            [story] = make_stories(1, make_users(1))
+            make_favorites(make_users(size), [story])
+            return story
+
+        for query in ["", "?fields=id,title"]:
+            with self.subTest(query=query):
+                self.assertQueryBudget(
+                    "stories_api_get_story",
+                    populate,
+                    lambda story: self.client.get(
+                        f'/api/stories/{story.id}{query}'
+                    ),
+                )
+
+    def test_delete_story_query_budget(self):
+        def populate(size):
+            [story] = make_stories(1, [self.user])
+            make_favorites(make_users(size), [story])
+            return story
+
+        self.assertQueryBudget(
+            "stories_api_delete_story",
+            populate,
+            lambda story: self.client.delete(
+                f'/api/stories/{story.id}',
+                headers={AUTH_KEY: self.user_token},
+            ),
+        )
+
 # POST /
 # works ok w/ user token ✅
 # works ok w/ staff token ✅
@@ -583,10 +1477,28 @@ class APIStoriesDELETETestCase(TestCase):
 
 # GET /
 # works ok✅
+# query count does not grow with number of story users✅
+# paginated: walks every story once✅
+# paginated: last page next is null✅
+# not paginated: no next✅
+# 400 if cursor invalid✅
+# 422 if limit out of range✅
+# 304 if If-None-Match matches ETag✅
+# ETag changes with new story✅
+# ETag differs per page✅
+# streamed: same stories, newest first✅
+# streamed: valid JSON across chunks✅
+# streamed: async iterator under ASGI✅
+# streamed: empty table✅
+# streamed: 304 if If-None-Match matches ETag✅
+# streamed: 400 if paginated✅
 
 # GET /{story_id}
 # works ok✅
+# works ok under ASGI✅
 # 404 if user not found✅
+# 304 if If-None-Match matches ETag✅
+# ETag changes when favorited✅
 
 # DELETE /stores/{story_id}
 # works ok w/ user token✅
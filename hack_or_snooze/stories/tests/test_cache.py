@@ -0,0 +1,314 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+from prometheus_client import REGISTRY
+
+from users.factories import UserFactory
+from users.auth_utils import generate_token
+from stories.factories import StoryFactory
+from stories.cache import cached_story_list, story_row
+
+AUTH_KEY = 'token'
+
+MISSING_STORY_ID = "0b3f5c2a-6a2e-4f0e-9d8b-2f1d3c4b5a69"
+
+
+def lookups(result):
+    return REGISTRY.get_sample_value(
+        "hack_or_snooze_story_cache_lookups_total", {"result": result}
+    ) or 0
+
+
+class StoryListCacheTestCase(TestCase):
+    """Test cached_story_list read-through and stampede protection."""
+
+    def setUp(self):
+        cache.clear()
+
+        self.request = RequestFactory().get('/api/stories/')
+        self.render = mock.Mock(return_value=('"etag"', b'{"stories": []}'))
+
+    def test_miss_renders_then_hit_is_cached(self):
+        first = cached_story_list(self.request, self.render)
+        second = cached_story_list(self.request, self.render)
+
+        self.assertEqual(first, ('"etag"', b'{"stories": []}'))
+        self.assertEqual(second, first)
+        self.render.assert_called_once()
+
+    def test_waits_for_rebuild_in_progress_then_falls_back(self):
+        cached_story_list(self.request, self.render)
+        cache.clear()
+
+        # Simulate another request holding the rebuild lock:
+        with mock.patch("stories.cache.cache.add", return_value=False), \
+                mock.patch("stories.cache.REBUILD_WAIT_SECONDS", 0.1):
+            rendered = cached_story_list(self.request, self.render)
+
+        self.assertEqual(rendered, ('"etag"', b'{"stories": []}'))
+        self.assertEqual(self.render.call_count, 2)
+
+    @override_settings(STORY_LIST_CACHE_TTL=0)
+    def test_disabled_with_zero_ttl(self):
+        cached_story_list(self.request, self.render)
+        cached_story_list(self.request, self.render)
+
+        self.assertEqual(self.render.call_count, 2)
+
+
+class StoryListCacheInvalidationTestCase(TestCase):
+    """Test writes to stories invalidate the cached GET /stories response."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_2 = UserFactory(username="user2")
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.user2_token = generate_token(cls.user_2.username)
+
+        cls.story = StoryFactory()
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story list cache:
+        cache.clear()
+
+    def get_stories(self):
+        response = self.client.get('/api/stories/')
+        return json.loads(response.content)["stories"]
+
+    def test_cache_hit_needs_no_queries(self):
+        self.get_stories()
+
+        with self.assertNumQueries(0):
+            stories = self.get_stories()
+
+        self.assertEqual(len(stories), 1)
+
+    def test_create_story_invalidates(self):
+        self.get_stories()
+
+        self.client.post(
+            '/api/stories/',
+            data=json.dumps({
+                "author": "post_test_author",
+                "title": "post_test_title",
+                "url": "post_test_url"
+            }),
+            headers={AUTH_KEY: self.user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(len(self.get_stories()), 2)
+
+    def test_delete_story_invalidates(self):
+        self.get_stories()
+
+        self.client.delete(
+            f'/api/stories/{self.story.id}',
+            headers={AUTH_KEY: self.user_token},
+        )
+
+        self.assertEqual(self.get_stories(), [])
+
+    def test_story_save_invalidates(self):
+        self.get_stories()
+
+        self.story.title = "saved_title"
+        self.story.save()
+
+        self.assertEqual(self.get_stories()[0]["title"], "saved_title")
+
+    def test_add_favorite_invalidates(self):
+        self.get_stories()
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/favorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.assertEqual(self.get_stories()[0]["favorite_count"], 1)
+
+
+class StoryCacheTestCase(TestCase):
+    """Test GET /stories/{story_id} reads through the story cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_2 = UserFactory(username="user2")
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.user2_token = generate_token(cls.user_2.username)
+
+        cls.story = StoryFactory()
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the story cache:
+        cache.clear()
+
+    def get_story(self, story_id=None):
+        return self.client.get(f'/api/stories/{story_id or self.story.id}')
+
+    def test_cache_hit_needs_no_queries(self):
+        first = self.get_story()
+
+        with self.assertNumQueries(0):
+            second = self.get_story()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(second.content), json.loads(first.content))
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_sparse_fields_served_from_cache(self):
+        self.get_story()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f'/api/stories/{self.story.id}?fields=title,username'
+            )
+
+        self.assertEqual(json.loads(response.content), {
+            "story": {
+                "title": self.story.title,
+                "username": self.story.user.username,
+            }
+        })
+
+    def test_missing_story_cached(self):
+        self.get_story(MISSING_STORY_ID)
+
+        with self.assertNumQueries(0):
+            response = self.get_story(MISSING_STORY_ID)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            json.loads(response.content), {"detail": "Not Found"}
+        )
+
+    @override_settings(STORY_NOT_FOUND_CACHE_TTL=0)
+    def test_missing_story_not_cached_with_zero_ttl(self):
+        self.get_story(MISSING_STORY_ID)
+
+        with self.assertNumQueries(1):
+            self.get_story(MISSING_STORY_ID)
+
+    @override_settings(STORY_CACHE_TTL=0)
+    def test_disabled_with_zero_ttl(self):
+        self.get_story()
+
+        with self.assertNumQueries(1):
+            self.get_story()
+
+    def test_lookups_counted_by_result(self):
+        hits = lookups("hit")
+        misses = lookups("miss")
+        not_found_hits = lookups("not_found_hit")
+
+        self.get_story()
+        self.get_story()
+        self.get_story(MISSING_STORY_ID)
+        self.get_story(MISSING_STORY_ID)
+
+        self.assertEqual(lookups("hit") - hits, 1)
+        self.assertEqual(lookups("miss") - misses, 2)
+        self.assertEqual(lookups("not_found_hit") - not_found_hits, 1)
+
+    def test_story_save_invalidates(self):
+        self.get_story()
+
+        self.story.title = "saved_title"
+        self.story.save()
+
+        story = json.loads(self.get_story().content)["story"]
+        self.assertEqual(story["title"], "saved_title")
+
+    def test_create_story_invalidates_not_found(self):
+        story = StoryFactory.build(id=MISSING_STORY_ID, user=self.user)
+
+        self.get_story(MISSING_STORY_ID)
+        story.save()
+
+        self.assertEqual(self.get_story(MISSING_STORY_ID).status_code, 200)
+
+    def test_read_racing_a_save_not_served(self):
+        def read_then_save(story_id):
+            # Another request saves the story between our read and our set:
+            row = story_row(story_id)
+            self.story.title = "saved_title"
+            self.story.save()
+            return row
+
+        with mock.patch("stories.cache.story_row", read_then_save):
+            self.get_story()
+
+        story = json.loads(self.get_story().content)["story"]
+        self.assertEqual(story["title"], "saved_title")
+
+    def test_read_racing_a_create_not_served(self):
+        story = StoryFactory.build(id=MISSING_STORY_ID, user=self.user)
+
+        def read_then_create(story_id):
+            row = story_row(story_id)
+            story.save()
+            return row
+
+        with mock.patch("stories.cache.story_row", read_then_create):
+            self.get_story(MISSING_STORY_ID)
+
+        self.assertEqual(self.get_story(MISSING_STORY_ID).status_code, 200)
+
+    def test_delete_story_invalidates(self):
+        self.get_story()
+
+        self.client.delete(
+            f'/api/stories/{self.story.id}',
+            headers={AUTH_KEY: self.user_token},
+        )
+
+        self.assertEqual(self.get_story().status_code, 404)
+
+    def test_favorite_invalidates(self):
+        self.get_story()
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/favorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+        favorited = json.loads(self.get_story().content)["story"]
+
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/unfavorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+        unfavorited = json.loads(self.get_story().content)["story"]
+
+        self.assertEqual(favorited["favorite_count"], 1)
+        self.assertEqual(unfavorited["favorite_count"], 0)
+
+    def test_bulk_favorites_invalidate(self):
+        self.get_story()
+
+        self.client.post(
+            '/api/favorites/user2/bulk',
+            data=json.dumps({"add": [str(self.story.id)], "remove": []}),
+            headers={AUTH_KEY: self.user2_token},
+            content_type="application/json"
+        )
+
+        story = json.loads(self.get_story().content)["story"]
+        self.assertEqual(story["favorite_count"], 1)
+
+    def test_deleting_favoriting_user_invalidates(self):
+        self.client.post(
+            f'/api/favorites/user2/{self.story.id}/favorite',
+            headers={AUTH_KEY: self.user2_token},
+        )
+        self.get_story()
+
+        self.user_2.delete()
+
+        story = json.loads(self.get_story().content)["story"]
+        self.assertEqual(story["favorite_count"], 0)
@@ -0,0 +1,272 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from stories.cache import cached_story
+from stories.factories import StoryFactory
+from favorites.schemas import MAX_BULK_FAVORITES
+from hack_or_snooze.renderers import FastJSONRenderer
+from stories.management.commands.bench import (
+    SCENARIOS,
+    FavoriteToggle,
+    InProcessClient,
+    UserPatch,
+)
+from stories.management.commands.bench_renderers import story_list_payload
+from stories.management.commands.seed_bench import copy_statement
+from stories.models import Story
+from users.auth_utils import generate_token
+from users.factories import UserFactory
+from users.models import User
+
+
+def seed(*args):
+    call_command(
+        "seed_bench",
+        "--users", "3",
+        "--stories", "10",
+        "--favorites", "12",
+        *args,
+        stdout=StringIO(),
+    )
+
+
+class SeedBenchTestCase(TestCase):
+    """Test the seed_bench management command."""
+
+    def test_seeds_dataset(self):
+        seed()
+
+        favorites = User.favorites.through.objects.all()
+
+        self.assertEqual(
+            User.objects.filter(username__startswith="bench_user_").count(),
+            3,
+        )
+        self.assertEqual(Story.objects.count(), 10)
+        self.assertEqual(favorites.count(), 12)
+        self.assertEqual(
+            Story.objects.aggregate(total=Sum("favorite_count"))["total"],
+            12,
+        )
+        self.assertFalse(
+            favorites.filter(story__user_id=F("user_id")).exists()
+        )
+
+    def test_same_seed_same_dataset(self):
+        seed()
+        first = set(favorite_pairs())
+
+        seed("--clear")
+
+        self.assertEqual(set(favorite_pairs()), first)
+
+        seed("--clear", "--seed", "1")
+
+        self.assertNotEqual(set(favorite_pairs()), first)
+
+    def test_copy_keeps_empty_strings(self):
+        statement = copy_statement(
+            User, ["username", "email", "first_name", "last_name", "is_staff"]
+        )
+
+        self.assertIn(
+            'FORCE_NOT_NULL ("username", "email", "first_name", "last_name", '
+            '"is_staff")',
+            statement,
+        )
+
+    def test_copy_leaves_nullable_columns_alone(self):
+        statement = copy_statement(User, ["username", "last_login"])
+
+        self.assertIn('FORCE_NOT_NULL ("username"))', statement)
+
+    def test_seeded_users_have_empty_email(self):
+        # On PostgreSQL this goes through COPY:
+        seed()
+
+        self.assertEqual(
+            set(User.objects.values_list("email", flat=True)), {""}
+        )
+
+    def test_clear_leaves_lookalike_users(self):
+        lookalike = UserFactory(username="benchXuserX1")
+        seed()
+
+        seed("--clear")
+
+        self.assertTrue(User.objects.filter(pk=lookalike.pk).exists())
+
+    def test_clear_recounts_other_stories(self):
+        seed()
+        story = StoryFactory(user=UserFactory(), favorite_count=1)
+        User.favorites.through.objects.create(
+            user_id="bench_user_0", story_id=story.id
+        )
+        cache.clear()
+        cached_story(story.id)
+
+        seed("--clear")
+
+        story.refresh_from_db()
+        self.assertEqual(story.favorite_count, 0)
+        self.assertEqual(cached_story(story.id)["favorite_count"], 0)
+
+    def test_clear_invalidates_favoriters(self):
+        seed()
+        user = UserFactory()
+        user.favorites.add(Story.objects.first())
+        cache.clear()
+        self.client.get(
+            f'/api/users/{user.username}?view=summary',
+            headers={'token': generate_token(user.username)},
+        )
+
+        seed("--clear", "--seed", "1")
+
+        response = self.client.get(
+            f'/api/users/{user.username}?view=summary',
+            headers={'token': generate_token(user.username)},
+        )
+        self.assertEqual(
+            json.loads(response.content)["user"]["favorite_ids"], []
+        )
+
+    def test_refuses_to_seed_twice(self):
+        seed()
+
+        with self.assertRaises(CommandError):
+            seed()
+
+
+class BenchTestCase(TestCase):
+    """Test the bench management command."""
+
+    def test_reports_every_scenario(self):
+        seed()
+
+        out = StringIO()
+        stories = set(Story.objects.values_list("id", "favorite_count"))
+
+        call_command(
+            "bench",
+            "--requests", "2",
+            "--warmup", "0",
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report["scenarios"]), set(SCENARIOS))
+        self.assertEqual(report["meta"]["stories"], 10)
+
+        for name, result in report["scenarios"].items():
+            with self.subTest(name):
+                self.assertEqual(result["errors"], 0)
+                self.assertIsNotNone(result["queries"])
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+        # Everything the scenarios created is cleaned up:
+        self.assertEqual(
+            set(Story.objects.values_list("id", "favorite_count")),
+            stories,
+        )
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_favorite_teardown_chunks_bulk_removes(self):
+        seed("--stories", "1600", "--favorites", "0")
+        scenario = FavoriteToggle(InProcessClient(), "bench_user_0")
+        scenario.setup(2 * MAX_BULK_FAVORITES)
+        User.objects.get(username="bench_user_0").favorites.add(
+            *scenario.story_ids
+        )
+
+        scenario.teardown()
+
+        self.assertGreater(len(scenario.story_ids), MAX_BULK_FAVORITES)
+        self.assertFalse(
+            User.favorites.through.objects.filter(
+                user_id="bench_user_0"
+            ).exists()
+        )
+
+    def test_user_patch_teardown_invalidates(self):
+        seed()
+        cache.clear()
+        client = InProcessClient()
+        scenario = UserPatch(client, "bench_user_0")
+        scenario.setup(1)
+        scenario.request(0)
+        client.request("GET", "/api/users/bench_user_0", token=scenario.token)
+
+        scenario.teardown()
+
+        _, _, body = client.request(
+            "GET", "/api/users/bench_user_0", token=scenario.token
+        )
+        self.assertEqual(json.loads(body)["user"]["first_name"], "First0")
+
+    @override_settings(METRICS_TOKEN="metrics-secret")
+    def test_metrics_with_metrics_token(self):
+        seed()
+        out = StringIO()
+
+        call_command(
+            "bench",
+            "--scenario", "metrics",
+            "--requests", "2",
+            "--warmup", "0",
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        result = json.loads(out.getvalue())["scenarios"]["metrics"]
+
+        self.assertEqual(result["errors"], 0)
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_requires_dataset(self):
+        with self.assertRaises(CommandError):
+            call_command("bench", stdout=StringIO())
+
+
+class BenchRenderersTestCase(SimpleTestCase):
+    """Test the bench_renderers management command."""
+
+    def test_reports_each_renderer(self):
+        out = StringIO()
+
+        call_command(
+            "bench_renderers", "--sizes", "10", "--repeat", "1", stdout=out
+        )
+
+        self.assertIn("stdlib", out.getvalue())
+        self.assertIn("fast", out.getvalue())
+
+    def test_same_seed_same_payload(self):
+        self.assertEqual(story_list_payload(10), story_list_payload(10))
+        self.assertNotEqual(
+            story_list_payload(10), story_list_payload(10, seed=1)
+        )
+
+    def test_mismatched_output_fails(self):
+        with mock.patch.object(
+            FastJSONRenderer, "render", return_value=b'{"stories": []}'
+        ):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "bench_renderers",
+                    "--sizes", "10",
+                    "--repeat", "1",
+                    stdout=StringIO(),
+                )
+
+
+def favorite_pairs():
+    return User.favorites.through.objects.values_list("user_id", "story_id")
@@ -0,0 +1,67 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+
+from stories.factories import StoryFactory
+from stories.filters import STORY_ORDERINGS, filter_stories
+from stories.models import Story
+from stories.pagination import DEFAULT_PAGE_LIMIT, KEYSET_ORDERING
+
+CREATED = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class StoryFilterIndexTestCase(TestCase):
+    """Test each story list filter and ordering is served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        StoryFactory()
+
+    def setUp(self):
+        # Tiny test tables are cheaper to scan than to look up, so make
+        # Postgres show the plan it would use for a real table:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert the first page of queryset is read with index_name."""
+
+        plan = queryset[:DEFAULT_PAGE_LIMIT + 1].explain()
+
+        self.assertIn(index_name, plan)
+
+    def test_filters_use_indexes(self):
+        filters = [
+            ({"username": "user"}, "stories_user_created_idx"),
+            ({"author": "test_author"}, "stories_author_created_idx"),
+            ({"created_after": CREATED}, "stories_created_id_idx"),
+            ({"created_before": CREATED}, "stories_created_id_idx"),
+        ]
+
+        for params, index_name in filters:
+            with self.subTest(**params):
+                queryset = filter_stories(Story.objects.all(), **params)
+
+                self.assertUsesIndex(
+                    queryset.order_by(*KEYSET_ORDERING),
+                    index_name,
+                )
+
+    def test_orderings_use_indexes(self):
+        orderings = {
+            "-created": "stories_created_id_idx",
+            "created": "stories_created_id_idx",
+            "-favorite_count": "stories_favorite_count_idx",
+            "favorite_count": "stories_favorite_count_idx",
+        }
+
+        self.assertEqual(set(orderings), set(STORY_ORDERINGS))
+
+        for ordering, index_name in orderings.items():
+            with self.subTest(ordering=ordering):
+                self.assertUsesIndex(
+                    Story.objects.order_by(*STORY_ORDERINGS[ordering]),
+                    index_name,
+                )
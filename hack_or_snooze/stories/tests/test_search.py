@@ -0,0 +1,59 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from stories.factories import StoryFactory
+from stories.search import find_stories
+
+SQLITE_SEARCH_TRIGGERS = {
+    "stories_story_fts_insert",
+    "stories_story_fts_delete",
+    "stories_story_fts_update",
+}
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite FTS5 index only")
+class SQLiteSearchIndexTestCase(TestCase):
+    """Test the SQLite FTS5 search index is kept in sync with stories."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.story = StoryFactory(title="Running Python in production")
+
+    def search(self, q):
+        stories, _ = find_stories(q, 10)
+
+        return [story.id for story in stories]
+
+    def test_triggers_exist_after_migrate(self):
+        # Migrations that rebuild stories_story drop its triggers:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = 'stories_story'"
+            )
+            triggers = {name for name, in cursor.fetchall()}
+
+        self.assertEqual(triggers, SQLITE_SEARCH_TRIGGERS)
+
+    def test_index_survives_rowid_changes(self):
+        # As VACUUM or a table rebuild may renumber them:
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE stories_story SET rowid = rowid + 1000")
+
+        self.assertEqual(self.search("python"), [self.story.id])
+
+    def test_index_follows_updates(self):
+        self.story.title = "Gardening for beginners"
+        self.story.save()
+
+        self.assertEqual(self.search("python"), [])
+        self.assertEqual(self.search("gardening"), [self.story.id])
+
+    def test_index_follows_deletes(self):
+        other_story = StoryFactory(title="Python packaging")
+
+        self.story.delete()
+
+        self.assertEqual(self.search("python"), [other_story.id])
@@ -1,7 +1,11 @@
+from typing import Union
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.signals import user_login_failed
 from django.core.exceptions import ObjectDoesNotExist
-from django.shortcuts import get_object_or_404
-from django.db import transaction
-from django.contrib.auth import authenticate
+from django.shortcuts import aget_object_or_404
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
 
 from ninja import Router
 
@@ -9,18 +13,27 @@ from hack_or_snooze.error_schemas import (
     BadRequest,
     Unauthorized,
     ObjectNotFound,
+    ServiceUnavailable,
 )
 from stories.models import Story
 
 from .schemas import (
     UserOutput,
+    UserSummaryOutput,
     UserPatchInput,
     SignupInput,
     LoginInput,
     AuthOutput,
+    AuthSummaryOutput,
+    UserView,
+    USER_VIEW_FULL,
+    USER_VIEW_SUMMARY,
+    auser_for_view,
 )
 from .models import User
 from .auth_utils import AUTH_KEY, token_header, generate_token
+from .cache import acached_user_output
+from .hashing import ahash_password, acheck_password
 
 router = Router()
 
@@ -29,9 +42,13 @@ router = Router()
 
 @router.post(
     '/signup',
-    response={201: AuthOutput, 400: BadRequest}
+    response={
+        201: Union[AuthOutput, AuthSummaryOutput],
+        400: BadRequest,
+        503: ServiceUnavailable
+    }
 )
-def signup(request, data: SignupInput):
+async def signup(request, data: SignupInput, view: UserView = USER_VIEW_FULL):
     """
     Handles user signup. User must send:
 
@@ -56,38 +73,65 @@ def signup(request, data: SignupInput):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists:
+
+        {
+            "token": "test:098f6bcd4621",
+            "user": {
+                "story_count": 1,
+                "story_ids": ["725ff2f9-2cc4-4e29-abab-95b9921f5a6b"],
+                "favorite_count": 0,
+                "favorite_ids": [],
+                "username": "test",
+                "first_name": "First",
+                "last_name": "Last",
+                "date_joined": "2000-01-01T00:00:00Z"
+            }
+        }
+
     On failure for repeat username, returns error JSON:
 
         {
             "detail": "Username already exists."
         }
 
+    If the server is too busy hashing passwords, returns a 503 with a
+    Retry-After header:
+
+        {
+            "detail": "Too many requests. Please try again shortly."
+        }
+
     **Authentication: none**
     """
-    if User.objects.filter(username=data.username).exists():
+    # Hash on the bounded hashing pool rather than the event loop:
+    password = await ahash_password(data.password)
+
+    # Insert directly and let the primary key reject a taken username, which
+    # also holds for concurrent signups with the same name:
+    try:
+        user = await sync_to_async(create_user)(data, password)
+    except IntegrityError:
         return 400, {"detail": "Username already exists."}
 
-    with transaction.atomic():
-        user = User.objects.create_user(
-            username=data.username,
-            first_name=data.first_name,
-            last_name=data.last_name,
-            password=data.password
-        )
-
     token = generate_token(user.username)
 
     return 201, {
         AUTH_KEY: token,
-        "user": user
+        "user": await auser_for_view(user, view)
     }
 
 
 @router.post(
     '/login',
-    response={200: AuthOutput, 401: Unauthorized}
+    response={
+        200: Union[AuthOutput, AuthSummaryOutput],
+        401: Unauthorized,
+        503: ServiceUnavailable
+    }
 )
-def login(request, data: LoginInput):
+async def login(request, data: LoginInput, view: UserView = USER_VIEW_FULL):
     """
     Handles user login. User must send:
 
@@ -110,36 +154,93 @@ def login(request, data: LoginInput):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists (see signup).
+
     On failure with bad credentials, returns error JSON:
 
         {
             "detail": "Invalid credentials."
         }
 
+    If the server is too busy checking passwords, returns a 503 (see signup).
+
     **Authentication: none**
     """
 
-    user = authenticate(username=data.username, password=data.password)
+    # Same checks as django.contrib.auth's ModelBackend, but with the password
+    # checked on the bounded hashing pool:
+    user = await User.objects.filter(username=data.username).afirst()
 
     if user is None:
-        return 401, {"detail": "Invalid credentials."}
+        # Hash anyway, so response time doesn't reveal whether the username
+        # exists:
+        await ahash_password(data.password)
+        return await alogin_failed(request, data.username)
+
+    # check_password calls the setter when the hash is outdated (e.g. after a
+    # PBKDF2 iteration bump); the new hash is made below, on the pool:
+    outdated_hash = []
+
+    if (
+        not await acheck_password(
+            data.password, user.password, setter=outdated_hash.append
+        )
+        or not user.is_active
+    ):
+        return await alogin_failed(request, data.username)
+
+    if outdated_hash:
+        user.password = await ahash_password(data.password)
+        await user.asave(update_fields=["password"])
 
     token = generate_token(user.username)
 
     return {
         AUTH_KEY: token,
-        "user": user
+        "user": await auser_for_view(user, view)
     }
 
 
+async def alogin_failed(request, username):
+    """Send user_login_failed, as django.contrib.auth.authenticate would (for
+    lockout and audit tools), and return the 401 response."""
+
+    await user_login_failed.asend(
+        sender=__name__,
+        credentials={"username": username},
+        request=request,
+    )
+
+    return 401, {"detail": "Invalid credentials."}
+
+
+def create_user(data, password):
+    """
+    Insert a user from SignupInput data with an already-hashed password.
+
+    Raises IntegrityError if the username is taken. The INSERT runs in a
+    savepoint (like QuerySet.get_or_create) so that the error doesn't break
+    any enclosing transaction.
+    """
+
+    with transaction.atomic():
+        return User.objects.create(
+            username=User.normalize_username(data.username),
+            first_name=data.first_name,
+            last_name=data.last_name,
+            password=password
+        )
+
+
 ######## USERS ################################################################
 
 @router.get(
     '/{str:username}',
-    response={200: UserOutput, 401: Unauthorized},
+    response={200: Union[UserOutput, UserSummaryOutput], 401: Unauthorized},
     auth=token_header
 )
-def get_user(request, username: str):
+async def get_user(request, username: str, view: UserView = USER_VIEW_FULL):
     """
     Get information about a single user.
 
@@ -156,6 +257,9 @@ def get_user(request, username: str):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists (see signup).
+
     **Authentication: token**
 
     **Authorization: same user or admin**
@@ -166,17 +270,48 @@ def get_user(request, username: str):
     if username != curr_user.username and curr_user.is_staff is not True:
         return 401, {"detail": "Unauthorized"}
 
-    user = get_object_or_404(User, username=username)
+    # The rendered response is cached until the user, or any story in it,
+    # changes (see cache.py):
+    content = await acached_user_output(
+        username,
+        view,
+        lambda: arender_user(request, username, view)
+    )
+
+    return HttpResponse(content, content_type=router.api.get_content_type())
+
 
-    return {"user": user}
+async def arender_user(request, username, view):
+    """Render a GET /users/{username} response body for view, or raise
+    Http404 if there's no such user."""
+
+    user = await aget_object_or_404(User, username=username)
+    data = {"user": await auser_for_view(user, view)}
+
+    if view == USER_VIEW_SUMMARY:
+        body = UserSummaryOutput.model_validate(data).model_dump()
+    else:
+        body = UserOutput.model_validate(data).model_dump()
+
+    return router.api.renderer.render(request, body, response_status=200)
 
 
 @router.patch(
     '/{str:username}',
-    response={200: UserOutput, 400: BadRequest, 401: Unauthorized},
+    response={
+        200: Union[UserOutput, UserSummaryOutput],
+        400: BadRequest,
+        401: Unauthorized,
+        503: ServiceUnavailable
+    },
     auth=token_header
 )
-def update_user(request, username: str, data: UserPatchInput):
+async def update_user(
+    request,
+    username: str,
+    data: UserPatchInput,
+    view: UserView = USER_VIEW_FULL
+):
     """
     Update a single user.
 
@@ -193,6 +328,9 @@ def update_user(request, username: str, data: UserPatchInput):
             }
         }
 
+    Send "?view=summary" to get story/favorite counts and IDs in place of the
+    full "stories" and "favorites" lists (see signup).
+
     **Authentication: token**
 
     **Authorization: same user or admin**
@@ -206,11 +344,35 @@ def update_user(request, username: str, data: UserPatchInput):
     # automatically by Django Ninja because the field was not provided
     patch_data = data.dict(exclude_none=True)
 
-    user = get_object_or_404(User, username=username)
-
-    updated_user = user.update(patch_data)
-
-    return {"user": updated_user}
+    # Only the patched columns are loaded (rather than trusting the auth
+    # cache's snapshot), since they decide which fields actually change; a
+    # password always counts as a change:
+    user = await aget_object_or_404(
+        User.objects.only(
+            "username", *(field for field in patch_data if field != "password")
+        ),
+        username=username,
+    )
+
+    # Hash a new password on the bounded hashing pool, not in user.update:
+    hashed_fields = []
+
+    if "password" in patch_data:
+        user.password = await ahash_password(patch_data.pop("password"))
+        hashed_fields.append("password")
+
+    # Writes only the changed columns, or nothing for a no-op patch:
+    await sync_to_async(user.update)(patch_data, hashed_fields)
+
+    # A write has dropped the cached output, so this re-renders it (and
+    # re-caches it for GET); a no-op patch is served from the cache:
+    content = await acached_user_output(
+        username,
+        view,
+        lambda: arender_user(request, username, view)
+    )
+
+    return HttpResponse(content, content_type=router.api.get_content_type())
 
 
 ######## FAVORITES ############################################################
@@ -1,9 +1,21 @@
+import copy
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
 from hashlib import md5
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 from ninja.security import APIKeyHeader
 
+from hack_or_snooze.metrics import auth_cache_lookups
+
 from .models import User
 
 AUTH_KEY = "token"
@@ -14,6 +26,14 @@ class ApiKey(APIKeyHeader):
 
     param_name = AUTH_KEY
 
+    async def __call__(self, request):
+        """Authenticate request without blocking the event loop; django-ninja
+        awaits this from async views."""
+
+        token = self._get_key(request)
+
+        return await self.aauthenticate(request, token)
+
     def authenticate(self, request, token):
         """
         Parse token submission and check validity.
@@ -32,11 +52,46 @@ class ApiKey(APIKeyHeader):
 
         username = token.split(":")[0]
 
+        # Read the generation before the user, so that a change committed in
+        # between can't be cached under the new generation:
+        generation = user_cache.generation(username)
+        user = user_cache.get(token, generation)
+
+        if user is not None:
+            return user
+
         try:
             user = User.objects.get(username=username)
         except ObjectDoesNotExist:
             return None
 
+        user_cache.set(token, user, generation)
+
+        return user
+
+    async def aauthenticate(self, request, token):
+        """Async version of authenticate, using the async ORM on a cache
+        miss."""
+
+        if not check_token(token):
+            return None
+
+        username = token.split(":")[0]
+
+        # Cache backends are sync, so read the generation in a thread:
+        generation = await sync_to_async(user_cache.generation)(username)
+        user = user_cache.get(token, generation)
+
+        if user is not None:
+            return user
+
+        try:
+            user = await User.objects.aget(username=username)
+        except ObjectDoesNotExist:
+            return None
+
+        user_cache.set(token, user, generation)
+
         return user
 
 
@@ -44,6 +99,141 @@ class ApiKey(APIKeyHeader):
 token_header = ApiKey()
 
 
+###############################################################################
+# In-process cache of authenticated users
+
+class UserCache:
+    """
+    Bounded, thread-safe LRU cache of user snapshots keyed by auth token.
+
+    Entries expire after ttl seconds. Each entry also records its user's
+    generation, a random value kept in the shared Django cache; saving or
+    deleting a user bumps it (see signals.py), so every worker process drops
+    its stale snapshot on the next lookup, not just the one that wrote.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def generation(self, username):
+        """
+        Return username's current generation from the shared cache, creating
+        one if needed. Returns None if the cache is disabled.
+
+        As with the story list version, generations are random so that one
+        evicted from the shared cache can't be recreated matching old
+        entries.
+        """
+
+        if not self.enabled:
+            return None
+
+        key = user_generation_key(username)
+        generation = cache.get(key)
+
+        if generation is None:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            generation = cache.get(key)
+
+        return generation
+
+    def get(self, token, generation):
+        """Return a copy of the cached user for token, or None on a miss or
+        if the entry isn't from generation."""
+
+        with self._lock:
+            entry = self._entries.get(token)
+
+            if entry is None:
+                auth_cache_lookups.labels("miss").inc()
+                return None
+
+            user, expires_at, entry_generation = entry
+
+            if (
+                expires_at <= time.monotonic()
+                or entry_generation != generation
+            ):
+                del self._entries[token]
+                auth_cache_lookups.labels("miss").inc()
+                return None
+
+            self._entries.move_to_end(token)
+
+        auth_cache_lookups.labels("hit").inc()
+
+        # Hand out a copy so that a request mutating request.auth can't
+        # change the snapshot seen by other requests:
+        return copy.copy(user)
+
+    def set(self, token, user, generation):
+        """Cache a snapshot of user, read during generation, under token,
+        evicting the LRU entry if the cache is full."""
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[token] = (
+                copy.copy(user),
+                time.monotonic() + self.ttl,
+                generation,
+            )
+            self._entries.move_to_end(token)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        """
+        Drop the cached snapshot for username in every process, by bumping
+        their generation.
+
+        The generation is bumped again once the current transaction commits,
+        in case another process re-cached the user from data read before the
+        commit.
+        """
+
+        with self._lock:
+            self._entries.pop(generate_token(username), None)
+
+        if not self.enabled:
+            return
+
+        bump_user_generation(username)
+
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: bump_user_generation(username))
+
+    def clear(self):
+        """Drop all cached snapshots."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+def user_generation_key(username):
+    # Usernames come from tokens, so hash them into a safe cache key:
+    return f"auth:user:generation:{md5(username.encode()).hexdigest()}"
+
+
+def bump_user_generation(username):
+    cache.set(user_generation_key(username), uuid.uuid4().hex, timeout=None)
+
+
+user_cache = UserCache(
+    max_size=settings.AUTH_USER_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL,
+)
+
+
 ###############################################################################
 # Helper functions to generate and validate tokens
 
@@ -63,10 +253,14 @@ def generate_token(username):
     return f"{username}:{hash}"
 
 
+@lru_cache(maxsize=4096)
 def generate_hash(username):
     """
     Hash username and return first 12 characters.
 
+    Results are memoized, since every authenticated request re-hashes the
+    username in its token.
+
     EX: "fluffy" -> "ce7bcda695c3"
     """
 
@@ -0,0 +1,130 @@
+import uuid
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from stories.models import Story
+
+from .models import User
+from .schemas import USER_VIEW_FULL, USER_VIEW_SUMMARY
+
+USER_VIEWS = (USER_VIEW_FULL, USER_VIEW_SUMMARY)
+
+
+def user_output_key(username, view):
+    # Usernames come from the URL, so hash them into a safe cache key. v2
+    # entries are (generation, content) tuples, so they don't share keys
+    # with processes still caching bare content:
+    return f"users:output:v2:{md5(username.encode()).hexdigest()}:{view}"
+
+
+def user_output_generation_key(username):
+    return f"users:output:v2:{md5(username.encode()).hexdigest()}:generation"
+
+
+async def acached_user_output(username, view, render):
+    """
+    Return the rendered GET /users/{username} response content for view,
+    from the cache if possible.
+
+    On a miss, awaits render() to build and cache the content. Exceptions
+    raised by render() (e.g. Http404 for a missing user) are not cached.
+
+    As in stories.cache.cached_story, content is stored with the user's
+    generation as read before rendering, and only served while it is
+    current; invalidate_user_outputs drops the generation.
+    """
+
+    ttl = settings.USER_OUTPUT_CACHE_TTL
+
+    if ttl <= 0:
+        return await render()
+
+    key = user_output_key(username, view)
+    generation_key = user_output_generation_key(username)
+    cached = await cache.aget_many([key, generation_key])
+    generation = cached.get(generation_key)
+
+    if generation is None:
+        await cache.aadd(generation_key, uuid.uuid4().hex, timeout=None)
+        generation = await cache.aget(generation_key)
+
+    entry_generation, content = cached.get(key, (None, None))
+
+    if entry_generation == generation and content is not None:
+        return content
+
+    content = await render()
+    await cache.aset(key, (generation, content), timeout=ttl)
+
+    return content
+
+
+def invalidate_user_outputs(usernames):
+    """
+    Drop every view's cached output for usernames, along with their
+    generations (see acached_user_output).
+
+    As with stories.cache.invalidate_stories, this runs again once the
+    current transaction commits, in case a concurrent request re-cached a
+    user from data read before the commit.
+    """
+
+    keys = [
+        key
+        for username in usernames
+        for key in (
+            user_output_generation_key(username),
+            *(user_output_key(username, view) for view in USER_VIEWS),
+        )
+    ]
+
+    if not keys:
+        return
+
+    cache.delete_many(keys)
+
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def story_dependents(story_ids):
+    """
+    Return usernames whose output embeds any of story_ids: the stories'
+    owners, and users who favorited them.
+
+    The favorites table is the reverse index from story to favoriting users
+    (its story_id column is indexed), so this is a single query.
+    """
+
+    favoriters = User.favorites.through.objects.filter(
+        story_id__in=story_ids
+    ).values_list("user_id", flat=True)
+    owners = Story.objects.filter(
+        id__in=story_ids
+    ).values_list("user_id", flat=True)
+
+    return set(favoriters.union(owners))
+
+
+def invalidate_story_dependents(story_ids, usernames=()):
+    """
+    Drop cached output for every user embedding any of story_ids (see
+    story_dependents), plus usernames.
+
+    Call this after changing the stories, but before deleting them: a
+    deleted story's owner and favorites can't be looked up.
+    """
+
+    # Skip the lookup if there's nothing cached to drop:
+    if settings.USER_OUTPUT_CACHE_TTL <= 0:
+        return
+
+    dependents = set(usernames)
+
+    if story_ids:
+        dependents.update(story_dependents(story_ids))
+
+    invalidate_user_outputs(dependents)
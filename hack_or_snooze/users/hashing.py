@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from hack_or_snooze.exceptions import PasswordHashingOverloadedException
+from hack_or_snooze.metrics import (
+    password_hashing_active,
+    password_hashing_queued,
+    password_hashing_rejected,
+)
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for password hashing and verification.
+
+    At most max_workers hashes run at once (PBKDF2 releases the GIL, so they
+    run in parallel) and at most max_pending more wait for a worker. Past
+    that, submit raises PasswordHashingOverloadedException instead of queueing,
+    so a burst of signups or logins gets fast 503s rather than unbounded
+    latency, and other requests don't queue behind the hashing.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="password-hashing",
+        )
+        self._lock = threading.Lock()
+        # Submitted and not yet finished (or cancelled), including running:
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args) on the pool and return its Future.
+
+        Raises PasswordHashingOverloadedException if the pool is full."""
+
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_pending:
+                self._rejected += 1
+                password_hashing_rejected.inc()
+                raise PasswordHashingOverloadedException(
+                    "Too many requests. Please try again shortly."
+                )
+
+            self._pending += 1
+            self._publish()
+
+        future = self._executor.submit(self._call, fn, args)
+        future.add_done_callback(self._on_done)
+
+        return future
+
+    async def arun(self, fn, *args):
+        """Run fn(*args) on the pool without blocking the event loop."""
+
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        """Return a snapshot of the pool's load, for metrics."""
+
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def _call(self, fn, args):
+        with self._lock:
+            self._active += 1
+            self._publish()
+
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _on_done(self, future):
+        # Also called for jobs cancelled before they started:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+            self._publish()
+
+    def _publish(self):
+        # Called with self._lock held:
+        password_hashing_active.set(self._active)
+        password_hashing_queued.set(self._pending - self._active)
+
+
+hashing_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+)
+
+
+async def ahash_password(raw_password):
+    """Hash raw_password on the hashing pool; returns the encoded hash."""
+
+    return await hashing_pool.arun(make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded, setter=None):
+    """
+    Check raw_password against an encoded hash on the hashing pool.
+
+    As with django.contrib.auth.hashers.check_password, setter(raw_password)
+    is called (on the pool's thread) if the password is correct but the hash
+    uses an outdated hasher or work factor.
+    """
+
+    return await hashing_pool.arun(
+        check_password, raw_password, encoded, setter
+    )
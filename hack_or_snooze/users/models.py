@@ -20,15 +20,29 @@ class User(AbstractUser):
         blank=True,
     )
 
-    def update(self, patch_data):
-        """Update user record and return updated user instance."""
+    def update(self, patch_data, update_fields=()):
+        """
+        Update user record and return updated user instance.
+
+        Only fields whose value changes are written, in a single UPDATE; if
+        nothing changed, nothing is written. A sent password always counts as
+        a change. update_fields names fields the caller has already changed
+        on this instance (e.g. a password hashed elsewhere) to save too.
+        """
+
+        changed_fields = list(update_fields)
 
         for field, value in patch_data.items():
             if (field == 'password'):
                 self.set_password(raw_password=patch_data['password'])
+            elif getattr(self, field) == value:
+                continue
             else:
                 setattr(self, field, value)
 
-        self.save()
+            changed_fields.append(field)
+
+        if changed_fields:
+            self.save(update_fields=changed_fields)
 
         return self
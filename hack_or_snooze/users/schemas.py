@@ -1,6 +1,7 @@
 import re
-from typing import List
+from typing import List, Literal
 
+from django.db.models.query import aprefetch_related_objects
 from pydantic import validator, model_validator
 
 from ninja import ModelSchema, Schema, Field
@@ -35,6 +36,73 @@ class UserOutput(Schema):
     user: UserSchema
 
 
+# Routes returning a user accept "?view=summary" to get UserSummarySchema
+# (counts and IDs only) instead of the full UserSchema with embedded stories:
+USER_VIEW_FULL = "full"
+USER_VIEW_SUMMARY = "summary"
+
+UserView = Literal["full", "summary"]
+
+
+class UserSummarySchema(ModelSchema):
+    """User Schema with story/favorite counts and IDs instead of stories."""
+
+    story_count: int
+    story_ids: List[str]
+    favorite_count: int
+    favorite_ids: List[str]
+
+    class Meta:
+        model = User
+        fields = ['username', 'first_name', 'last_name', 'date_joined']
+
+    @classmethod
+    async def afrom_user(cls, user):
+        """Build summary for user, fetching only story IDs."""
+
+        story_ids = [
+            story_id
+            async for story_id in user.stories.values_list("id", flat=True)
+        ]
+        favorite_ids = [
+            story_id
+            async for story_id in user.favorites.values_list("id", flat=True)
+        ]
+
+        return cls(
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            date_joined=user.date_joined,
+            story_count=len(story_ids),
+            story_ids=story_ids,
+            favorite_count=len(favorite_ids),
+            favorite_ids=favorite_ids,
+        )
+
+
+class UserSummaryOutput(Schema):
+    """Schema for user output with ?view=summary."""
+
+    user: UserSummarySchema
+
+
+async def auser_for_view(user, view):
+    """Return user, or its summary if view is "summary", for use as the
+    "user" value of a UserOutput or UserSummaryOutput response.
+
+    The full view's stories and favorites are prefetched with the async ORM,
+    since they can't be loaded lazily while rendering an async view's
+    response."""
+
+    if view == USER_VIEW_SUMMARY:
+        return await UserSummarySchema.afrom_user(user)
+
+    await aprefetch_related_objects([user], "stories", "favorites")
+
+    return user
+
+
 class UserPatchInput(ModelSchema):
     """Schema for PATCH /users/{username} response body"""
 
@@ -156,3 +224,9 @@ class AuthOutput(Schema):
     """Schema for auth routes response."""
     token: str
     user: UserSchema
+
+
+class AuthSummaryOutput(Schema):
+    """Schema for auth routes response with ?view=summary."""
+    token: str
+    user: UserSummarySchema
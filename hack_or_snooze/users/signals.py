@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from stories.models import Story
+
+from .models import User
+from .auth_utils import user_cache
+from .cache import invalidate_story_dependents, invalidate_user_outputs
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop a saved or deleted user from the auth cache, so that changes like
+    User.update or toggling is_staff are seen by the next request.
+
+    NOTE: QuerySet.update() does not send signals; entries changed that way
+    stay cached until they expire.
+    """
+
+    user_cache.invalidate(instance.username)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_output(sender, instance, **kwargs):
+    """Drop a saved or deleted user's cached GET /users output."""
+
+    invalidate_user_outputs([instance.username])
+
+
+@receiver(post_save, sender=Story)
+def invalidate_saved_story_dependents(sender, instance, created, **kwargs):
+    """
+    Drop cached output for users embedding a created or saved story.
+
+    A new story can only be in its owner's output, so only an update needs
+    to look up who favorited it.
+
+    NOTE: QuerySet.update() does not send signals; callers updating stories
+    that way must call invalidate_story_dependents() themselves.
+    """
+
+    if created:
+        invalidate_user_outputs([instance.user_id])
+    else:
+        invalidate_story_dependents([instance.pk])
+
+
+@receiver(pre_delete, sender=Story)
+def invalidate_deleted_story_dependents(sender, instance, **kwargs):
+    """Drop cached output for users embedding a story, before its favorites
+    are cascade-deleted."""
+
+    invalidate_story_dependents([instance.pk])
@@ -1,9 +1,27 @@
 import json
-
-from django.test import TestCase
-
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from hack_or_snooze.testing import (
+    QueryBudgetMixin,
+    make_favorites,
+    make_stories,
+    make_users,
+)
+from users.models import User
 from users.factories import UserFactory, FACTORY_USER_DEFAULT_PASSWORD
 from users.auth_utils import generate_token
+from users.cache import invalidate_user_outputs
+from users.hashing import hashing_pool
+from stories.factories import StoryFactory
 
 AUTH_KEY = 'token'
 EMPTY_TOKEN_VALUE = ''
@@ -329,6 +347,31 @@ class APIAuthTestCase(TestCase):
             }
         )
 
+    def test_login_ok_summary_view(self):
+        response = self.client.post(
+            '/api/users/login?view=summary',
+            data=json.dumps(self.valid_login_data),
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                AUTH_KEY: "user:ee11cbb19052",
+                "user": {
+                    "story_count": 0,
+                    "story_ids": [],
+                    "favorite_count": 0,
+                    "favorite_ids": [],
+                    "username": "user",
+                    "first_name": "userFirst",
+                    "last_name": "userLast",
+                    "date_joined": "2020-01-01T00:00:00Z"
+                }
+            }
+        )
+
     def test_login_fail_missing_data(self):
         invalid_data = {
             "username": self.existing_user.username,
@@ -428,6 +471,140 @@ class APIAuthTestCase(TestCase):
             }
         )
 
+    def test_login_fail_inactive_user(self):
+        self.existing_user.is_active = False
+        self.existing_user.save()
+
+        response = self.client.post(
+            '/api/users/login',
+            data=json.dumps(self.valid_login_data),
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_fail_sends_user_login_failed(self):
+        failures = []
+
+        def receiver(sender, credentials, request, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+
+        for username, password in [
+            (self.existing_user.username, "bad_password"),
+            ("nonexistent", FACTORY_USER_DEFAULT_PASSWORD),
+        ]:
+            self.client.post(
+                '/api/users/login',
+                data=json.dumps({"username": username, "password": password}),
+                content_type="application/json"
+            )
+
+        self.assertEqual(
+            failures,
+            [{"username": self.existing_user.username},
+             {"username": "nonexistent"}],
+        )
+
+    def test_login_rehashes_outdated_password(self):
+        self.existing_user.password = make_password(
+            FACTORY_USER_DEFAULT_PASSWORD, hasher="pbkdf2_sha1"
+        )
+        self.existing_user.save()
+
+        response = self.client.post(
+            '/api/users/login',
+            data=json.dumps(self.valid_login_data),
+            content_type="application/json"
+        )
+
+        self.existing_user.refresh_from_db()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            self.existing_user.password.startswith("pbkdf2_sha256$")
+        )
+        self.assertTrue(
+            self.existing_user.check_password(FACTORY_USER_DEFAULT_PASSWORD)
+        )
+
+    def test_signup_fail_hashing_pool_full(self):
+        with mock.patch.object(hashing_pool, "max_workers", 0), \
+                mock.patch.object(hashing_pool, "max_pending", 0):
+            response = self.client.post(
+                '/api/users/signup',
+                data=json.dumps(self.valid_signup_data),
+                content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertJSONEqual(
+            response.content,
+            {
+                "detail": "Too many requests. Please try again shortly."
+            }
+        )
+        self.assertFalse(User.objects.filter(username="test").exists())
+
+    def test_login_fail_hashing_pool_full(self):
+        with mock.patch.object(hashing_pool, "max_workers", 0), \
+                mock.patch.object(hashing_pool, "max_pending", 0):
+            response = self.client.post(
+                '/api/users/login',
+                data=json.dumps(self.valid_login_data),
+                content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "detail": "Too many requests. Please try again shortly."
+            }
+        )
+
+
+class APISignupConcurrencyTestCase(TransactionTestCase):
+    """Test concurrent POST /users/signup requests for one username."""
+
+    SIGNUPS = 8
+
+    def test_signup_same_username_concurrently_creates_one_user(self):
+        barrier = threading.Barrier(self.SIGNUPS)
+        statuses = []
+
+        def signup():
+            barrier.wait(5)
+
+            try:
+                response = Client().post(
+                    '/api/users/signup',
+                    data=json.dumps({
+                        "username": "racer",
+                        "password": "password",
+                        "first_name": "racerFirst",
+                        "last_name": "racerLast"
+                    }),
+                    content_type="application/json"
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=signup) for _ in range(self.SIGNUPS)
+        ]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [400] * (self.SIGNUPS - 1))
+        self.assertEqual(User.objects.filter(username="racer").count(), 1)
+
 
 class APIUserGetTestCase(TestCase):
     """Test GET /users/{username} endpoint."""
@@ -442,6 +619,10 @@ class APIUserGetTestCase(TestCase):
         cls.user2_token = generate_token(cls.user_2.username)
         cls.staff_user_token = generate_token(cls.staff_user.username)
 
+    def setUp(self):
+        # Test rollbacks don't invalidate the user output cache:
+        cache.clear()
+
     def test_get_user_ok_as_self(self):
         """Test that a user can get their own user information with a valid
         token."""
@@ -466,6 +647,93 @@ class APIUserGetTestCase(TestCase):
             }
         )
 
+    async def test_get_user_ok_under_asgi(self):
+        """Test that the full user view loads stories and favorites when
+        served through the async (ASGI) request handler."""
+
+        story = await sync_to_async(StoryFactory)(
+            user=await User.objects.aget(username="user2"))
+        await self.user.favorites.aadd(story)
+
+        response = await self.async_client.get(
+            '/api/users/user',
+            headers={AUTH_KEY: self.user_token}
+        )
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_json["user"]["stories"], [])
+        self.assertEqual(
+            [story["id"] for story in response_json["user"]["favorites"]],
+            [story.id]
+        )
+
+    def test_get_user_query_count_is_constant(self):
+        """Test that serializing favorites posted by many different users
+        does not load each story's user."""
+
+        for i in range(10):
+            self.user.favorites.add(
+                StoryFactory(user=UserFactory(username=f"poster{i}"))
+            )
+
+        # Warm the auth cache, so only the endpoint's own queries count, but
+        # not the response cache:
+        self.client.get('/api/users/user', headers={AUTH_KEY: self.user_token})
+        invalidate_user_outputs(["user"])
+
+        # target user, user.stories, user.favorites:
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                '/api/users/user',
+                headers={AUTH_KEY: self.user_token}
+            )
+
+        response_json = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_json["user"]["favorites"]), 10)
+
+    def test_get_user_ok_summary_view(self):
+        """Test that ?view=summary returns counts and IDs instead of
+        stories."""
+
+        story = StoryFactory()
+        favorite = StoryFactory(user=self.user_2)
+        self.user.favorites.add(favorite)
+
+        response = self.client.get(
+            '/api/users/user?view=summary',
+            headers={AUTH_KEY: self.user_token}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            response.content,
+            {
+                "user": {
+                    "story_count": 1,
+                    "story_ids": [story.id],
+                    "favorite_count": 1,
+                    "favorite_ids": [favorite.id],
+                    "username": "user",
+                    "first_name": "userFirst",
+                    "last_name": "userLast",
+                    "date_joined": "2020-01-01T00:00:00Z"
+                }
+            }
+        )
+
+    def test_get_user_fail_unprocessable_unknown_view(self):
+
+        response = self.client.get(
+            '/api/users/user?view=bogus',
+            headers={AUTH_KEY: self.user_token}
+        )
+
+        self.assertEqual(response.status_code, 422)
+
     def test_get_user_ok_as_staff(self):
         """Test that a staff user can get a different user's information with a
         valid token."""
@@ -593,6 +861,68 @@ class APIUserPatchTestCase(TestCase):
         cls.user2_token = generate_token(cls.user_2.username)
         cls.staff_user_token = generate_token(cls.staff_user.username)
 
+    def setUp(self):
+        # Test rollbacks don't invalidate the user output cache:
+        cache.clear()
+
+    def test_patch_user_noop_reads_only_patched_columns(self):
+        self.client.get('/api/users/user', headers={AUTH_KEY: self.user_token})
+
+        # patched columns; the response is the cached GET output:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                '/api/users/user',
+                data=json.dumps({"first_name": self.user.first_name}),
+                headers={AUTH_KEY: self.user_token},
+                content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"first_name"', queries[0]["sql"])
+        self.assertNotIn('"last_name"', queries[0]["sql"])
+        self.assertEqual(
+            json.loads(response.content)["user"]["first_name"],
+            self.user.first_name,
+        )
+
+    def test_patch_user_writes_only_changed_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                '/api/users/user',
+                data=json.dumps({
+                    "first_name": "newFirst",
+                    "last_name": self.user.last_name
+                }),
+                headers={AUTH_KEY: self.user_token},
+                content_type="application/json"
+            )
+
+        updates = [
+            query["sql"] for query in queries
+            if query["sql"].startswith("UPDATE")
+        ]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertIn("first_name", updates[0])
+        self.assertNotIn("last_name", updates[0])
+
+    def test_patch_user_no_op_skips_write(self):
+        for patch in [{}, {"first_name": self.user.first_name}]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(
+                    '/api/users/user',
+                    data=json.dumps(patch),
+                    headers={AUTH_KEY: self.user_token},
+                    content_type="application/json"
+                )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                query["sql"].startswith("UPDATE") for query in queries
+            ))
+
     def test_patch_user_ok_all_fields_as_self(self):
 
         response = self.client.patch(
@@ -988,3 +1318,79 @@ class APIUserPatchTestCase(TestCase):
                 ]
             }
         )
+
+
+class APIUserQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test /users endpoints make a constant number of queries as the user's
+    stories and favorites grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_token = generate_token(cls.user.username)
+
+    def populate(self, size):
+        """Give the user size stories and size favorites, each posted by a
+        different user."""
+
+        make_stories(size, [self.user])
+        make_favorites([self.user], make_stories(size, make_users(size)))
+
+    def test_signup_query_budget(self):
+        self.assertQueryBudget(
+            "users_api_signup",
+            lambda size: f"new{size}",
+            lambda username: self.client.post(
+                '/api/users/signup',
+                data={
+                    "username": username,
+                    "password": "password",
+                    "first_name": "newFirst",
+                    "last_name": "newLast",
+                },
+                content_type="application/json",
+            ),
+        )
+
+    def test_login_query_budget(self):
+        self.assertQueryBudget(
+            "users_api_login",
+            self.populate,
+            lambda _: self.client.post(
+                '/api/users/login',
+                data={
+                    "username": self.user.username,
+                    "password": FACTORY_USER_DEFAULT_PASSWORD,
+                },
+                content_type="application/json",
+            ),
+        )
+
+    def test_get_user_query_budget(self):
+        for view in ["full", "summary"]:
+            with self.subTest(view=view):
+                self.assertQueryBudget(
+                    "users_api_get_user",
+                    self.populate,
+                    lambda _: self.client.get(
+                        f'/api/users/user?view={view}',
+                        headers={AUTH_KEY: self.user_token},
+                    ),
+                )
+
+    def test_patch_user_query_budget(self):
+        def populate(size):
+            self.populate(size)
+            # A new name each time, so that every request writes:
+            return size
+
+        self.assertQueryBudget(
+            "users_api_update_user",
+            populate,
+            lambda size: self.client.patch(
+                '/api/users/user',
+                data={"first_name": f"newFirst{size}"},
+                headers={AUTH_KEY: self.user_token},
+                content_type="application/json",
+            ),
+        )
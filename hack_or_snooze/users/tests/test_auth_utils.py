@@ -1,8 +1,19 @@
+from unittest import mock
+
+from django.core.cache import cache as shared_cache
 from django.test import TestCase
 
 from users.models import User
 from users.factories import UserFactory
-from users.auth_utils import generate_token, generate_hash, check_token, ApiKey
+from users.auth_utils import (
+    generate_token,
+    generate_hash,
+    check_token,
+    ApiKey,
+    UserCache,
+    bump_user_generation,
+    user_cache,
+)
 
 # Pass empty dictionary to simulate request object:
 REQUEST_MOCK = {}
@@ -11,6 +22,8 @@ REQUEST_MOCK = {}
 class ApiKeyTestCase(TestCase):
     """Tests for custom authenticate method on ApiKey class from DjangoNinja"""
     def setUp(self):
+        user_cache.clear()
+
         self.user = UserFactory()
         self.user_token = generate_token(self.user.username)
 
@@ -65,6 +78,159 @@ class ApiKeyTestCase(TestCase):
 
         self.assertIsNone(user)
 
+    async def test_aauthenticate_ok(self):
+        """Test async aauthenticate method returns User instance on success."""
+
+        user = await self.token_header.aauthenticate(
+            REQUEST_MOCK, self.user_token)
+
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.username, self.user.username)
+
+    async def test_aauthenticate_fail_token_is_invalid(self):
+        """Test async aauthenticate method returns None when token is invalid
+        (username/hash mismatch)."""
+
+        user = await self.token_header.aauthenticate(
+            REQUEST_MOCK, 'user:abcdef123456')
+
+        self.assertIsNone(user)
+
+    async def test_aauthenticate_fail_no_user_matching_token(self):
+        """Test async aauthenticate method returns None when token is valid,
+        but does not coorespond to an existing user."""
+
+        user = await self.token_header.aauthenticate(
+            REQUEST_MOCK, 'nonexistent:357f5c155c9d')
+
+        self.assertIsNone(user)
+
+
+    def test_authenticate_cached_user_needs_no_queries(self):
+        """Test authenticate method serves repeat tokens from the user cache."""
+
+        self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        with self.assertNumQueries(0):
+            user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.assertEqual(user.username, self.user.username)
+
+    def test_authenticate_cache_invalidated_on_update(self):
+        """Test User.update drops the cached user."""
+
+        self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.user.update({"first_name": "updatedFirst"})
+
+        user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.assertEqual(user.first_name, "updatedFirst")
+
+    def test_authenticate_cache_invalidated_on_is_staff_change(self):
+        """Test saving a change to is_staff drops the cached user."""
+
+        user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+        self.assertFalse(user.is_staff)
+
+        self.user.is_staff = True
+        self.user.save()
+
+        user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.assertTrue(user.is_staff)
+
+    def test_authenticate_cache_invalidated_on_delete(self):
+        """Test deleting a user drops the cached user."""
+
+        self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.user.delete()
+
+        user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.assertIsNone(user)
+
+    def test_authenticate_cache_invalidated_by_other_process(self):
+        """Test a user change made in another worker process (seen here only
+        as a bumped generation in the shared cache) drops the cached
+        user."""
+
+        self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        # Change the row without signals, then invalidate as another
+        # process would, leaving this process's entry in place:
+        User.objects.filter(username=self.user.username).update(
+            is_staff=True
+        )
+        bump_user_generation(self.user.username)
+
+        user = self.token_header.authenticate(REQUEST_MOCK, self.user_token)
+
+        self.assertTrue(user.is_staff)
+
+
+class UserCacheTestCase(TestCase):
+    """Tests for the in-process authenticated user cache."""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.user_2 = UserFactory(username="user2")
+
+    def test_get_returns_copy(self):
+        cache = UserCache(max_size=10, ttl=60)
+        cache.set("token", self.user, "gen")
+
+        cached_user = cache.get("token", "gen")
+        cached_user.first_name = "mutated"
+
+        self.assertEqual(cache.get("token", "gen").first_name, "userFirst")
+
+    def test_evicts_least_recently_used(self):
+        cache = UserCache(max_size=1, ttl=60)
+        cache.set("token", self.user, "gen")
+        cache.set("token2", self.user_2, "gen")
+
+        self.assertIsNone(cache.get("token", "gen"))
+        self.assertEqual(cache.get("token2", "gen").username, "user2")
+
+    def test_expires_after_ttl(self):
+        cache = UserCache(max_size=10, ttl=60)
+
+        with mock.patch("users.auth_utils.time.monotonic", return_value=0):
+            cache.set("token", self.user, "gen")
+
+        with mock.patch("users.auth_utils.time.monotonic", return_value=61):
+            self.assertIsNone(cache.get("token", "gen"))
+
+    def test_disabled_with_zero_ttl(self):
+        cache = UserCache(max_size=10, ttl=0)
+        cache.set("token", self.user, "gen")
+
+        self.assertIsNone(cache.get("token", "gen"))
+
+    def test_stale_generation_is_a_miss(self):
+        cache = UserCache(max_size=10, ttl=60)
+        cache.set("token", self.user, "gen")
+
+        self.assertIsNone(cache.get("token", "gen2"))
+
+    def test_invalidate_reaches_other_processes(self):
+        """Test invalidating in one process's cache drops the entry in
+        another's, through the shared generation."""
+
+        shared_cache.clear()
+        writer = UserCache(max_size=10, ttl=60)
+        reader = UserCache(max_size=10, ttl=60)
+        token = generate_token(self.user.username)
+
+        reader.set(token, self.user, reader.generation(self.user.username))
+        writer.invalidate(self.user.username)
+
+        self.assertIsNone(
+            reader.get(token, reader.generation(self.user.username))
+        )
+
 
 class AuthUtilsTestCase(TestCase):
     """Tests for auth helper functions."""
@@ -0,0 +1,248 @@
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from users.api import arender_user
+from users.factories import UserFactory
+from users.auth_utils import generate_token
+from stories.factories import StoryFactory
+
+AUTH_KEY = 'token'
+
+
+class UserOutputCacheTestCase(TestCase):
+    """Test GET /users/{username} reads through the user output cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.staff_user = UserFactory(username="staffUser", is_staff=True)
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.staff_user_token = generate_token(cls.staff_user.username)
+
+        cls.story = StoryFactory()
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the user output cache:
+        cache.clear()
+
+    def get_user(self, username="user", view="full"):
+        return self.client.get(
+            f'/api/users/{username}?view={view}',
+            headers={AUTH_KEY: self.staff_user_token}
+        )
+
+    def test_cache_hit_needs_no_queries(self):
+        first = self.get_user()
+
+        with self.assertNumQueries(0):
+            second = self.get_user()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(second.content), json.loads(first.content))
+
+    def test_views_cached_separately(self):
+        self.get_user()
+
+        summary = json.loads(self.get_user(view="summary").content)["user"]
+
+        self.assertEqual(summary["story_count"], 1)
+        self.assertNotIn("stories", summary)
+
+    def test_missing_user_not_cached(self):
+        self.get_user("nonexistent")
+
+        # target user:
+        with self.assertNumQueries(1):
+            response = self.get_user("nonexistent")
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(USER_OUTPUT_CACHE_TTL=0)
+    def test_disabled_with_zero_ttl(self):
+        self.get_user()
+
+        # target user, user.stories, user.favorites:
+        with self.assertNumQueries(3):
+            self.get_user()
+
+    def test_authorization_checked_on_hit(self):
+        self.get_user()
+
+        other_token = generate_token(UserFactory(username="other").username)
+        response = self.client.get(
+            '/api/users/user',
+            headers={AUTH_KEY: other_token}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+
+class UserOutputCacheInvalidationTestCase(TestCase):
+    """Test changes to a user or to stories they embed invalidate their
+    cached GET /users/{username} output."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.user_2 = UserFactory(username="user2")
+        cls.user_3 = UserFactory(username="user3")
+
+        cls.user_token = generate_token(cls.user.username)
+        cls.user2_token = generate_token(cls.user_2.username)
+        cls.user3_token = generate_token(cls.user_3.username)
+
+        cls.own_story = StoryFactory(user=cls.user)
+        cls.other_story = StoryFactory(user=cls.user_2)
+
+    def setUp(self):
+        # Test rollbacks don't invalidate the user output cache:
+        cache.clear()
+
+    def get_user(self, view="full"):
+        response = self.client.get(
+            f'/api/users/user?view={view}',
+            headers={AUTH_KEY: self.user_token}
+        )
+        return json.loads(response.content)["user"]
+
+    def favorite(self, token, username, story, action="favorite"):
+        self.client.post(
+            f'/api/favorites/{username}/{story.id}/{action}',
+            headers={AUTH_KEY: token},
+        )
+
+    def test_update_user_invalidates(self):
+        self.get_user()
+        self.get_user("summary")
+
+        self.client.patch(
+            '/api/users/user',
+            data=json.dumps({"first_name": "Patched"}),
+            headers={AUTH_KEY: self.user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(self.get_user()["first_name"], "Patched")
+        self.assertEqual(self.get_user("summary")["first_name"], "Patched")
+
+    def test_render_racing_a_write_not_served(self):
+        async def render_then_update(request, username, view):
+            # Another request updates the user between our render and set:
+            content = await arender_user(request, username, view)
+            await sync_to_async(self.user.update)({"first_name": "Patched"})
+            return content
+
+        with mock.patch("users.api.arender_user", render_then_update):
+            self.get_user()
+
+        self.assertEqual(self.get_user()["first_name"], "Patched")
+
+    def test_create_story_invalidates(self):
+        self.get_user()
+
+        self.client.post(
+            '/api/stories/',
+            data=json.dumps({
+                "author": "post_test_author",
+                "title": "post_test_title",
+                "url": "post_test_url"
+            }),
+            headers={AUTH_KEY: self.user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(len(self.get_user()["stories"]), 2)
+
+    def test_delete_own_story_invalidates(self):
+        self.get_user()
+
+        self.client.delete(
+            f'/api/stories/{self.own_story.id}',
+            headers={AUTH_KEY: self.user_token},
+        )
+
+        self.assertEqual(self.get_user()["stories"], [])
+
+    def test_story_save_invalidates(self):
+        self.get_user()
+
+        self.own_story.title = "saved_title"
+        self.own_story.save()
+
+        self.assertEqual(self.get_user()["stories"][0]["title"], "saved_title")
+
+    def test_add_and_remove_favorite_invalidate(self):
+        self.get_user("summary")
+
+        self.favorite(self.user_token, "user", self.other_story)
+        added = self.get_user("summary")
+
+        self.favorite(self.user_token, "user", self.other_story, "unfavorite")
+        removed = self.get_user("summary")
+
+        self.assertEqual(added["favorite_ids"], [self.other_story.id])
+        self.assertEqual(removed["favorite_ids"], [])
+
+    def test_bulk_favorites_invalidate(self):
+        self.get_user("summary")
+
+        self.client.post(
+            '/api/favorites/user/bulk',
+            data=json.dumps({"add": [self.other_story.id], "remove": []}),
+            headers={AUTH_KEY: self.user_token},
+            content_type="application/json"
+        )
+
+        self.assertEqual(
+            self.get_user("summary")["favorite_ids"], [self.other_story.id]
+        )
+
+    def test_favorite_of_own_story_invalidates(self):
+        self.get_user()
+
+        self.favorite(self.user2_token, "user2", self.own_story)
+
+        self.assertEqual(self.get_user()["stories"][0]["favorite_count"], 1)
+
+    def test_favorite_of_favorited_story_invalidates(self):
+        self.user.favorites.add(self.other_story)
+        self.get_user()
+
+        self.favorite(self.user3_token, "user3", self.other_story)
+
+        self.assertEqual(self.get_user()["favorites"][0]["favorite_count"], 2)
+
+    def test_delete_favorited_story_invalidates(self):
+        self.user.favorites.add(self.other_story)
+        self.get_user()
+
+        self.client.delete(
+            f'/api/stories/{self.other_story.id}',
+            headers={AUTH_KEY: self.user2_token},
+        )
+
+        self.assertEqual(self.get_user()["favorites"], [])
+
+    def test_related_manager_changes_invalidate(self):
+        self.get_user("summary")
+        self.user.favorites.add(self.other_story)
+        added = self.get_user("summary")
+
+        self.other_story.favorited_by.clear()
+        cleared = self.get_user("summary")
+
+        self.assertEqual(added["favorite_ids"], [self.other_story.id])
+        self.assertEqual(cleared["favorite_ids"], [])
+
+    def test_deleting_favoriting_user_invalidates(self):
+        self.favorite(self.user3_token, "user3", self.own_story)
+        self.get_user()
+
+        self.user_3.delete()
+
+        self.assertEqual(self.get_user()["stories"][0]["favorite_count"], 0)
@@ -0,0 +1,65 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from hack_or_snooze.exceptions import PasswordHashingOverloadedException
+from users.hashing import PasswordHashingPool
+
+
+class PasswordHashingPoolTestCase(SimpleTestCase):
+    """Tests for the bounded password hashing pool."""
+
+    def setUp(self):
+        self.pool = PasswordHashingPool(max_workers=1, max_pending=1)
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def block(self):
+        self.started.set()
+        self.release.wait(5)
+        return "done"
+
+    async def test_arun_returns_result(self):
+        result = await self.pool.arun(sum, [1, 2])
+
+        self.assertEqual(result, 3)
+        self.assertEqual(self.pool.stats()["completed"], 1)
+
+    def test_stats_count_active_and_queued(self):
+        running = self.pool.submit(self.block)
+        self.started.wait(5)
+        queued = self.pool.submit(sum, [1, 2])
+
+        stats = self.pool.stats()
+
+        self.assertEqual(stats["active"], 1)
+        self.assertEqual(stats["queued"], 1)
+
+        self.release.set()
+
+        self.assertEqual(running.result(5), "done")
+        self.assertEqual(queued.result(5), 3)
+        self.assertEqual(self.pool.stats()["queued"], 0)
+
+    def test_rejects_when_full(self):
+        self.pool.submit(self.block)
+        self.pool.submit(sum, [1, 2])
+
+        with self.assertRaises(PasswordHashingOverloadedException):
+            self.pool.submit(sum, [1, 2])
+
+        self.assertEqual(self.pool.stats()["rejected"], 1)
+
+    def test_cancelled_job_frees_its_slot(self):
+        self.pool.submit(self.block)
+        self.started.wait(5)
+        queued = self.pool.submit(sum, [1, 2])
+
+        self.assertTrue(queued.cancel())
+
+        # The cancelled job no longer counts against max_pending:
+        self.pool.submit(sum, [1, 2])
+        self.assertEqual(self.pool.stats()["queued"], 1)
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.hashers import check_password
 
 from users.factories import UserFactory
@@ -52,3 +54,41 @@ class UserModelTestCase(TestCase):
             self.test_user.password,
             patch_data["password"]
         )
+
+    def test_update_writes_only_changed_fields(self):
+        patch_data = {
+            "first_name": "patch_test_first",
+            "last_name": self.test_user.last_name,
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            self.test_user.update(patch_data)
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn("first_name", queries[0]["sql"])
+        self.assertNotIn("last_name", queries[0]["sql"])
+        self.assertNotIn("password", queries[0]["sql"])
+
+        self.test_user.refresh_from_db()
+        self.assertEqual(self.test_user.first_name, "patch_test_first")
+
+    def test_update_skips_write_for_no_op_patch(self):
+        patch_data = {
+            "first_name": self.test_user.first_name,
+            "last_name": self.test_user.last_name,
+        }
+
+        with self.assertNumQueries(0):
+            self.test_user.update(patch_data)
+
+        with self.assertNumQueries(0):
+            self.test_user.update({})
+
+    def test_update_saves_caller_update_fields(self):
+        self.test_user.password = "already_hashed"
+
+        with self.assertNumQueries(1):
+            self.test_user.update({}, update_fields=["password"])
+
+        self.test_user.refresh_from_db()
+        self.assertEqual(self.test_user.password, "already_hashed")